@@ -0,0 +1,97 @@
+"""
+Interfaz común de los motores de parsing.
+
+CYKParser (y BitsetCYKParser) y EarleyParser heredan de BaseParser: todos
+tienen parse(sentence) -> (aceptada, tiempo), build_parse_tree() con el
+mismo formato de árbol, words, unknown_token, cache, tracer, metrics,
+close() y los formatos de salida del árbol. Cada motor implementa parse(),
+build_parse_tree() y opcionalmente _chart_work() (ver metrics.py).
+"""
+
+from typing import Tuple
+from grammar import Grammar
+from metrics import MetricsRegistry
+from parse_cache import ParseCache
+from tree_format import render_compact, render_improved, to_bracketed, to_json
+
+
+class BaseParser:
+    """Estado y métodos compartidos por todos los motores"""
+
+    # Nombre del motor en engines.ENGINES (etiqueta engine de las métricas)
+    engine_name = None
+
+    def __init__(self, grammar: Grammar, tracer=None, cache: ParseCache = None,
+                 metrics: MetricsRegistry = None):
+        self.grammar = grammar
+        # Función tracer(event, **fields) opcional (ver tracing.py)
+        self.tracer = tracer
+        # Caché LRU de resultados opcional (ver parse_cache.py)
+        self.cache = cache
+        # Registro de métricas opcional (ver metrics.py); sin registro no se
+        # cuenta nada
+        self.metrics = metrics
+        self.words = None  # Tokens de la última sentencia analizada
+        self._cached_tree = None  # Árbol compacto si el resultado vino de la caché
+        # (posición, token) del primer token fuera del vocabulario de la
+        # gramática en la última sentencia, o None
+        self.unknown_token = None
+
+    def parse(self, sentence: str) -> Tuple[bool, float]:
+        raise NotImplementedError
+
+    def build_parse_tree(self, i: int = 0, j: int = None, variable: str = None) -> dict:
+        raise NotImplementedError
+
+    def _find_unknown(self, words: list, vocabulary: frozenset):
+        """(posición, token) del primer token fuera de `vocabulary`, o None"""
+        if vocabulary.issuperset(words):
+            return None
+        position = next(i for i, word in enumerate(words) if word not in vocabulary)
+        return (position, words[position])
+
+    def _chart_work(self) -> dict:
+        """Contadores de trabajo del último análisis (nombre de métrica -> valor)"""
+        return {}
+
+    def _record_metrics(self, sentence: str, accepted: bool, execution_time: float,
+                        cached: bool = False):
+        """Registra un análisis en self.metrics (la etiqueta del histograma es la sentencia)"""
+        metrics = self.metrics
+        engine = self.engine_name
+        metrics.observe('cyk_parse_seconds', execution_time, sentence, engine=engine)
+        metrics.inc('cyk_parses_total', engine=engine,
+                    result='accepted' if accepted else 'rejected')
+        if cached:
+            metrics.inc('cyk_parse_cache_hits_total', engine=engine)
+            return
+        for name, value in self._chart_work().items():
+            metrics.inc(name, value, engine=engine)
+
+    def close(self):
+        """Libera los recursos del parser (workers, etc.); por defecto no hace nada"""
+
+    def print_parse_tree_compact(self, tree: dict = None, prefix: str = "", is_tail: bool = True):
+
+        if tree is None:
+            tree = self.build_parse_tree()
+            print("\nParse Tree:")
+
+        # Todo el árbol se arma en un solo texto y se escribe con un solo print
+        print(render_compact(tree, prefix, is_tail))
+
+    def print_parse_tree_improved(self, indent: int = 0, tree: dict = None):
+
+        if tree is None:
+            tree = self.build_parse_tree()
+            print("\nParse Tree:")
+
+        print(render_improved(tree, indent))
+
+    def parse_tree_bracketed(self) -> str:
+        """Árbol de la última sentencia en notación con corchetes (estilo Penn)"""
+        return to_bracketed(self.build_parse_tree())
+
+    def parse_tree_json(self) -> str:
+        """Árbol de la última sentencia como JSON"""
+        return to_json(self.build_parse_tree(), ensure_ascii=False)
@@ -0,0 +1,111 @@
+"""
+Parsing por lotes en varios núcleos.
+
+parse_many() reparte las sentencias en un pool de procesos. Cada proceso
+recibe la gramática en CNF una sola vez (al iniciar) y crea un único parser
+que reutiliza para todas sus sentencias. init_worker() y parse_sentence()
+son los ganchos de cada proceso; parse_server.py los usa con su propio pool.
+"""
+
+import os
+from multiprocessing import Pool, current_process
+from typing import Iterable, Iterator, List
+
+from engines import AUTO_ENGINE, create_parser
+from grammar import Grammar
+from grammar_profiler import recommend_parser
+
+# Opciones del llenado paralelo (parallel_fill.py): los procesos del pool son
+# daemon y no pueden crear procesos propios
+PARALLEL_FILL_OPTIONS = ('parallel_workers', 'parallel_min_length')
+
+
+# Estado de cada proceso del pool (se inicializa una vez por proceso)
+_worker_parser = None
+_worker_build_trees = False
+
+
+def init_worker(grammar: Grammar, engine: str, build_trees: bool, options: dict = None):
+    """
+    Inicializador de un proceso de pool (multiprocessing.Pool o
+    ProcessPoolExecutor): crea el parser que usa parse_sentence(). Dentro de
+    un proceso daemon se descartan las opciones de llenado paralelo.
+    """
+    global _worker_parser, _worker_build_trees
+    options = dict(options or {})
+    if current_process().daemon:
+        for name in PARALLEL_FILL_OPTIONS:
+            options.pop(name, None)
+    _worker_parser = create_parser(grammar, engine, **options)
+    _worker_build_trees = build_trees
+
+
+def parse_sentence(sentence: str) -> dict:
+    """
+    Analiza una sentencia con el parser del proceso (ver init_worker):
+    {"sentence", "accepted", "time"}, "unknown_token" si lo hay y "tree"
+    si build_trees
+    """
+    accepted, execution_time = _worker_parser.parse(sentence)
+    result = {
+        "sentence": sentence,
+        "accepted": accepted,
+        "time": execution_time,
+    }
+    if _worker_parser.unknown_token is not None:
+        result["unknown_token"] = _worker_parser.unknown_token
+    if _worker_build_trees:
+        result["tree"] = _worker_parser.build_parse_tree() if accepted else None
+    return result
+
+
+def iter_parse_many(grammar: Grammar, sentences: Iterable[str], workers: int = None,
+                    chunksize: int = 64, build_trees: bool = False,
+                    engine: str = None) -> Iterator[dict]:
+    """
+    Igual que parse_many, pero entrega los resultados a medida que están
+    listos (en el mismo orden que las sentencias).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if engine is None:
+        engine = grammar.engine
+    options = {}
+    if engine == AUTO_ENGINE:
+        # Se perfila una sola vez aquí y no en cada proceso del pool
+        engine, options = recommend_parser(grammar)
+
+    # Con un solo proceso no vale la pena el costo del pool; el llenado
+    # paralelo recomendado sí se puede usar desde este proceso
+    if workers <= 1:
+        init_worker(grammar, engine, build_trees, options)
+        for sentence in sentences:
+            yield parse_sentence(sentence)
+        return
+
+    with Pool(workers, initializer=init_worker,
+              initargs=(grammar, engine, build_trees, options)) as pool:
+        yield from pool.imap(parse_sentence, sentences, chunksize=chunksize)
+
+
+def parse_many(grammar: Grammar, sentences: Iterable[str], workers: int = None,
+               chunksize: int = 64, build_trees: bool = False,
+               engine: str = None) -> List[dict]:
+    """
+    Analiza muchas sentencias en paralelo.
+
+    Args:
+        grammar: Gramática en CNF
+        sentences: Sentencias a analizar
+        workers: Número de procesos (por defecto, uno por núcleo)
+        chunksize: Sentencias que se envían juntas a cada proceso
+        build_trees: Incluir el parse tree de las sentencias aceptadas
+        engine: Motor de parsing (por defecto grammar.engine; 'auto' según el
+            perfil de la gramática, sin llenado paralelo dentro del pool)
+
+    Returns:
+        Lista en el mismo orden que las sentencias, con un diccionario por
+        sentencia: {"sentence", "accepted", "time"} y "tree" si build_trees
+    """
+    return list(iter_parse_many(grammar, sentences, workers, chunksize,
+                                build_trees, engine))
@@ -0,0 +1,177 @@
+"""
+Modo no interactivo: sentencias por la entrada, JSON Lines por la salida.
+
+Lee una sentencia por línea (de stdin o de un archivo) y escribe un registro
+JSON por sentencia, vaciando la salida después de cada uno. Se procesa línea
+a línea, así que la memoria se mantiene constante sin importar el tamaño de
+la entrada. Toda la corrida usa una sola gramática en CNF (la original con
+--engine earley) y un solo parser.
+
+Uso:
+    python batch_cli.py --grammar proyecto < sentencias.txt > resultados.jsonl
+    python batch_cli.py --grammar archivo --grammar-file grammar.txt --input sentencias.txt --trees
+    python batch_cli.py --trees --tree-format bracketed < sentencias.txt
+    python batch_cli.py --grammar archivo --grammar-file pcfg.txt --viterbi --beam 20 --trees
+    python batch_cli.py --engine earley --trees < sentencias.txt
+    python batch_cli.py --grammar archivo --grammar-file grammar.txt --engine auto < sentencias.txt
+"""
+
+import argparse
+import json
+import sys
+
+from engines import AUTO_ENGINE, ENGINES, ORIGINAL_GRAMMAR_ENGINES, create_parser
+from grammar_cache import load_compiled_grammar
+from grammar_loader import load_grammar_from_file
+from grammar_optimizer import optimize_grammar
+from metrics import REGISTRY
+from parse_cache import ParseCache
+from project_grammar import create_project_grammar
+from span_memo import SpanMemo
+from tree_format import to_bracketed, to_json
+
+
+def load_grammar(source: str, filename: str, cnf: bool = True):
+    """Carga la gramática ('archivo' o 'proyecto'), en CNF salvo con cnf=False"""
+    if source == 'archivo':
+        return load_compiled_grammar(filename) if cnf else load_grammar_from_file(filename)
+    grammar = create_project_grammar()
+    if cnf:
+        grammar.to_cnf()
+    return grammar
+
+
+def parse_stream(parser, lines, output, build_trees: bool = False, tree_format: str = 'json') -> int:
+    """
+    Analiza cada línea no vacía y escribe su registro JSON en output.
+    El árbol se escribe como objeto JSON (tree_format='json') o como texto
+    con corchetes ('bracketed').
+
+    Returns:
+        Número de sentencias procesadas
+    """
+    count = 0
+    for line in lines:
+        sentence = line.strip()
+        if not sentence:
+            continue
+
+        accepted, execution_time = parser.parse(sentence)
+        record = {
+            "sentence": sentence,
+            "accepted": accepted,
+            "latency": execution_time,
+            "tokens": parser.words,
+        }
+        if parser.unknown_token is not None:
+            # Rechazo temprano: primer token fuera del vocabulario
+            record["unknown_token"] = {"position": parser.unknown_token[0],
+                                       "token": parser.unknown_token[1]}
+        if getattr(parser, "viterbi", False):
+            record["log_probability"] = parser.log_probability
+        text = json.dumps(record, ensure_ascii=False)
+        if build_trees:
+            # El árbol se serializa sin recursión (puede tener miles de niveles)
+            # y se agrega al final del registro
+            if not accepted:
+                tree = "null"
+            elif tree_format == 'bracketed':
+                tree = json.dumps(to_bracketed(parser.build_parse_tree()), ensure_ascii=False)
+            else:
+                tree = to_json(parser.build_parse_tree(), ensure_ascii=False)
+            text = f'{text[:-1]}, "tree": {tree}}}'
+
+        output.write(text + "\n")
+        output.flush()
+        count += 1
+    return count
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(
+        description="Analiza sentencias con el algoritmo CYK y escribe JSON Lines"
+    )
+    arg_parser.add_argument('--grammar', choices=['archivo', 'proyecto'], default='proyecto',
+                            help="gramática desde archivo o la predefinida del proyecto")
+    arg_parser.add_argument('--grammar-file', default='grammar.txt',
+                            help="archivo de gramática para --grammar archivo")
+    arg_parser.add_argument('--input', default='-',
+                            help="archivo con una sentencia por línea ('-' para stdin)")
+    arg_parser.add_argument('--optimize', action='store_true',
+                            help="optimizar la gramática en CNF (símbolos inútiles, variables equivalentes)")
+    arg_parser.add_argument('--engine', choices=sorted(ENGINES) + [AUTO_ENGINE], default=None,
+                            help="motor de parsing ('auto': el que recomienda el perfil de la gramática)")
+    arg_parser.add_argument('--cache', type=int, default=0, metavar='N',
+                            help="caché LRU de resultados con N entradas (0 = sin caché)")
+    arg_parser.add_argument('--metrics', choices=['json', 'prometheus'], default=None,
+                            help="al terminar, escribir las métricas por stderr en este formato")
+    arg_parser.add_argument('--span-memo', type=int, default=0, metavar='N',
+                            help="memoria de frases entre sentencias con N celdas (0 = sin memoria)")
+    arg_parser.add_argument('--recognize-only', action='store_true',
+                            help="solo aceptar/rechazar, sin back-pointers (incompatible con --trees)")
+    arg_parser.add_argument('--viterbi', action='store_true',
+                            help="PCFG: mejor árbol por probabilidad (motor 'sets')")
+    arg_parser.add_argument('--beam', type=int, default=None, metavar='N',
+                            help="con --viterbi, máximo de entradas por celda")
+    arg_parser.add_argument('--threshold', type=float, default=None, metavar='P',
+                            help="con --viterbi, descartar entradas con menos de P veces la mejor de su celda")
+    arg_parser.add_argument('--trees', action='store_true',
+                            help="incluir el parse tree de las sentencias aceptadas")
+    arg_parser.add_argument('--tree-format', choices=['json', 'bracketed'], default='json',
+                            help="formato del parse tree con --trees")
+    args = arg_parser.parse_args(argv)
+    if args.recognize_only and args.trees:
+        arg_parser.error("--recognize-only no construye parse trees")
+    if (args.beam is not None or args.threshold is not None) and not args.viterbi:
+        arg_parser.error("--beam y --threshold requieren --viterbi")
+    original = args.engine in ORIGINAL_GRAMMAR_ENGINES
+    if original and (args.optimize or args.recognize_only or args.viterbi or args.span_memo):
+        arg_parser.error(f"--optimize, --recognize-only, --viterbi y --span-memo no se usan "
+                         f"con --engine {args.engine}")
+
+    try:
+        grammar = load_grammar(args.grammar, args.grammar_file, cnf=not original)
+    except (OSError, ValueError) as error:
+        print(f"Error al cargar la gramática: {error}", file=sys.stderr)
+        return 1
+
+    if args.optimize:
+        print(f"Optimización: {optimize_grammar(grammar)}", file=sys.stderr)
+
+    cache = ParseCache(args.cache) if args.cache > 0 else None
+    options = {"cache": cache}
+    if args.metrics is not None:
+        options["metrics"] = REGISTRY
+    span_memo = SpanMemo(args.span_memo) if args.span_memo > 0 else None
+    if span_memo is not None:
+        options["span_memo"] = span_memo
+    if args.recognize_only:
+        options["recognize_only"] = True
+    if args.viterbi:
+        options.update(viterbi=True, beam=args.beam, threshold=args.threshold)
+    try:
+        parser = create_parser(grammar, args.engine, **options)
+    except ValueError as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+
+    if args.input == '-':
+        parse_stream(parser, sys.stdin, sys.stdout, args.trees, args.tree_format)
+    else:
+        with open(args.input, 'r', encoding='utf-8') as file:
+            parse_stream(parser, file, sys.stdout, args.trees, args.tree_format)
+
+    if cache is not None:
+        print(f"Caché: {cache.stats()}", file=sys.stderr)
+    if span_memo is not None:
+        print(f"Memoria de frases: {span_memo.stats()}", file=sys.stderr)
+    if args.metrics == 'json':
+        print(REGISTRY.export_json_text(), file=sys.stderr)
+    elif args.metrics == 'prometheus':
+        print(REGISTRY.export_prometheus(), end='', file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
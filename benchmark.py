@@ -0,0 +1,686 @@
+"""
+Benchmarks de rendimiento del parser CYK
+
+Suites disponibles:
+    project    Tiempo y memoria pico de CYKParser.parse contra la longitud de la
+               sentencia, con sentencias de la gramática del proyecto donde las
+               cadenas de 'VP -> VP PP' generan mucha ambigüedad
+    synthetic  Tiempo y memoria pico contra el tamaño de gramáticas sintéticas
+               en CNF (variables, terminales y reglas binarias configurables)
+    cnf        Tiempo y memoria pico de Grammar.to_cnf contra el número de reglas
+    cnf_large  Grammar.to_cnf sobre gramáticas de 10 000 a 100 000 reglas
+    index      Llenado con índices de reglas contra el recorrido completo de la
+               gramática por celda
+    engines    Todos los motores sobre la misma gramática en CNF
+    optimize   Tamaño de la gramática y tiempo de parsing antes y después de
+               optimize_grammar
+    recognize  Parser completo contra el modo reconocedor (recognize_only)
+    viterbi    CYK Viterbi (PCFG) sin poda y con beam / umbral por celda
+    parallel   Llenado secuencial contra el paralelo por niveles (sentencias
+               de 300+ tokens; la aceleración depende de los núcleos)
+    earley     Earley sobre la gramática original contra CYK sobre la CNF,
+               por tamaño de gramática y por longitud de sentencia
+    span_memo  Corpus con frases compartidas sin y con SpanMemo (hit rate)
+    profile    Tiempo estimado por profile_grammar contra el medido para cada
+               motor, y el motor que elige engine='auto'
+    edit       reparse_edit() después de cambiar, insertar o borrar un token
+               contra parse() de la sentencia editada
+
+Los resultados se pueden guardar en JSON y comparar con una corrida anterior
+para detectar regresiones entre commits.
+
+Uso:
+    python benchmark.py
+    python benchmark.py --suite project --suite cnf --output resultados.json
+    python benchmark.py --compare base.json --tolerance 0.25
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from cyk_parser import CYKParser
+from engines import AUTO_ENGINE, CYK_ENGINES, ENGINES, create_parser
+from grammar import Grammar
+from grammar_optimizer import optimize_grammar
+from grammar_profiler import profile_grammar, sample_sentences
+from project_grammar import create_project_grammar
+from span_memo import SpanMemo
+
+
+# ---------------------------------------------------------------------------
+# Generadores de gramáticas y sentencias
+# ---------------------------------------------------------------------------
+
+def create_synthetic_grammar(num_variables: int, num_terminals: int,
+                             num_binary_rules: int, seed: int = 0) -> Grammar:
+    """Crea una gramática aleatoria que ya está en CNF"""
+    rng = random.Random(seed)
+    variables = ['S'] + [f"N{i}" for i in range(1, num_variables)]
+    terminals = [f"t{i}" for i in range(num_terminals)]
+
+    g = Grammar()
+    for _ in range(num_binary_rules):
+        g.add_rule(rng.choice(variables), [rng.choice(variables), rng.choice(variables)])
+    # Cada terminal pertenece a una o dos clases léxicas
+    for terminal in terminals:
+        for variable in rng.sample(variables, rng.randint(1, 2)):
+            g.add_rule(variable, [terminal])
+    return g
+
+
+def create_random_cfg(num_variables: int, num_terminals: int, num_rules: int,
+                      seed: int = 0, unit_ratio: float = 0.15) -> Grammar:
+    """
+    Crea una gramática aleatoria que NO está en CNF: mezcla reglas unitarias
+    (una fracción unit_ratio de las reglas), reglas con terminales y
+    variables, y producciones de hasta 4 símbolos.
+    """
+    rng = random.Random(seed)
+    variables = ['S'] + [f"N{i}" for i in range(1, num_variables)]
+    terminals = [f"t{i}" for i in range(num_terminals)]
+
+    g = Grammar()
+    for terminal in terminals:
+        g.add_rule(rng.choice(variables), [terminal])
+    for _ in range(max(0, num_rules - num_terminals)):
+        head = rng.randrange(num_variables - 1)
+        if rng.random() < unit_ratio:
+            # Reglas unitarias solo hacia variables posteriores (sin ciclos)
+            production = [variables[rng.randrange(head + 1, num_variables)]]
+        else:
+            size = rng.randint(2, 4)
+            production = [rng.choice(terminals) if rng.random() < 0.2 else rng.choice(variables)
+                          for _ in range(size)]
+        g.add_rule(variables[head], production)
+    return g
+
+
+def random_sentence(grammar: Grammar, length: int, seed: int = 0) -> str:
+    """Sentencia aleatoria de `length` terminales de la gramática"""
+    rng = random.Random(seed)
+    terminals = sorted(grammar.terminals)
+    return ' '.join(rng.choice(terminals) for _ in range(length))
+
+
+def project_sentence(length: int, seed: int = 0) -> str:
+    """
+    Sentencia aceptada por la gramática del proyecto con al menos `length`
+    palabras: 'NP V NP' seguida de frases preposicionales ('with a fork').
+    Cada PP encadenada aumenta la ambigüedad por 'VP -> VP PP'.
+    """
+    rng = random.Random(seed)
+    nouns = ['cat', 'dog', 'beer', 'cake', 'juice', 'meat', 'soup', 'fork', 'knife', 'oven', 'spoon']
+
+    def noun_phrase():
+        return [rng.choice(['a', 'the']), rng.choice(nouns)]
+
+    words = [rng.choice(['he', 'she'])]
+    words.append(rng.choice(['cooks', 'drinks', 'eats', 'cuts']))
+    words += noun_phrase()
+    while len(words) < length:
+        words.append(rng.choice(['in', 'with']))
+        words += noun_phrase()
+    return ' '.join(words)
+
+
+def naive_fill(grammar: Grammar, words: list) -> list:
+    """Llenado de referencia: recorre todas las reglas en cada celda y partición"""
+    n = len(words)
+    table = [[set() for _ in range(n)] for _ in range(n)]
+    for i, word in enumerate(words):
+        for variable, productions in grammar.rules.items():
+            for prod in productions:
+                if len(prod) == 1 and prod[0] == word:
+                    table[i][0].add(variable)
+    for length in range(2, n + 1):
+        for i in range(n - length + 1):
+            j = length - 1
+            for k in range(1, length):
+                left_vars = table[i][k-1]
+                right_vars = table[i+k][j-k]
+                for variable, productions in grammar.rules.items():
+                    for prod in productions:
+                        if len(prod) == 2 and prod[0] in left_vars and prod[1] in right_vars:
+                            table[i][j].add(variable)
+    return table
+
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def measure(function, repeat: int = 3, setup=None) -> dict:
+    """
+    Mide el mejor tiempo de `repeat` ejecuciones y la memoria pico de una
+    ejecución adicional (tracemalloc se mide aparte porque ralentiza).
+
+    setup(), si se da, devuelve los argumentos de cada ejecución y no se mide.
+    """
+    best = None
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        _, elapsed = _timed(function, *args)
+        best = elapsed if best is None else min(best, elapsed)
+
+    args = setup() if setup else ()
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"time": best, "peak_kib": peak / 1024}
+
+
+def _print_table(title: str, records: list, columns: list):
+    print(f"\n{title}")
+    print("  " + " ".join(f"{name:>13}" for name, _ in columns))
+    for record in records:
+        cells = []
+        for _, key in columns:
+            value = record[key]
+            cells.append(f"{value:>13.5f}" if isinstance(value, float) else f"{value!s:>13}")
+        print("  " + " ".join(cells))
+
+
+# ---------------------------------------------------------------------------
+# Suites
+# ---------------------------------------------------------------------------
+
+def bench_project(lengths=(4, 10, 19, 28, 40), repeat: int = 3) -> list:
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    records = []
+    for length in lengths:
+        sentence = project_sentence(length)
+        for engine in CYK_ENGINES:
+            parser = create_parser(grammar, engine)
+            result = measure(lambda: parser.parse(sentence), repeat)
+            records.append({"suite": "project", "engine": engine,
+                            "length": len(sentence.split()), **result})
+    _print_table("Gramática del proyecto: longitud de la sentencia", records,
+                 [("motor", "engine"), ("longitud", "length"),
+                  ("tiempo (s)", "time"), ("memoria KiB", "peak_kib")])
+    return records
+
+
+def bench_synthetic(sizes=((20, 100, 60), (40, 500, 300), (80, 2000, 1200)),
+                    length: int = 25, repeat: int = 3) -> list:
+    records = []
+    for num_variables, num_terminals, num_binary in sizes:
+        grammar = create_synthetic_grammar(num_variables, num_terminals, num_binary)
+        sentence = random_sentence(grammar, length)
+        for engine in CYK_ENGINES:
+            parser = create_parser(grammar, engine)
+            parser.parse(sentence)  # Índices fuera de la medición
+            result = measure(lambda: parser.parse(sentence), repeat)
+            records.append({"suite": "synthetic", "engine": engine,
+                            "variables": num_variables, "terminals": num_terminals,
+                            "binary_rules": num_binary, "length": length, **result})
+    _print_table("Gramáticas sintéticas en CNF: tamaño de la gramática", records,
+                 [("motor", "engine"), ("variables", "variables"),
+                  ("terminales", "terminals"), ("reglas", "binary_rules"),
+                  ("tiempo (s)", "time"), ("memoria KiB", "peak_kib")])
+    return records
+
+
+def bench_cnf(sizes=((20, 50, 200), (40, 100, 500), (50, 200, 1000)),
+              repeat: int = 3, unit_ratio: float = 0.15, suite: str = "cnf") -> list:
+    records = []
+    for num_variables, num_terminals, num_rules in sizes:
+        result = measure(lambda grammar: grammar.to_cnf(), repeat,
+                         setup=lambda: (create_random_cfg(num_variables, num_terminals, num_rules,
+                                                          unit_ratio=unit_ratio),))
+        records.append({"suite": suite, "variables": num_variables,
+                        "terminals": num_terminals, "rules": num_rules, **result})
+    _print_table("Grammar.to_cnf: tamaño de la gramática", records,
+                 [("variables", "variables"), ("terminales", "terminals"),
+                  ("reglas", "rules"), ("tiempo (s)", "time"), ("memoria KiB", "peak_kib")])
+    return records
+
+
+def bench_cnf_large(sizes=((1000, 2000, 10000), (3000, 5000, 30000), (10000, 10000, 100000)),
+                    repeat: int = 1) -> list:
+    """to_cnf() sobre gramáticas de 10 000 a 100 000 reglas"""
+    return bench_cnf(sizes, repeat, unit_ratio=0.1, suite="cnf_large")
+
+
+def bench_index(sizes=((20, 100, 60), (40, 2000, 150), (80, 20000, 400)),
+                length: int = 20) -> list:
+    records = []
+    for num_variables, num_terminals, num_binary in sizes:
+        grammar = create_synthetic_grammar(num_variables, num_terminals, num_binary)
+        sentence = random_sentence(grammar, length)
+
+        naive_table, naive_time = _timed(naive_fill, grammar, sentence.split())
+
+        parser = CYKParser(grammar)
+        _, indexed_time = _timed(parser.parse, sentence)
+
+        assert parser.table == naive_table, "Las celdas difieren del recorrido completo"
+        records.append({"suite": "index", "variables": num_variables,
+                        "terminals": num_terminals, "binary_rules": num_binary,
+                        "naive_time": naive_time, "time": indexed_time,
+                        "speedup": naive_time / indexed_time})
+    _print_table("Índices de reglas contra recorrido completo", records,
+                 [("variables", "variables"), ("terminales", "terminals"),
+                  ("reglas", "binary_rules"), ("recorrido (s)", "naive_time"),
+                  ("índices (s)", "time"), ("aceleración", "speedup")])
+    return records
+
+
+def bench_engines(sizes=((30, 200, 300), (60, 500, 1500)), length: int = 40,
+                  repeat: int = 3) -> list:
+    records = []
+    for num_variables, num_terminals, num_binary in sizes:
+        grammar = create_synthetic_grammar(num_variables, num_terminals, num_binary)
+        sentence = random_sentence(grammar, length)
+        for engine in ENGINES:
+            parser = create_parser(grammar, engine)
+            parser.parse(sentence)  # Calentamiento (índices compilados)
+            result = measure(lambda: parser.parse(sentence), repeat)
+            records.append({"suite": "engines", "engine": engine,
+                            "variables": num_variables, "binary_rules": num_binary,
+                            "length": length, **result})
+    _print_table("Motores de parsing", records,
+                 [("motor", "engine"), ("variables", "variables"), ("reglas", "binary_rules"),
+                  ("tiempo (s)", "time"), ("memoria KiB", "peak_kib")])
+    return records
+
+
+def bench_optimize(sizes=((20, 50, 200), (40, 100, 500), (50, 200, 1000)), length: int = 10,
+                   repeat: int = 3) -> list:
+    records = []
+    for num_variables, num_terminals, num_rules in sizes:
+        grammar = create_random_cfg(num_variables, num_terminals, num_rules)
+        grammar.to_cnf()
+        optimized = create_random_cfg(num_variables, num_terminals, num_rules)
+        optimized.to_cnf()
+        report = optimize_grammar(optimized)
+        sentence = random_sentence(grammar, length)
+
+        for engine in CYK_ENGINES:
+            parser = create_parser(grammar, engine)
+            optimized_parser = create_parser(optimized, engine)
+            # Calentamiento, y el resultado no debe cambiar
+            assert parser.parse(sentence)[0] == optimized_parser.parse(sentence)[0]
+            before = measure(lambda: parser.parse(sentence), repeat)
+            after = measure(lambda: optimized_parser.parse(sentence), repeat)
+            records.append({"suite": "optimize", "engine": engine, "rules": num_rules,
+                            "cnf_rules": report["rules_before"],
+                            "optimized_rules": report["rules_after"],
+                            "time_before": before["time"], "time": after["time"],
+                            "speedup": before["time"] / after["time"]})
+    _print_table("Optimización de la gramática en CNF", records,
+                 [("motor", "engine"), ("reglas", "rules"), ("CNF", "cnf_rules"),
+                  ("optimizada", "optimized_rules"), ("antes (s)", "time_before"),
+                  ("después (s)", "time"), ("aceleración", "speedup")])
+    return records
+
+def bench_recognize(sizes=((20, 50, 200), (40, 100, 500), (50, 200, 1000)), length: int = 10,
+                    repeat: int = 3) -> list:
+    records = []
+    for num_variables, num_terminals, num_rules in sizes:
+        grammar = create_random_cfg(num_variables, num_terminals, num_rules)
+        grammar.to_cnf()
+        sentence = random_sentence(grammar, length)
+
+        for engine in CYK_ENGINES:
+            parser = create_parser(grammar, engine)
+            recognizer = create_parser(grammar, engine, recognize_only=True)
+            # Calentamiento, y el resultado no debe cambiar
+            assert parser.parse(sentence)[0] == recognizer.parse(sentence)[0]
+            before = measure(lambda: parser.parse(sentence), repeat)
+            after = measure(lambda: recognizer.parse(sentence), repeat)
+            records.append({"suite": "recognize", "engine": engine, "rules": num_rules,
+                            "length": length,
+                            "time_before": before["time"], "time": after["time"],
+                            "speedup": before["time"] / after["time"]})
+    _print_table("Modo reconocedor (recognize_only=True)", records,
+                 [("motor", "engine"), ("reglas", "rules"), ("longitud", "length"),
+                  ("parser (s)", "time_before"), ("reconocedor (s)", "time"),
+                  ("aceleración", "speedup")])
+    return records
+
+def bench_viterbi(sizes=((40, 200, 1500),), lengths=(20, 40), beams=(None, 30, 10),
+                  repeat: int = 3) -> list:
+    """Gramáticas sintéticas densas con reglas equiprobables por variable"""
+    records = []
+    for num_variables, num_terminals, num_rules in sizes:
+        grammar = create_synthetic_grammar(num_variables, num_terminals, num_rules)
+        for length in lengths:
+            sentence = random_sentence(grammar, length)
+            baseline = create_parser(grammar, 'sets')
+            baseline.parse(sentence)
+            before = measure(lambda: baseline.parse(sentence), repeat)
+            for beam in beams:
+                parser = create_parser(grammar, 'sets', viterbi=True, beam=beam)
+                accepted = parser.parse(sentence)[0]
+                result = measure(lambda: parser.parse(sentence), repeat)
+                records.append({"suite": "viterbi", "rules": num_rules, "length": length,
+                                "beam": beam or 0, "accepted": accepted,
+                                "time_before": before["time"], "time": result["time"],
+                                "speedup": before["time"] / result["time"]})
+    _print_table("CYK Viterbi (beam 0 = sin poda)", records,
+                 [("reglas", "rules"), ("longitud", "length"), ("beam", "beam"),
+                  ("aceptada", "accepted"), ("CYK (s)", "time_before"),
+                  ("Viterbi (s)", "time"), ("aceleración", "speedup")])
+    return records
+
+def bench_parallel(lengths=(320,), workers=(2, 4), repeat: int = 3) -> list:
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    records = []
+    for length in lengths:
+        sentence = project_sentence(length)
+        for engine in CYK_ENGINES:
+            serial = create_parser(grammar, engine)
+            serial.parse(sentence)
+            before = measure(lambda: serial.parse(sentence), repeat)
+            for count in workers:
+                parser = create_parser(grammar, engine, parallel_workers=count,
+                                       parallel_min_length=length)
+                # Calentamiento (inicia los workers), y la tabla debe ser la misma
+                parser.parse(sentence)
+                assert parser.chart.cells == serial.chart.cells
+                result = measure(lambda: parser.parse(sentence), repeat)
+                parser.close()
+                records.append({"suite": "parallel", "engine": engine,
+                                "length": len(sentence.split()), "workers": count,
+                                "cpus": os.cpu_count() or 1,
+                                "time_before": before["time"], "time": result["time"],
+                                "speedup": before["time"] / result["time"]})
+    _print_table("Llenado paralelo por niveles", records,
+                 [("motor", "engine"), ("longitud", "length"), ("workers", "workers"),
+                  ("núcleos", "cpus"), ("secuencial (s)", "time_before"),
+                  ("paralelo (s)", "time"), ("aceleración", "speedup")])
+    return records
+
+def bench_earley(sizes=((20, 50, 200), (40, 100, 500), (50, 200, 1000)), length: int = 10,
+                 lengths=(10, 19, 40), repeat: int = 3) -> list:
+    """
+    Earley sobre la gramática original contra CYK ('sets' y 'bitset') sobre
+    la misma gramática en CNF: gramáticas aleatorias de tamaño creciente con
+    sentencias de `length` palabras, y la gramática del proyecto con
+    sentencias de longitud creciente.
+    """
+    cases = []
+    for num_variables, num_terminals, num_rules in sizes:
+        original = create_random_cfg(num_variables, num_terminals, num_rules)
+        cases.append(("random", num_rules, original, [random_sentence(original, length)]))
+    cases.append(("project", None, create_project_grammar(),
+                  [project_sentence(count) for count in lengths]))
+
+    records = []
+    for source, num_rules, original, sentences in cases:
+        cnf = copy.deepcopy(original)
+        cnf.to_cnf()
+        earley = create_parser(original, 'earley')
+        for sentence in sentences:
+            accepted = earley.parse(sentence)[0]
+            after = measure(lambda: earley.parse(sentence), repeat)
+            for engine in CYK_ENGINES:
+                parser = create_parser(cnf, engine)
+                # Calentamiento, y el resultado no debe cambiar
+                assert parser.parse(sentence)[0] == accepted
+                before = measure(lambda: parser.parse(sentence), repeat)
+                records.append({"suite": "earley", "grammar": source, "engine": engine,
+                                "rules": num_rules or sum(map(len, original.rules.values())),
+                                "cnf_rules": sum(map(len, cnf.rules.values())),
+                                "length": len(sentence.split()), "accepted": accepted,
+                                "time_before": before["time"], "time": after["time"],
+                                "speedup": before["time"] / after["time"]})
+    _print_table("Earley (gramática original) contra CYK (CNF)", records,
+                 [("gramática", "grammar"), ("reglas", "rules"), ("CNF", "cnf_rules"),
+                  ("longitud", "length"), ("aceptada", "accepted"), ("motor CYK", "engine"),
+                  ("CYK (s)", "time_before"), ("Earley (s)", "time"), ("aceleración", "speedup")])
+    return records
+
+def bench_span_memo(sizes=((40, 200, 1500),), phrases: int = 12, phrase_length: int = 5,
+                    sentences: int = 40, repeat: int = 3) -> list:
+    """
+    Corpus con frases compartidas: sentencias de la gramática del proyecto
+    (cadenas de PP como 'with a fork') y sentencias de gramáticas sintéticas
+    armadas con 3 frases de un conjunto chico. Se analiza el corpus completo
+    sin y con SpanMemo (la memoria empieza vacía en cada repetición).
+    """
+    corpora = [("project", create_project_grammar(), [project_sentence(length, seed)
+                                                       for length in (10, 19, 28)
+                                                       for seed in range(sentences // 3)])]
+    corpora[0][1].to_cnf()
+    for num_variables, num_terminals, num_rules in sizes:
+        grammar = create_synthetic_grammar(num_variables, num_terminals, num_rules)
+        rng = random.Random(0)
+        pool = [random_sentence(grammar, phrase_length, seed) for seed in range(phrases)]
+        corpus = [' '.join(rng.choice(pool) for _ in range(3)) for _ in range(sentences)]
+        corpora.append((f"synthetic-{num_rules}", grammar, corpus))
+
+    records = []
+    for source, grammar, corpus in corpora:
+        for engine in CYK_ENGINES:
+            parser = create_parser(grammar, engine)
+
+            def parse_with_memo(memo):
+                memo_parser = create_parser(grammar, engine, span_memo=memo)
+                for sentence in corpus:
+                    memo_parser.parse(sentence)
+
+            memo = SpanMemo()
+            parse_with_memo(memo)  # Calentamiento (índices compilados) y hit rate
+            before = measure(lambda: [parser.parse(sentence) for sentence in corpus], repeat)
+            after = measure(parse_with_memo, repeat, setup=lambda: (SpanMemo(),))
+            records.append({"suite": "span_memo", "grammar": source, "engine": engine,
+                            "sentences": len(corpus), "hit_rate": memo.stats()["hit_rate"],
+                            "time_before": before["time"], "time": after["time"],
+                            "speedup": before["time"] / after["time"]})
+    _print_table("Memoria de frases entre sentencias (SpanMemo)", records,
+                 [("gramática", "grammar"), ("motor", "engine"), ("sentencias", "sentences"),
+                  ("hit rate", "hit_rate"), ("sin memoria (s)", "time_before"),
+                  ("con memoria (s)", "time"), ("aceleración", "speedup")])
+    return records
+
+
+def bench_profile(sizes=((20, 100, 60), (40, 200, 1500), (80, 2000, 1200)), lengths=(20, 40),
+                  sentences: int = 3, repeat: int = 3) -> list:
+    """
+    Estimación de profile_grammar contra el tiempo medido de cada motor con
+    derivaciones aleatorias de la gramática (sentencias distintas de las de
+    la prueba), y el motor que elige engine='auto' (fila 'auto')
+    """
+    project = create_project_grammar()
+    project.to_cnf()
+    cases = [("project", project)]
+    for num_variables, num_terminals, num_rules in sizes:
+        cases.append((f"synthetic-{num_rules}",
+                      create_synthetic_grammar(num_variables, num_terminals, num_rules)))
+
+    records = []
+    for source, grammar in cases:
+        for length in lengths:
+            start = time.perf_counter()
+            report = profile_grammar(grammar, length=length)
+            profile_time = time.perf_counter() - start
+            corpus = sample_sentences(grammar, sentences, length, seed=1)
+            chosen = report["recommendation"]["engine"]
+            for engine in CYK_ENGINES + [AUTO_ENGINE]:
+                parser = create_parser(grammar, chosen if engine == AUTO_ENGINE else engine,
+                                       **(report["recommendation"]["options"]
+                                          if engine == AUTO_ENGINE else {}))
+                parser.parse(corpus[0])  # Calentamiento (índices compilados)
+                result = measure(lambda: [parser.parse(sentence) for sentence in corpus], repeat)
+                records.append({"suite": "profile", "grammar": source, "length": length,
+                                "engine": engine, "chosen": chosen if engine == AUTO_ENGINE else "",
+                                "estimate": report["estimate"]["time"][
+                                    chosen if engine == AUTO_ENGINE else engine],
+                                "time": result["time"] / len(corpus),
+                                "profile_time": profile_time})
+    _print_table("Perfil de costo: tiempo estimado contra medido por sentencia", records,
+                 [("gramática", "grammar"), ("longitud", "length"), ("motor", "engine"),
+                  ("elegido", "chosen"), ("estimado (s)", "estimate"), ("medido (s)", "time"),
+                  ("perfil (s)", "profile_time")])
+    return records
+
+
+def bench_edit(length: int = 40, dense_length: int = 24, repeat: int = 3) -> list:
+    """
+    Edición de un token en medio y cerca del final de una sentencia de la
+    gramática del proyecto y de una gramática sintética densa (1500 reglas):
+    reparse_edit() desde la tabla de la sentencia original contra parse()
+    de la sentencia editada
+    """
+    project = create_project_grammar()
+    project.to_cnf()
+    words = project_sentence(length).split()
+    middle = len(words) // 2
+    # Sustantivo más cercano al medio (en project_sentence, el token después del artículo)
+    noun = next(i for i in range(middle, len(words)) if words[i - 1] in ('a', 'the'))
+    dense = create_synthetic_grammar(40, 200, 1500)
+    dense_words = random_sentence(dense, dense_length).split()
+    dense_middle = dense_length // 2
+    cases = [
+        ("project", project, words, [("replace", noun, "knife"), ("replace", middle, "with"),
+                                      ("insert", middle, "a"), ("delete", middle, None),
+                                      ("replace", len(words) - 1, "fork")]),
+        ("synthetic-1500", dense, dense_words, [("replace", dense_middle, dense_words[0]),
+                                                 ("insert", dense_middle, dense_words[0]),
+                                                 ("delete", dense_middle, None),
+                                                 ("replace", dense_length - 2, dense_words[0])]),
+    ]
+
+    records = []
+    for source, grammar, original, edits in cases:
+        sentence = ' '.join(original)
+        for engine in CYK_ENGINES:
+            for operation, position, word in edits:
+                def edited_parser():
+                    parser = create_parser(grammar, engine)
+                    parser.parse(sentence)
+                    return (parser,)
+
+                parser = edited_parser()[0]
+                accepted = parser.reparse_edit(operation, position, word)[0]
+                edited = ' '.join(parser.words)
+                full = create_parser(grammar, engine)
+                assert full.parse(edited)[0] == accepted
+                before = measure(lambda: full.parse(edited), repeat)
+                after = measure(lambda parser: parser.reparse_edit(operation, position, word),
+                                repeat, setup=edited_parser)
+                records.append({"suite": "edit", "grammar": source, "engine": engine,
+                                "length": len(original), "operation": operation,
+                                "position": position, "accepted": accepted,
+                                "time_before": before["time"], "time": after["time"],
+                                "speedup": before["time"] / after["time"]})
+    _print_table("Reanálisis después de editar un token (reparse_edit)", records,
+                 [("gramática", "grammar"), ("motor", "engine"), ("tokens", "length"),
+                  ("edición", "operation"), ("posición", "position"), ("aceptada", "accepted"),
+                  ("parse (s)", "time_before"), ("reparse_edit (s)", "time"),
+                  ("aceleración", "speedup")])
+    return records
+
+
+SUITES = {
+    'project': bench_project,
+    'synthetic': bench_synthetic,
+    'cnf': bench_cnf,
+    'cnf_large': bench_cnf_large,
+    'index': bench_index,
+    'engines': bench_engines,
+    'optimize': bench_optimize,
+    'recognize': bench_recognize,
+    'viterbi': bench_viterbi,
+    'parallel': bench_parallel,
+    'earley': bench_earley,
+    'span_memo': bench_span_memo,
+    'profile': bench_profile,
+    'edit': bench_edit,
+}
+
+
+# ---------------------------------------------------------------------------
+# Resultados en JSON y comparación
+# ---------------------------------------------------------------------------
+
+# Campos medidos; el resto identifica el caso de benchmark
+MEASURED_FIELDS = {"time", "peak_kib", "naive_time", "time_before", "speedup", "hit_rate",
+                   "estimate", "profile_time", "chosen"}
+
+
+def _record_key(record: dict) -> tuple:
+    return tuple(sorted((k, v) for k, v in record.items() if k not in MEASURED_FIELDS))
+
+
+def compare_results(baseline: list, current: list, tolerance: float) -> list:
+    """
+    Compara dos corridas y devuelve las regresiones: casos cuyo tiempo o
+    memoria pico creció más que `tolerance` (fracción, 0.2 = 20 %).
+    """
+    previous = {_record_key(record): record for record in baseline}
+    regressions = []
+    for record in current:
+        old = previous.get(_record_key(record))
+        if old is None:
+            continue
+        for metric in ("time", "peak_kib"):
+            if metric in record and old.get(metric):
+                ratio = record[metric] / old[metric]
+                if ratio > 1 + tolerance:
+                    regressions.append({"case": dict(_record_key(record)), "metric": metric,
+                                        "before": old[metric], "after": record[metric],
+                                        "ratio": ratio})
+    return regressions
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Benchmarks del parser CYK")
+    arg_parser.add_argument('--suite', action='append', choices=sorted(SUITES),
+                            help="suite a ejecutar (se puede repetir; por defecto todas)")
+    arg_parser.add_argument('--output', help="guardar los resultados en este archivo JSON")
+    arg_parser.add_argument('--compare', help="archivo JSON de una corrida anterior")
+    arg_parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="aumento permitido antes de reportar regresión (0.2 = 20%%)")
+    args = arg_parser.parse_args(argv)
+
+    records = []
+    for name in args.suite or SUITES:
+        records += SUITES[name]()
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": records,
+        }
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"\nResultados guardados en '{args.output}'")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)["results"]
+        regressions = compare_results(baseline, records, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regresiones (tolerancia {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression['case']}: {regression['metric']} "
+                      f"{regression['before']:.5f} → {regression['after']:.5f} "
+                      f"({regression['ratio']:.2f}x)")
+            return 1
+        print(f"\nSin regresiones respecto a '{args.compare}'")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
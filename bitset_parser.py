@@ -0,0 +1,289 @@
+from itertools import compress
+from typing import Dict, List
+
+from chart import Chart
+from cyk_parser import CYKParser
+from grammar import Grammar
+from rule_index import ReachabilityIndex
+from tracing import SPLIT_TRIED, RULE_APPLIED, CELL_FILLED
+
+
+def _bit_count(mask: int) -> int:
+    """Número de bits en 1 (int.bit_count() solo existe desde Python 3.10)"""
+    return bin(mask).count("1")
+
+
+class BitsetIndex:
+    """
+    Gramática en CNF compilada a enteros para el motor de bitsets.
+
+    Cada variable recibe un índice pequeño y un conjunto de variables se
+    representa como un entero donde el bit b indica la variable b.
+
+    - lexical: terminal -> máscara de variables A con A -> terminal
+    - right_masks[B]: máscara de las C para las que existe alguna regla A -> B C
+    - heads[B][C]: máscara de las A con A -> B C
+    - rules_by_head[A]: ((B, C, orden), ...) para reconstruir back-pointers
+    """
+
+    def __init__(self, grammar: Grammar):
+        symbols = grammar.variables | set(grammar.rules)
+        for productions in grammar.rules.values():
+            for prod in productions:
+                if len(prod) == 2:
+                    symbols.update(prod)
+        self.symbols: List[str] = sorted(symbols)
+        self.bit: Dict[str, int] = {symbol: b for b, symbol in enumerate(self.symbols)}
+
+        size = len(self.symbols)
+        self.lexical: Dict[str, int] = {}
+        self.right_masks: List[int] = [0] * size
+        self.heads: List[Dict[int, int]] = [{} for _ in range(size)]
+        self.rules_by_head: List[list] = [[] for _ in range(size)]
+
+        order = 0
+        for variable, productions in grammar.rules.items():
+            a = self.bit[variable]
+            for prod in productions:
+                if len(prod) == 1:
+                    self.lexical[prod[0]] = self.lexical.get(prod[0], 0) | (1 << a)
+                elif len(prod) == 2:
+                    b, c = self.bit[prod[0]], self.bit[prod[1]]
+                    self.right_masks[b] |= 1 << c
+                    self.heads[b][c] = self.heads[b].get(c, 0) | (1 << a)
+                    self.rules_by_head[a].append((b, c, order))
+                order += 1
+
+        self.rules_by_head = [tuple(rules) for rules in self.rules_by_head]
+
+    def encode(self, variables) -> int:
+        """Máscara de las variables dadas (las que no están en el índice se ignoran)"""
+        mask = 0
+        for variable in variables:
+            bit = self.bit.get(variable)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def decode(self, mask: int) -> set:
+        """Convierte una máscara en el conjunto de nombres de variables"""
+        symbols = set()
+        while mask:
+            low = mask & -mask
+            symbols.add(self.symbols[low.bit_length() - 1])
+            mask ^= low
+        return symbols
+
+
+class BitsetCYKParser(CYKParser):
+    """
+    Motor CYK con celdas representadas como máscaras de bits.
+
+    chart es una tabla triangular (chart.Chart) cuyas celdas son enteros
+    con un bit por variable (0 para la celda vacía). No se guardan back-pointers: build_parse_tree los reconstruye
+    desde las máscaras y elige la misma derivación que CYKParser.
+    """
+
+    engine_name = 'bitset'
+    # Una celda es una máscara: su tamaño es el número de bits en 1
+    _cell_size = staticmethod(_bit_count)
+
+    def __init__(self, grammar: Grammar, tracer=None, cache=None, keep_all_derivations: bool = False,
+                 recognize_only: bool = False, viterbi: bool = False, beam: int = None,
+                 threshold: float = None, parallel_workers: int = 0, parallel_min_length: int = 300,
+                 span_memo=None, metrics=None):
+        if viterbi:
+            # Las máscaras no guardan una probabilidad por variable
+            raise ValueError("El motor 'bitset' no soporta el modo Viterbi (usar engine='sets')")
+        # Las derivaciones se reconstruyen siempre desde las máscaras, así que
+        # keep_all_derivations no cambia nada en este motor; recognize_only
+        # solo activa la poda por posición
+        super().__init__(grammar, tracer, cache, keep_all_derivations, recognize_only,
+                         parallel_workers=parallel_workers, parallel_min_length=parallel_min_length,
+                         span_memo=span_memo, metrics=metrics)
+        self.index = None
+        self._memo = None
+        self._prune_masks = None  # (completa, prefijo, sufijo, interior)
+        self._context_masks = None  # (ReachabilityIndex, {token: máscaras})
+
+    def _new_chart(self, n: int):
+        self.index = self.grammar.get_derived('bitset_index', BitsetIndex)
+        # B -> {máscara de C: máscara de A}; las mismas combinaciones se
+        # repiten entre celdas y se memoriza la unión de cabezas
+        self._memo = [{} for _ in self.index.right_masks]
+        self.chart = Chart(n, empty=0, with_pointers=False)
+
+    def _prepare_pruning(self):
+        reachability = self.grammar.get_derived('reachability', ReachabilityIndex)
+        encode = self.index.encode
+        if self._context_masks is None or self._context_masks[0] is not reachability:
+            # Máscaras por posición y token -> (FOLLOW, PRECEDE), una vez por gramática
+            self._prune_masks = tuple(
+                encode(variables) for variables in
+                (reachability.full, reachability.prefix, reachability.suffix, reachability.inner)
+            )
+            self._context_masks = (reachability, {})
+        masks = self._context_masks[1]
+        for word in self.words:
+            if word not in masks:
+                masks[word] = (encode(reachability.followed_by(word)),
+                               encode(reachability.preceded_by(word)))
+        self._followed = [masks[word][0] for word in self.words]
+        self._preceded = [masks[word][1] for word in self.words]
+
+    def _allowed_mask(self, i: int, end: int) -> int:
+        full, prefix, suffix, inner = self._prune_masks
+        last = self._length - 1
+        if i == 0:
+            mask = full if end == last else prefix
+        else:
+            mask = (suffix if end == last else inner) & self._preceded[i - 1]
+        if end < last:
+            mask &= self._followed[end + 1]
+        return mask
+
+    def _accepts(self, n: int) -> bool:
+        start_bit = self.index.bit.get(self.grammar.start_symbol)
+        return n > 0 and start_bit is not None and bool(self.chart.get(0, n-1) >> start_bit & 1)
+
+    def _fill_lexical(self, i: int):
+        word = self.words[i]
+        mask = self.index.lexical.get(word, 0)
+        if self._prune:
+            mask &= self._allowed_mask(i, i)
+        self.chart.set(i, 0, mask)
+        if self.tracer is not None:
+            self.tracer(CELL_FILLED, i=i, length=1, variables=self.variables_at(i, 0), word=word)
+
+    def _fill_cell(self, i: int, length: int):
+        trace = self.tracer
+        chart = self.chart
+        right_masks = self.index.right_masks
+        heads = self.index.heads
+        memo = self._memo
+
+        # Izquierdas: prefijo de la fila i; derechas: contiguas en la lista plana
+        end = i + length - 1
+        end_base = end * (end + 1) >> 1
+        lefts = chart.rows[i][:length - 1]
+        rights = chart.cells[end_base + i + 1:end_base + end + 1]
+        cell = 0
+        # Pares (B, C) examinados, solo con registro de métricas
+        count = self.metrics is not None
+        checks = 0
+
+        # Sin tracer, compress() salta en C las particiones con izquierda vacía
+        splits = range(1, length) if trace is not None else compress(range(1, length), lefts)
+        for k in splits:
+            if trace is not None:
+                trace(SPLIT_TRIED, i=i, length=length, k=k)
+            left = lefts[k - 1]
+            right = rights[k - 1]
+            if not left or not right:
+                continue
+            if count:
+                checks += _bit_count(left) * _bit_count(right)
+
+            # Para cada B de la izquierda, solo las C válidas a la derecha
+            while left:
+                low = left & -left
+                left ^= low
+                b = low.bit_length() - 1
+                matches = right_masks[b] & right
+                if not matches:
+                    continue
+                if trace is not None:
+                    self._trace_rules(i, length, k, b, matches)
+                memo_b = memo[b]
+                produced = memo_b.get(matches)
+                if produced is None:
+                    produced = 0
+                    heads_b = heads[b]
+                    rest = matches
+                    while rest:
+                        low_c = rest & -rest
+                        rest ^= low_c
+                        produced |= heads_b[low_c.bit_length() - 1]
+                    memo_b[matches] = produced
+                cell |= produced
+
+        if cell and self._prune:
+            cell &= self._allowed_mask(i, end)
+        if cell:
+            chart.set(i, length - 1, cell)
+        if count:
+            self._binary_checks += checks
+        if trace is not None:
+            trace(CELL_FILLED, i=i, length=length, variables=self.index.decode(cell))
+
+    def _trace_rules(self, i: int, length: int, k: int, b: int, matches: int):
+        """Emite RULE_APPLIED por cada par (B, C) de la máscara de coincidencias"""
+        symbols = self.index.symbols
+        heads_b = self.index.heads[b]
+        while matches:
+            low_c = matches & -matches
+            matches ^= low_c
+            c = low_c.bit_length() - 1
+            self.tracer(RULE_APPLIED, i=i, length=length, k=k, left=symbols[b],
+                        right=symbols[c], heads=self.index.decode(heads_b[c]))
+
+    @property
+    def table(self) -> list:
+        if self.chart is None:
+            return None
+        n = len(self.words)
+        return [[self.variables_at(i, j) if i + j < n else set() for j in range(n)]
+                for i in range(n)]
+
+    def variables_at(self, i: int, j: int) -> set:
+        return self.index.decode(self.chart.get(i, j))
+
+    def _derivation(self, i: int, j: int, variable: str):
+        """
+        Reconstruye el back-pointer de `variable` en la celda (i, j): la
+        última partición con alguna regla válida y, dentro de ella, la última
+        regla, igual que CYKParser.
+        """
+        rows = self.chart.rows
+        a = self.index.bit.get(variable)
+        if a is None or not rows[i][j] >> a & 1:
+            return None
+        if j == 0:
+            return (self.words[i],)
+
+        rules = self.index.rules_by_head[a]
+        for k in range(j, 0, -1):
+            left = rows[i][k-1]
+            right = rows[i+k][j-k]
+            best = None
+            for b, c, order in rules:
+                if left >> b & 1 and right >> c & 1:
+                    if best is None or best[2] < order:
+                        best = (b, c, order)
+            if best is not None:
+                symbols = self.index.symbols
+                return (symbols[best[0]], symbols[best[1]], k)
+        return None
+
+    def derivations(self, i: int, j: int, variable: str) -> list:
+        """Todas las derivaciones de `variable` en (i, j), reconstruidas desde las máscaras"""
+        rows = self.chart.rows
+        a = self.index.bit.get(variable)
+        if a is None or not rows[i][j] >> a & 1:
+            return []
+        if j == 0:
+            return [(self.words[i],)]
+
+        symbols = self.index.symbols
+        # Reglas únicas (una regla repetida en la gramática es una sola derivación)
+        rules = sorted({(b, c) for b, c, _ in self.index.rules_by_head[a]})
+        result = []
+        for k in range(1, j + 1):
+            left = rows[i][k-1]
+            right = rows[i+k][j-k]
+            if not left or not right:
+                continue
+            for b, c in rules:
+                if left >> b & 1 and right >> c & 1:
+                    result.append((symbols[b], symbols[c], k))
+        return result
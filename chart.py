@@ -0,0 +1,197 @@
+"""
+Almacenamiento compacto de la tabla CYK.
+
+Solo se usa el triángulo superior de la tabla n×n: la subcadena que empieza
+en i con longitud j+1 termina en e = i + j, y cada celda vive en una lista
+plana en la posición e·(e+1)/2 + i. Las celdas se ordenan por posición
+final, así que agregar un token al final (modo incremental) solo agrega
+celdas al final de la lista.
+
+Además de la lista plana se mantiene una fila por posición inicial
+(rows[i][j]) con referencias a los mismos objetos. Al llenar la celda
+(i, j), las celdas izquierdas de todas las particiones son el prefijo
+rows[i][:j] y las derechas son contiguas en la lista plana, así que ambas se
+recorren con slices en lugar de calcular índices por partición.
+
+Las celdas vacías no ocupan objetos: se guardan con el valor `empty`
+(None para conjuntos, 0 para máscaras de bits).
+"""
+
+from typing import Dict, List, Optional
+
+
+# Conjunto vacío compartido que se devuelve para las celdas vacías
+EMPTY = frozenset()
+
+
+def span_index(i: int, j: int) -> int:
+    """Posición en la lista plana de la celda (i, j)"""
+    end = i + j
+    return (end * (end + 1) >> 1) + i
+
+
+def triangle_size(n: int) -> int:
+    """Número de celdas de la tabla para una entrada de n tokens"""
+    return n * (n + 1) >> 1
+
+
+class BackPointer:
+    """Derivación A -> left right, con la partición en la posición relativa split"""
+
+    __slots__ = ('left', 'right', 'split')
+
+    def __init__(self, left: str, right: str, split: int):
+        self.left = left
+        self.right = right
+        self.split = split
+
+    def as_tuple(self) -> tuple:
+        return (self.left, self.right, self.split)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, BackPointer) and self.as_tuple() == other.as_tuple()
+
+    def __repr__(self) -> str:
+        return f"BackPointer({self.left!r}, {self.right!r}, {self.split})"
+
+
+class Chart:
+    """
+    Tabla CYK triangular.
+
+    cells[span_index(i, j)] y rows[i][j] son el contenido de la celda (el
+    mismo objeto). pointers[span_index(i, j)] es un diccionario variable ->
+    BackPointer, o None si la celda no tiene derivaciones binarias o la tabla
+    no guarda back-pointers. Las celdas de longitud 1 no guardan back-pointers:
+    la derivación es siempre la palabra de esa posición.
+
+    Con with_alternatives=True, alternatives[span_index(i, j)] guarda además
+    variable -> [BackPointer, ...] con todas las derivaciones binarias de la
+    celda (el bosque de análisis compartido, ver forest.py).
+
+    Con with_scores=True, scores[span_index(i, j)] guarda variable -> log
+    probabilidad de su mejor derivación (CYK Viterbi).
+    """
+
+    __slots__ = ('size', 'empty', 'cells', 'rows', 'pointers', 'alternatives', 'scores')
+
+    def __init__(self, n: int = 0, empty=None, with_pointers: bool = True,
+                 with_alternatives: bool = False, with_scores: bool = False):
+        self.size = n
+        self.empty = empty
+        self.cells: list = [empty] * triangle_size(n)
+        self.rows: List[list] = [[empty] * (n - i) for i in range(n)]
+        self.pointers: Optional[List[Optional[Dict[str, BackPointer]]]] = (
+            [None] * triangle_size(n) if with_pointers else None
+        )
+        self.alternatives: Optional[List[Optional[Dict[str, List[BackPointer]]]]] = (
+            [None] * triangle_size(n) if with_alternatives else None
+        )
+        self.scores: Optional[List[Optional[Dict[str, float]]]] = (
+            [None] * triangle_size(n) if with_scores else None
+        )
+
+    def extend(self):
+        """Agrega una posición al final (las celdas que terminan en ella)"""
+        self.size += 1
+        empty = self.empty
+        self.cells.extend([empty] * self.size)
+        for row in self.rows:
+            row.append(empty)
+        self.rows.append([empty])
+        if self.pointers is not None:
+            self.pointers.extend([None] * self.size)
+        if self.alternatives is not None:
+            self.alternatives.extend([None] * self.size)
+        if self.scores is not None:
+            self.scores.extend([None] * self.size)
+
+    def get(self, i: int, j: int):
+        """Contenido de la celda (i, j)"""
+        return self.rows[i][j]
+
+    def set(self, i: int, j: int, value, pointers: dict = None, alternatives: dict = None,
+            scores: dict = None):
+        """Guarda el contenido (y los back-pointers) de la celda (i, j)"""
+        index = span_index(i, j)
+        self.cells[index] = value
+        self.rows[i][j] = value
+        if pointers is not None:
+            self.pointers[index] = pointers
+        if alternatives is not None:
+            self.alternatives[index] = alternatives
+        if scores is not None:
+            self.scores[index] = scores
+
+    def export_cell(self, i: int, j: int) -> tuple:
+        """Contenido completo de la celda (i, j), para copiarla a otra tabla"""
+        index = span_index(i, j)
+        return (
+            self.cells[index],
+            self.pointers[index] if self.pointers is not None else None,
+            self.alternatives[index] if self.alternatives is not None else None,
+            self.scores[index] if self.scores is not None else None,
+        )
+
+    def import_cell(self, i: int, j: int, state: tuple):
+        """Copia en la celda (i, j) el contenido de export_cell()"""
+        value, pointers, alternatives, scores = state
+        self.set(i, j, value, pointers, alternatives, scores)
+
+    def _paired_lists(self, source: 'Chart') -> list:
+        """Pares (lista de esta tabla, lista de `source`) de cada dato por celda"""
+        pairs = [(self.cells, source.cells)]
+        for target, values in ((self.pointers, source.pointers),
+                               (self.alternatives, source.alternatives),
+                               (self.scores, source.scores)):
+            if target is not None:
+                pairs.append((target, values))
+        return pairs
+
+    def copy_prefix(self, source: 'Chart', end: int):
+        """Copia de `source` las celdas que terminan antes de la posición `end`"""
+        size = triangle_size(end)
+        for target, values in self._paired_lists(source):
+            target[:size] = values[:size]
+        for i in range(end):
+            self.rows[i][:end - i] = source.rows[i][:end - i]
+
+    def copy_suffix(self, source: 'Chart', start: int, shift: int = 0):
+        """
+        Copia las celdas que empiezan en `start` o después desde las celdas
+        de `source` que empiezan `shift` posiciones más adelante (con la
+        misma longitud). `source` tiene self.size + shift posiciones.
+        """
+        pairs = self._paired_lists(source)
+        for end in range(start, self.size):
+            base = triangle_size(end) + start
+            source_base = triangle_size(end + shift) + start + shift
+            count = end - start + 1
+            for target, values in pairs:
+                target[base:base + count] = values[source_base:source_base + count]
+        for i in range(start, self.size):
+            self.rows[i] = source.rows[i + shift][:]
+
+    def cell(self, i: int, j: int):
+        """Variables de la celda (i, j) en una tabla de conjuntos"""
+        return self.rows[i][j] or EMPTY
+
+    def pointer(self, i: int, j: int, variable: str) -> Optional[BackPointer]:
+        pointers = self.pointers[span_index(i, j)]
+        return pointers.get(variable) if pointers else None
+
+    def score(self, i: int, j: int, variable: str) -> Optional[float]:
+        """Log probabilidad de la mejor derivación de `variable` en (i, j), o None"""
+        scores = self.scores[span_index(i, j)]
+        return scores.get(variable) if scores else None
+
+    def pointer_alternatives(self, i: int, j: int, variable: str) -> List[BackPointer]:
+        """Todas las derivaciones binarias de `variable` en la celda (i, j)"""
+        alternatives = self.alternatives[span_index(i, j)]
+        return alternatives.get(variable, []) if alternatives else []
+
+    def to_table(self) -> list:
+        """Vista n×n al estilo table[i][j] (copia, solo para inspección)"""
+        n = self.size
+        return [[set(self.cell(i, j)) if i + j < n else set() for j in range(n)]
+                for i in range(n)]
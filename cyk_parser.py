@@ -1,163 +1,797 @@
+import heapq
+import math
 import time
+from itertools import compress
 from typing import Tuple
 from grammar import Grammar
+from chart import Chart, BackPointer, EMPTY, triangle_size
+from rule_index import ReachabilityIndex, ViterbiIndex
+from parse_cache import ParseCache, compact_tree, expand_tree
+from span_memo import SpanMemo
+from metrics import MetricsRegistry
+from forest import ParseForest
+from parallel_fill import ParallelFiller
+from base_parser import BaseParser
+from tracing import PARSE_STARTED, SPLIT_TRIED, RULE_APPLIED, CELL_FILLED, PARSE_FINISHED
 
 
-class CYKParser:
+# Ediciones de un token que acepta reparse_edit()
+EDIT_OPERATIONS = ('replace', 'insert', 'delete')
+
+
+class CYKParser(BaseParser):
+    
+    engine_name = 'sets'
     
-    def __init__(self, grammar: Grammar):
-        self.grammar = grammar
-        self.table = None
-        self.parse_tree = None
+    def __init__(self, grammar: Grammar, tracer=None, cache: ParseCache = None,
+                 keep_all_derivations: bool = False, recognize_only: bool = False,
+                 viterbi: bool = False, beam: int = None, threshold: float = None,
+                 parallel_workers: int = 0, parallel_min_length: int = 300,
+                 span_memo: SpanMemo = None, metrics: MetricsRegistry = None):
+        if viterbi and (keep_all_derivations or recognize_only):
+            raise ValueError("El modo Viterbi no se combina con keep_all_derivations ni recognize_only")
+        if beam is not None and beam < 1:
+            raise ValueError("El beam debe ser al menos 1")
+        if threshold is not None and not 0.0 < threshold <= 1.0:
+            raise ValueError("El umbral debe estar en (0, 1]")
+        if span_memo is not None and recognize_only:
+            # La poda depende de la posición del tramo en la sentencia
+            raise ValueError("La memoria de frases no se combina con recognize_only")
+        super().__init__(grammar, tracer, cache, metrics)
+        # Guardar todas las derivaciones de cada celda, no solo la elegida
+        # (necesario para parse_forest(); ver forest.py)
+        self.keep_all_derivations = keep_all_derivations
+        # Modo reconocedor: solo aceptar/rechazar, sin back-pointers y
+        # descartando las variables que no pueden llegar a un S de toda la
+        # entrada (ver ReachabilityIndex en rule_index.py)
+        self.recognize_only = recognize_only
+        self._reachability = None
+        self._prune = False  # Poda por posición (solo con n conocido, no en feed())
+        self._length = 0
+        self._followed = None  # Contexto por posición (ver _prepare_pruning)
+        self._preceded = None
+        # Modo Viterbi (PCFG): cada celda guarda la mejor log probabilidad por
+        # variable y el back-pointer de esa derivación, así que
+        # build_parse_tree() devuelve el árbol más probable. beam limita las
+        # entradas por celda a las mejores `beam`; threshold descarta las que
+        # tienen menos de threshold veces la probabilidad de la mejor de la
+        # celda. Con poda el resultado puede perder derivaciones.
+        self.viterbi = viterbi
+        self.beam = beam
+        self._log_threshold = math.log(threshold) if threshold is not None else None
+        self.threshold = threshold
+        self._viterbi_index = None
+        # Log probabilidad del mejor árbol de la última sentencia (modo Viterbi)
+        self.log_probability = None
+        # Llenado paralelo por niveles (ver parallel_fill.py): con
+        # parallel_workers > 1, las sentencias de al menos
+        # parallel_min_length tokens reparten cada nivel entre los workers
+        self.parallel_workers = parallel_workers
+        self.parallel_min_length = parallel_min_length
+        self._filler = None
+        # Memoria de frases compartida entre sentencias (ver span_memo.py):
+        # las celdas de frases ya vistas se copian en lugar de calcularse
+        self.span_memo = span_memo
+        # Trabajo del último análisis (solo se cuenta con metrics)
+        self._cells_filled = 0
+        self._binary_checks = 0
+        self.chart = None
     
     def parse(self, sentence: str) -> Tuple[bool, float]:
     
-        start_time = time.time()
+        # Reloj monotónico de alta resolución
+        start_time = time.perf_counter()
+        trace = self.tracer
         
-        # Tokenizar la sentencia
-        words = sentence.lower().split()
+        # Tokenizar la sentencia con las reglas de la gramática
+        words = self.grammar.tokenizer(sentence)
         n = len(words)
+        self.words = words
+        
+        if trace is not None:
+            trace(PARSE_STARTED, sentence=sentence, tokens=words)
+        
+        # Nada del análisis anterior sobrevive, tampoco en el rechazo temprano
+        self._cached_tree = None
+        self.log_probability = None
         
-        print(f"\nAnalizando: '{sentence}'")
-        print(f"   Tokens: {words}")
-        print(f"   Longitud: {n} palabras\n")
+        # Rechazo temprano en O(n): un token que no es terminal de ninguna
+        # regla léxica no puede derivarse, así que no se construye la tabla
+        self.unknown_token = self._find_unknown(words, self.grammar.vocabulary())
+        if self.unknown_token is not None:
+            self.chart = None
+            execution_time = time.perf_counter() - start_time
+            if trace is not None:
+                trace(PARSE_FINISHED, accepted=False, time=execution_time,
+                      unknown_token=self.unknown_token)
+            if self.metrics is not None:
+                self._record_metrics(sentence, False, execution_time)
+            return False, execution_time
+        
+        if self.cache is not None:
+            variant = ('viterbi', self.beam, self.threshold) if self.viterbi else None
+            cache_key = self.cache.make_key(self.grammar, words, variant)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                # Sentencia repetida: no se construye la tabla
+                accepted, self._cached_tree = cached[:2]
+                if self.viterbi:
+                    self.log_probability = cached[2]
+                self.chart = None
+                execution_time = time.perf_counter() - start_time
+                if trace is not None:
+                    trace(PARSE_FINISHED, accepted=accepted, time=execution_time, cached=True)
+                if self.metrics is not None:
+                    self._record_metrics(sentence, accepted, execution_time, cached=True)
+                return accepted, execution_time
         
         # Inicializar tabla CYK (programación dinámica)
-        # table[i][j] contiene el conjunto de variables que pueden derivar
-        # la subcadena desde posición i con longitud j+1
-        self.table = [[set() for _ in range(n)] for _ in range(n)]
-        self.parse_tree = [[{} for _ in range(n)] for _ in range(n)]
+        self._begin_chart(words)
+        self._cells_filled = triangle_size(n)
+        self._binary_checks = 0
         
         # Paso 1: Llenar la diagonal (subcadenas de longitud 1)
-        print("Llenando tabla CYK...")
         for i in range(n):
-            word = words[i]
-            # Buscar todas las variables que producen esta palabra
-            for variable, productions in self.grammar.rules.items():
-                for prod in productions:
-                    if len(prod) == 1 and prod[0] == word:
-                        self.table[i][0].add(variable)
-                        self.parse_tree[i][0][variable] = (word,)
-            
-            print(f"  Posición {i} ('{word}'): {self.table[i][0]}")
+            self._fill_lexical(i)
         
         # Paso 2: Llenar el resto de la tabla (subcadenas de longitud > 1)
-        for length in range(2, n + 1):  # Longitud de subcadena
-            for i in range(n - length + 1):  # Posición inicial
-                j = length - 1  # Índice en la tabla
-                
-                # Probar todas las particiones posibles
-                for k in range(1, length):  # Punto de partición
-                    # Subcadena izquierda: table[i][k-1]
-                    # Subcadena derecha: table[i+k][j-k]
-                    left_vars = self.table[i][k-1]
-                    right_vars = self.table[i+k][j-k]
-                    
-                    # Buscar reglas A -> BC donde B ∈ left_vars y C ∈ right_vars
-                    for variable, productions in self.grammar.rules.items():
-                        for prod in productions:
-                            if len(prod) == 2:
-                                B, C = prod
-                                if B in left_vars and C in right_vars:
-                                    self.table[i][j].add(variable)
-                                    self.parse_tree[i][j][variable] = (B, C, k)
-                
-                if self.table[i][j]:
-                    print(f"  Posición {i}, longitud {length}: {self.table[i][j]}")
-        
-        # Verificar si S (símbolo inicial) está en table[0][n-1]
-        accepted = self.grammar.start_symbol in self.table[0][n-1]
-        
-        end_time = time.time()
+        if self._use_parallel(n):
+            # Cada nivel (todas las celdas de una longitud) se reparte entre
+            # los workers; el resultado es el mismo que el recorrido secuencial
+            if self._filler is None:
+                self._filler = ParallelFiller(self, self.parallel_workers)
+            self._filler.fill(n)
+        elif self.span_memo is not None:
+            # Sembrar las frases conocidas y llenar solo las celdas restantes
+            seeded = self._seed_from_memo(words)
+            first = self.span_memo.min_length
+            self._cells_filled -= sum(max(0, longest - first + 1) for longest in seeded)
+            for length in range(2, n + 1):
+                for i in range(n - length + 1):
+                    # Sembradas: longitudes first..seeded[i]; las más cortas
+                    # que min_length nunca están en la memoria
+                    if not first <= length <= seeded[i]:
+                        self._fill_cell(i, length)
+            self._store_in_memo(words, seeded)
+        else:
+            for length in range(2, n + 1):  # Longitud de subcadena
+                for i in range(n - length + 1):  # Posición inicial
+                    self._fill_cell(i, length)
+        
+        # Verificar si S (símbolo inicial) deriva la sentencia completa
+        accepted = self._accepts(n)
+        if self.viterbi and accepted:
+            self.log_probability = self.chart.score(0, n - 1, self.grammar.start_symbol)
+        
+        if self.cache is not None and not (self.recognize_only and accepted):
+            # El reconocedor no tiene árbol: solo guarda los rechazos
+            tree = compact_tree(self.build_parse_tree()) if accepted else None
+            if self.viterbi:
+                self.cache.put(cache_key, (accepted, tree, self.log_probability))
+            else:
+                self.cache.put(cache_key, (accepted, tree))
+        
+        end_time = time.perf_counter()
         execution_time = end_time - start_time
         
+        if trace is not None:
+            trace(PARSE_FINISHED, accepted=accepted, time=execution_time)
+        if self.metrics is not None:
+            self._record_metrics(sentence, accepted, execution_time)
+        
         return accepted, execution_time
     
-    def build_parse_tree(self, i: int = 0, j: int = None, variable: str = None) -> dict:
-        
-        if j is None:
-            j = len(self.table) - 1
-        if variable is None:
-            variable = self.grammar.start_symbol
+    def _begin_chart(self, words: list):
+        """Tabla vacía (y datos de poda) para analizar `words` completa"""
+        n = len(words)
+        self.words = words
+        self._new_chart(n)
+        self._prune = self.recognize_only
+        self._length = n
+        if self._prune:
+            self._prepare_pruning()
+    
+    # Tamaño de una celda no vacía (número de variables)
+    _cell_size = staticmethod(len)
+    
+    def _chart_work(self) -> dict:
+        if self.chart is None:
+            return {}
+        size = self._cell_size
+        return {
+            "cyk_cells_filled_total": self._cells_filled,
+            "cyk_binary_checks_total": self._binary_checks,
+            "cyk_chart_entries_total": sum(size(cell) for cell in self.chart.cells if cell),
+        }
+    
+    def _memo_keys(self) -> tuple:
+        """(huella, variante) de las claves de la memoria de frases"""
+        # Cada motor y modo guarda celdas distintas (conjuntos o máscaras,
+        # alternativas, puntajes con o sin poda)
+        variant = ('span', type(self).__name__, self.keep_all_derivations,
+                   self.viterbi, self.beam, self.threshold)
+        return self.span_memo.fingerprint(self.grammar, variant), variant
+    
+    def _seed_from_memo(self, words: list) -> list:
+        """
+        Copia a la tabla las celdas de las frases de `words` que están en la
+        memoria. Devuelve, por posición inicial, la longitud máxima sembrada
+        (las longitudes min_length..esa están sembradas; 0 si ninguna).
+        """
+        memo = self.span_memo
+        fingerprint, variant = self._memo_keys()
+        chart = self.chart
+        n = len(words)
+        # El tramo de toda la sentencia nunca se siembra
+        longest = min(memo.max_length, n - 1)
+        seeded = [0] * n
+        first = memo.min_length
+        for i in range(n - first + 1):
+            states = memo.lookup_run(fingerprint, variant, words, i, min(longest, n - i))
+            for j, state in enumerate(states, first - 1):
+                chart.import_cell(i, j, state)
+            if states:
+                seeded[i] = first + len(states) - 1
+        return seeded
+    
+    def _store_in_memo(self, words: list, seeded: list):
+        """Guarda en la memoria las celdas de frases calculadas en este análisis"""
+        memo = self.span_memo
+        fingerprint, variant = self._memo_keys()
+        chart = self.chart
+        n = len(words)
+        for length in range(memo.min_length, min(memo.max_length, n - 1) + 1):
+            for i in range(n - length + 1):
+                if length > seeded[i]:
+                    memo.put((fingerprint, tuple(words[i:i + length]), variant),
+                             chart.export_cell(i, length - 1))
+                    memo.stored += 1
+    
+    def _use_parallel(self, n: int) -> bool:
+        # Con tracer se llena en orden, para que los eventos salgan en orden
+        return (self.parallel_workers > 1 and n >= self.parallel_min_length
+                and self.tracer is None)
+    
+    def close(self):
+        """Termina los workers del llenado paralelo, si se crearon"""
+        if self._filler is not None:
+            self._filler.close()
+            self._filler = None
+    
+    def start_incremental(self):
+        """
+        Inicia el modo incremental: la tabla queda vacía y se extiende con
+        feed() a medida que llegan los tokens, de izquierda a derecha.
+        """
+        self.words = []
+        self._cached_tree = None
+        self.log_probability = None
+        self._new_chart(0)
+        # La longitud final no se conoce: sin poda por posición
+        self._prune = False
+        self._length = 0
+    
+    def feed(self, word: str) -> bool:
+        """
+        Agrega un token al final de la entrada y llena solo las celdas que
+        terminan en él (O(n²) por token en lugar de O(n³) por prefijo).
         
-        if variable not in self.parse_tree[i][j]:
-            return {"node": variable, "children": None}
+        En modo Viterbi la aceptación, log_probability y el árbol son los
+        mismos que con parse() del prefijo.
         
-        derivation = self.parse_tree[i][j][variable]
+        Returns:
+            True si el prefijo leído hasta ahora es una sentencia completa
+        """
+        if self.chart is None:
+            self.start_incremental()
         
-        # Caso base: terminal
-        if len(derivation) == 1 and isinstance(derivation[0], str):
-            return {
-                "node": variable,
-                "terminal": derivation[0]
-            }
+        self.words.append(self.grammar.tokenizer.normalize(word))
+        n = len(self.words)
+        self._grow_chart()
+        if self.viterbi and n > 1:
+            # La celda del prefijo anterior se llenó sin poda (era la entrada
+            # completa); ahora es hija de las celdas nuevas y se poda como
+            # cualquier tramo en parse()
+            self._viterbi_prune_cell(0, n - 2)
+        # Solo la poda Viterbi usa _length: la celda (0, n-1) del prefijo no
+        # se poda (la poda por posición sigue desactivada)
+        self._length = n
         
-        # Caso recursivo: dos variables
-        if len(derivation) == 3:
-            B, C, k = derivation
-            left_tree = self.build_parse_tree(i, k-1, B)
-            # CORRECCIÓN: Calcular correctamente la longitud para el subárbol derecho
-            length = j + 1  # j es length-1, así que length = j+1
-            right_tree = self.build_parse_tree(i+k, length-k-1, C)
-            return {
-                "node": variable,
-                "left": left_tree,
-                "right": right_tree
-            }
+        position = n - 1
+        self._fill_lexical(position)
+        # Subcadenas que terminan en el nuevo token, de la más corta a la más larga
+        for length in range(2, n + 1):
+            self._fill_cell(position - length + 1, length)
         
-        return {"node": variable}
+        accepted = self._accepts(n)
+        if self.viterbi:
+            self.log_probability = (self.chart.score(0, n - 1, self.grammar.start_symbol)
+                                    if accepted else None)
+        return accepted
     
-    def print_parse_tree_compact(self, tree: dict = None, prefix: str = "", is_tail: bool = True):
+    def reparse_edit(self, operation: str, position: int, word: str = None) -> Tuple[bool, float]:
+        """
+        Vuelve a analizar la última sentencia después de editar un token:
+        'replace' cambia el token en `position` por `word`, 'insert' agrega
+        `word` antes de `position` (len(words) para agregarlo al final) y
+        'delete' quita el token en `position`.
         
-        if tree is None:
-            tree = self.build_parse_tree()
-            print("\nParse Tree:")
+        El contenido de una celda depende solo de los tokens de su tramo, así
+        que solo se recalculan las celdas cuyo tramo cubre la edición; las
+        demás se copian de la tabla anterior (corridas una posición después
+        de la edición en insert y delete). En replace, una celda que cubre la
+        edición también se copia si ninguna de sus subceldas cambió (por
+        ejemplo, al cambiar un sustantivo por otro). La aceptación y el árbol
+        son los mismos que con parse() de la sentencia editada. No usa la
+        caché de resultados, la memoria de frases ni el llenado paralelo.
         
-        node = tree["node"]
+        Returns:
+            Tupla (aceptada, tiempo de ejecución)
+        """
+        if self.recognize_only:
+            # La poda depende de la posición de cada tramo en la sentencia
+            raise ValueError("reparse_edit() no se combina con recognize_only")
+        if operation not in EDIT_OPERATIONS:
+            raise ValueError(f"Edición desconocida '{operation}'. Disponibles: {', '.join(EDIT_OPERATIONS)}")
+        if self.words is None:
+            raise ValueError("No hay una sentencia previa para editar")
+        if operation != 'delete' and word is None:
+            raise ValueError(f"La edición '{operation}' necesita el token nuevo")
+        old_words = self.words
+        old_n = len(old_words)
+        if not 0 <= position < old_n + (operation == 'insert'):
+            raise ValueError(f"Posición {position} fuera de la sentencia ({old_n} tokens)")
         
-        # Elegir el conector apropiado
-        connector = "└── " if is_tail else "├── "
+        start_time = time.perf_counter()
+        trace = self.tracer
+        # Tabla anterior (None si la sentencia vino de la caché o se rechazó
+        # por vocabulario: entonces se llena toda la tabla)
+        old_chart = self.chart if self._cached_tree is None else None
+        
+        words = list(old_words)
+        if operation == 'delete':
+            del words[position]
+        elif operation == 'replace':
+            words[position] = self.grammar.tokenizer.normalize(word)
+        else:
+            words.insert(position, self.grammar.tokenizer.normalize(word))
+        n = len(words)
+        sentence = ' '.join(words)
+        
+        if trace is not None:
+            trace(PARSE_STARTED, sentence=sentence, tokens=words)
+        self._cached_tree = None
+        self.log_probability = None
+        # A diferencia de parse(), la tabla se construye aunque haya un token
+        # desconocido, para que la próxima edición (la corrección) la reutilice
+        self.unknown_token = self._find_unknown(words, self.grammar.vocabulary())
+        # Si el token nuevo es desconocido, las celdas que lo cubren quedan vacías
+        blocked = (operation != 'delete' and self.unknown_token is not None
+                   and words[position] not in self.grammar.vocabulary())
+        
+        self._begin_chart(words)
+        chart = self.chart
+        self._cells_filled = 0
+        self._binary_checks = 0
+        # Las celdas que cubren la edición empiezan antes de right_start y
+        # terminan en `position` o después; las que terminan antes se copian
+        # tal cual y las que empiezan en right_start o después se copian
+        # corridas `shift` posiciones
+        right_start = position if operation == 'delete' else position + 1
+        shift = {'replace': 0, 'insert': -1, 'delete': 1}[operation]
+        if old_chart is not None:
+            chart.copy_prefix(old_chart, position)
+            chart.copy_suffix(old_chart, right_start, shift)
+        # Con poda Viterbi la celda de toda la sentencia no se poda, así que
+        # la de la tabla anterior no sirve para un tramo más corto, y la de
+        # toda la sentencia editada no se copia de un tramo podado
+        unpruned = self.viterbi and (self.beam is not None or self.threshold is not None)
+        # En replace, una celda que cubre la edición se recalcula solo si
+        # cambió alguna subcelda: las izquierdas están en su fila y las
+        # derechas en su columna, y todas son más cortas, así que alcanza con
+        # marcar la fila y la columna de cada celda que cambió
+        compare = operation == 'replace' and old_chart is not None
+        row_changed = [False] * n
+        column_changed = [False] * n
+        
+        for length in range(1, n + 1):
+            if old_chart is None or (unpruned and length in (old_n, n) and operation != 'replace'):
+                starts = range(n - length + 1)
+            else:
+                starts = range(max(0, position - length + 1), min(right_start, n - length + 1))
+            for i in starts:
+                end = i + length - 1
+                if blocked and i < right_start and end >= position:
+                    continue
+                if compare and length > 1 and not (row_changed[i] or column_changed[end]):
+                    chart.import_cell(i, length - 1, old_chart.export_cell(i, length - 1))
+                    continue
+                if length == 1:
+                    self._fill_lexical(i)
+                else:
+                    self._fill_cell(i, length)
+                self._cells_filled += 1
+                if compare and chart.export_cell(i, length - 1) != old_chart.export_cell(i, length - 1):
+                    row_changed[i] = column_changed[end] = True
+        
+        accepted = self.unknown_token is None and self._accepts(n)
+        if self.viterbi and accepted:
+            self.log_probability = self.chart.score(0, n - 1, self.grammar.start_symbol)
+        
+        execution_time = time.perf_counter() - start_time
+        if trace is not None:
+            trace(PARSE_FINISHED, accepted=accepted, time=execution_time)
+        if self.metrics is not None:
+            self._record_metrics(sentence, accepted, execution_time)
+        
+        return accepted, execution_time
+    
+    def _new_chart(self, n: int):
+        # Tabla triangular: chart.cell(i, j) contiene el conjunto de variables
+        # que pueden derivar la subcadena desde posición i con longitud j+1
+        if self.recognize_only:
+            self._reachability = self.grammar.get_derived('reachability', ReachabilityIndex)
+            self.chart = Chart(n, with_pointers=False)
+            return
+        if self.viterbi:
+            self._viterbi_index = self.grammar.get_derived('viterbi_index', ViterbiIndex)
+            self.chart = Chart(n, with_scores=True)
+            return
+        self.chart = Chart(n, with_alternatives=self.keep_all_derivations)
+    
+    def _prepare_pruning(self):
+        """Conjuntos de contexto por posición para la poda del reconocedor"""
+        reachability = self._reachability
+        # _followed[p]: variables que pueden terminar justo antes del token p;
+        # _preceded[p]: variables que pueden empezar justo después del token p
+        self._followed = [reachability.followed_by(word) for word in self.words]
+        self._preceded = [reachability.preceded_by(word) for word in self.words]
+    
+    def _pruned(self, variables, i: int, end: int):
+        """
+        Deja solo las variables que pueden estar en la celda [i, end] de una
+        derivación completa (cada intersección recorre el conjunto más chico)
+        """
+        variables = variables & self._reachability.allowed(i, end, self._length)
+        if variables and end < self._length - 1:
+            variables &= self._followed[end + 1]
+        if variables and i > 0:
+            variables &= self._preceded[i - 1]
+        return variables
+    
+    def _grow_chart(self):
+        """Agrega una posición al final de la tabla"""
+        self.chart.extend()
+    
+    def _accepts(self, n: int) -> bool:
+        return n > 0 and self.grammar.start_symbol in self.chart.cell(0, n-1)
+    
+    def _fill_lexical(self, i: int):
+        """Llena la celda de longitud 1 en la posición i"""
+        word = self.words[i]
+        if self.viterbi:
+            self._viterbi_lexical(i, word)
+            return
+        index = self.grammar.get_rule_index()
+        # Variables que producen esta palabra, directamente del índice léxico.
+        # No se guardan back-pointers: la derivación es siempre la palabra.
+        variables = index.lexical_variables(word)
+        if variables and self._prune:
+            variables = self._pruned(variables, i, i)
+        if variables:
+            self.chart.set(i, 0, set(variables))
         
-        # Caso terminal
-        if "terminal" in tree:
-            print(f"{prefix}{connector}{node} → '{tree['terminal']}'")
+        if self.tracer is not None:
+            self.tracer(CELL_FILLED, i=i, length=1, variables=self.chart.cell(i, 0), word=word)
+    
+    def _fill_cell(self, i: int, length: int):
+        """Llena la celda de la subcadena desde i con la longitud dada (> 1)"""
+        if self.recognize_only:
+            self._recognize_cell(i, length)
             return
+        if self.viterbi:
+            self._viterbi_cell(i, length)
+            return
+        trace = self.tracer
+        chart = self.chart
+        # Índices de reglas (se construyen una vez por gramática en CNF)
+        by_left = self.grammar.get_rule_index().by_left
+        
+        # Subcadenas izquierdas: desde i con longitud k (prefijo de la fila i).
+        # Subcadenas derechas: desde i+k hasta el final de la celda (contiguas
+        # en la lista plana, porque todas terminan en la misma posición).
+        end = i + length - 1
+        end_base = end * (end + 1) >> 1
+        lefts = chart.rows[i][:length - 1]
+        rights = chart.cells[end_base + i + 1:end_base + end + 1]
         
-        # Caso no terminal
-        print(f"{prefix}{connector}{node}")
+        cell = None
+        pointers = None
+        # Variable -> (k, orden de la regla) del back-pointer elegido
+        chosen = {}
+        keep_all = self.keep_all_derivations
+        alternatives = {} if keep_all else None
+        # Pares (B, C) examinados, solo con registro de métricas
+        count = self.metrics is not None
+        checks = 0
         
-        if "left" in tree and "right" in tree:
-            # Calcular nuevo prefijo
-            extension = "    " if is_tail else "│   "
-            new_prefix = prefix + extension
+        # Probar todas las particiones posibles. Sin tracer, compress() salta
+        # en C las particiones con la celda izquierda vacía (la mayoría en
+        # tablas dispersas).
+        splits = range(1, length) if trace is not None else compress(range(1, length), lefts)
+        for k in splits:
+            if trace is not None:
+                trace(SPLIT_TRIED, i=i, length=length, k=k)
+            left_vars = lefts[k - 1]
+            right_vars = rights[k - 1]
+            if not left_vars or not right_vars:
+                continue
+            if count:
+                checks += len(left_vars) * len(right_vars)
             
-            # Imprimir hijos
-            self.print_parse_tree_compact(tree["left"], new_prefix, False)
-            self.print_parse_tree_compact(tree["right"], new_prefix, True)
+            # Buscar reglas A -> BC solo entre los pares (B, C) de
+            # left_vars × right_vars que existen en la gramática
+            for B in left_vars:
+                by_right = by_left.get(B)
+                if not by_right:
+                    continue
+                for C in right_vars:
+                    heads = by_right.get(C)
+                    if not heads:
+                        continue
+                    if cell is None:
+                        cell = set()
+                        pointers = {}
+                    for variable, order in heads:
+                        cell.add(variable)
+                        # Conservar el mismo back-pointer que el recorrido
+                        # completo de la gramática: la última partición y,
+                        # dentro de ella, la última regla
+                        previous = chosen.get(variable)
+                        if previous is None or previous < (k, order):
+                            chosen[variable] = (k, order)
+                            pointers[variable] = BackPointer(B, C, k)
+                    if keep_all:
+                        # Una alternativa por variable aunque la regla esté repetida
+                        pointer = BackPointer(B, C, k)
+                        for variable in {variable for variable, _ in heads}:
+                            alternatives.setdefault(variable, []).append(pointer)
+                    if trace is not None:
+                        trace(RULE_APPLIED, i=i, length=length, k=k, left=B, right=C,
+                              heads={variable for variable, _ in heads})
+        
+        if cell is not None:
+            if keep_all:
+                # Orden fijo (partición, B, C), independiente del orden de
+                # iteración de los conjuntos (que cambia al copiar celdas)
+                for variable_pointers in alternatives.values():
+                    variable_pointers.sort(key=_pointer_order)
+            chart.set(i, length - 1, cell, pointers, alternatives)
+        if count:
+            self._binary_checks += checks
+        
+        if trace is not None:
+            trace(CELL_FILLED, i=i, length=length, variables=cell or EMPTY)
+    
+    def _recognize_cell(self, i: int, length: int):
+        """
+        Llenado del modo reconocedor: solo el conjunto de variables, sin
+        back-pointers, y con la poda por posición de ReachabilityIndex.
+        """
+        chart = self.chart
+        reachability = self._reachability
+        heads = reachability.heads
+        
+        end = i + length - 1
+        end_base = end * (end + 1) >> 1
+        lefts = chart.rows[i][:length - 1]
+        rights = chart.cells[end_base + i + 1:end_base + end + 1]
+        
+        cell = set()
+        count = self.metrics is not None
+        checks = 0
+        for k in compress(range(1, length), lefts):
+            right_vars = rights[k - 1]
+            if not right_vars:
+                continue
+            if count:
+                checks += len(lefts[k - 1]) * len(right_vars)
+            for B in lefts[k - 1]:
+                by_right = heads.get(B)
+                if not by_right:
+                    continue
+                for C in right_vars:
+                    found = by_right.get(C)
+                    if found:
+                        cell |= found
+        
+        if cell and self._prune:
+            cell = self._pruned(cell, i, end)
+        if cell:
+            chart.set(i, length - 1, cell)
+        if count:
+            self._binary_checks += checks
+        
+        if self.tracer is not None:
+            self.tracer(CELL_FILLED, i=i, length=length, variables=cell or EMPTY)
     
-    def print_parse_tree_improved(self, indent: int = 0, tree: dict = None):
+    def _viterbi_lexical(self, i: int, word: str):
+        """Diagonal del modo Viterbi: log probabilidad de cada A -> palabra"""
+        scores = dict(self._viterbi_index.lexical.get(word, ()))
+        if self._length != 1:
+            scores = self._beam_prune(scores)
+        if scores:
+            self.chart.set(i, 0, set(scores), scores=scores)
+        
+        if self.tracer is not None:
+            self.tracer(CELL_FILLED, i=i, length=1, variables=self.chart.cell(i, 0), word=word)
+    
+    def _viterbi_cell(self, i: int, length: int):
+        """
+        Llenado del modo Viterbi: por cada variable se conserva solo la mejor
+        log probabilidad log P(A -> B C) + score(B) + score(C) y su back-pointer.
+        """
+        chart = self.chart
+        by_left = self._viterbi_index.by_left
+        
+        # Celda izquierda (i, k-1) y derecha (i+k, length-k-1), por su
+        # posición en la lista plana (ver chart.py)
+        end = i + length - 1
+        end_base = end * (end + 1) >> 1
         
-        if tree is None:
-            tree = self.build_parse_tree()
-            print("\nParse Tree:")
+        scores = {}
+        pointers = {}
+        count = self.metrics is not None
+        checks = 0
+        for k in range(1, length):
+            left_scores = chart.scores[((i + k - 1) * (i + k) >> 1) + i]
+            if not left_scores:
+                continue
+            right_scores = chart.scores[end_base + i + k]
+            if not right_scores:
+                continue
+            if count:
+                checks += len(left_scores) * len(right_scores)
+            for B, left_score in left_scores.items():
+                by_right = by_left.get(B)
+                if not by_right:
+                    continue
+                for C, right_score in right_scores.items():
+                    heads = by_right.get(C)
+                    if not heads:
+                        continue
+                    base = left_score + right_score
+                    for variable, log_probability in heads:
+                        score = base + log_probability
+                        if score > scores.get(variable, -math.inf):
+                            scores[variable] = score
+                            pointers[variable] = BackPointer(B, C, k)
         
-        node = tree["node"]
-        prefix = "  " * indent
+        # La celda de toda la entrada no se poda: nadie la usa como hija y
+        # podarla solo podría descartar el símbolo inicial
+        if count:
+            self._binary_checks += checks
+        if not (i == 0 and length == self._length):
+            scores = self._beam_prune(scores)
+        if scores:
+            if len(pointers) > len(scores):
+                pointers = {variable: pointers[variable] for variable in scores}
+            chart.set(i, length - 1, set(scores), pointers, scores=scores)
         
-        # Caso terminal
-        if "terminal" in tree:
-            print(f"{prefix}└─ {node}")
-            print(f"{prefix}   └─ '{tree['terminal']}'")
+        if self.tracer is not None:
+            self.tracer(CELL_FILLED, i=i, length=length, variables=self.chart.cell(i, length - 1))
+    
+    def _viterbi_prune_cell(self, i: int, j: int):
+        """Aplica el beam a una celda Viterbi que se llenó sin podar"""
+        value, pointers, _, scores = self.chart.export_cell(i, j)
+        if not scores:
+            return
+        pruned = self._beam_prune(scores)
+        if len(pruned) == len(scores):
             return
+        if pointers:
+            pointers = {variable: pointers[variable] for variable in pruned if variable in pointers}
+        self.chart.set(i, j, set(pruned), pointers, scores=pruned)
+    
+    def _beam_prune(self, scores: dict) -> dict:
+        """Aplica el umbral relativo y el beam a las entradas de una celda"""
+        if not scores:
+            return scores
+        if self._log_threshold is not None:
+            cutoff = max(scores.values()) + self._log_threshold
+            scores = {variable: score for variable, score in scores.items() if score >= cutoff}
+        if self.beam is not None and len(scores) > self.beam:
+            scores = dict(heapq.nlargest(self.beam, scores.items(), key=lambda item: item[1]))
+        return scores
+    
+    @property
+    def table(self) -> list:
+        """Vista n×n de la tabla (table[i][j]), construida bajo demanda"""
+        return self.chart.to_table() if self.chart is not None else None
+    
+    def variables_at(self, i: int, j: int) -> set:
+        """Variables que derivan la subcadena desde i con longitud j+1"""
+        return self.chart.cell(i, j)
+    
+    def _derivation(self, i: int, j: int, variable: str):
+        """Back-pointer de `variable` en la celda (i, j), o None si no está"""
+        if j == 0:
+            return (self.words[i],) if variable in self.chart.cell(i, 0) else None
+        pointer = self.chart.pointer(i, j, variable)
+        return pointer.as_tuple() if pointer is not None else None
+    
+    def derivations(self, i: int, j: int, variable: str) -> list:
+        """
+        Todas las derivaciones de `variable` en la celda (i, j): [(palabra,)]
+        en la diagonal y [(B, C, k), ...] en el resto (lista vacía si la
+        variable no está en la celda). Requiere keep_all_derivations=True.
+        """
+        if j == 0:
+            return [(self.words[i],)] if variable in self.chart.cell(i, 0) else []
+        if self.chart.alternatives is None:
+            raise ValueError("El parser no guarda todas las derivaciones "
+                             "(usar keep_all_derivations=True)")
+        return [pointer.as_tuple() for pointer in self.chart.pointer_alternatives(i, j, variable)]
+    
+    def parse_forest(self) -> ParseForest:
+        """Bosque de análisis de la última sentencia (ver forest.py)"""
+        if self.chart is None:
+            raise ValueError("No hay tabla CYK (sin análisis previo o resultado tomado de la caché)")
+        if self.recognize_only:
+            raise ValueError("El modo reconocedor no guarda derivaciones (recognize_only=True)")
+        return ParseForest(self)
+    
+    def build_parse_tree(self, i: int = 0, j: int = None, variable: str = None) -> dict:
+        """
+        Árbol de derivación de `variable` sobre la celda (i, j) (por defecto
+        la sentencia completa desde el símbolo inicial). Se construye con una
+        pila explícita, así que la profundidad del árbol no está limitada por
+        el límite de recursión de Python.
+        """
         
-        # Caso con hijos
-        print(f"{prefix}└─ {node}")
+        # Resultado tomado de la caché: no hay tabla, pero sí el árbol guardado
+        if self._cached_tree is not None and i == 0 and j is None and variable is None:
+            return expand_tree(self._cached_tree)
         
-        if "left" in tree and "right" in tree:
-            # Imprimir hijo izquierdo
-            print(f"{prefix}   ├─ Left:")
-            self.print_parse_tree_improved(indent + 2, tree["left"])
+        if self.recognize_only:
+            raise ValueError("El modo reconocedor no guarda back-pointers (recognize_only=True)")
+        
+        if variable is None:
+            variable = self.grammar.start_symbol
+        
+        root = {"node": variable}
+        if self.chart is None or not self.words:
+            # Sin tabla (rechazo por vocabulario o de la caché) o sin
+            # entrada: no hay derivación
+            root["children"] = None
+            return root
+        if j is None:
+            j = len(self.words) - 1
+        
+        # Cada nodo se crea vacío ({"node": A}) y se completa al sacarlo de la pila
+        stack = [(i, j, root)]
+        while stack:
+            i, j, tree = stack.pop()
+            derivation = self._derivation(i, j, tree["node"])
             
-            # Imprimir hijo derecho
-            print(f"{prefix}   └─ Right:")
-            self.print_parse_tree_improved(indent + 2, tree["right"])
\ No newline at end of file
+            if derivation is None:
+                tree["children"] = None
+            elif len(derivation) == 1:
+                # Caso base: terminal
+                tree["terminal"] = derivation[0]
+            else:
+                # Caso recursivo: dos variables, B sobre [i, i+k) y C sobre
+                # [i+k, i+j] (longitud j+1-k)
+                B, C, k = derivation
+                left_tree = {"node": B}
+                right_tree = {"node": C}
+                tree["left"] = left_tree
+                tree["right"] = right_tree
+                stack.append((i + k, j - k, right_tree))
+                stack.append((i, k - 1, left_tree))
+        
+        return root
+
+
+def _pointer_order(pointer: BackPointer) -> tuple:
+    return (pointer.split, pointer.left, pointer.right)
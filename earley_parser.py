@@ -0,0 +1,385 @@
+"""
+Motor de parsing Earley sobre la gramática original (sin convertir a CNF).
+
+La conversión a CNF puede multiplicar las reglas (cierre de reglas unitarias,
+binarización con variables X<n>, variables T_ para terminales). Earley
+trabaja directamente sobre las producciones originales, de cualquier
+longitud y con reglas unitarias, así que la gramática no crece.
+
+- Tabla de predicción: para cada (variable, lookahead) se calculan una sola
+  vez las reglas que la predicción agrega con ese lookahead: las de todas
+  las variables de la esquina izquierda de la variable (cierre A -> B ...)
+  cuyo primer símbolo puede empezar con la palabra siguiente (conjuntos
+  FIRST). Las demás reglas nunca se agregan a los conjuntos de Earley.
+- Cada ítem (regla, punto, origen) guarda un solo back-pointer: la posición
+  donde empieza su último símbolo reconocido, registrada la primera vez que
+  se agrega el ítem.
+- El árbol se construye con la forma que tendría en la gramática en CNF
+  (la de CYKParser): las cadenas de reglas unitarias se colapsan, los
+  terminales dentro de producciones largas quedan bajo T_<terminal> y las
+  producciones de 3 o más símbolos se binarizan a la derecha con los mismos
+  nombres X<n> que generaría Grammar.to_cnf(). En sentencias ambiguas el
+  árbol elegido puede ser otro que el de CYKParser.
+
+Las producciones vacías no están soportadas (tampoco en to_cnf()).
+
+    parser = create_parser(gramatica_original, 'earley')
+    aceptada, tiempo = parser.parse("she eats a cake")
+"""
+
+import time
+from collections import defaultdict
+from typing import Tuple
+from grammar import Grammar
+from parse_cache import ParseCache, compact_tree, expand_tree
+from base_parser import BaseParser
+from metrics import MetricsRegistry
+from tracing import PARSE_STARTED, PARSE_FINISHED
+
+
+class EarleyIndex:
+    """Reglas de la gramática original y tabla de predicción de Earley.
+
+    - rules: lista de (variable, producción); el id de una regla es su
+      posición al recorrer grammar.rules
+    - terminal_flags: por regla, qué símbolos de la producción son terminales
+      (misma clasificación que Grammar.to_cnf())
+    - by_variable: variable -> ids de sus reglas
+    - vocabulary: todos los terminales que aparecen en alguna producción
+    - chain_names: (variable, producción) -> nombres X<n> que to_cnf() usa al
+      binarizar la producción
+    """
+
+    def __init__(self, grammar: Grammar):
+        variables = grammar.variables
+        terminals = grammar.terminals
+        grammar_rules = grammar.rules
+        self.rules = []
+        self.terminal_flags = []
+        self.by_variable = defaultdict(list)
+
+        terminal_cache = {}
+
+        def is_terminal(symbol: str) -> bool:
+            result = terminal_cache.get(symbol)
+            if result is None:
+                result = ((symbol.islower() or symbol in terminals) and
+                          symbol not in variables)
+                terminal_cache[symbol] = result
+            return result
+
+        vocabulary = set()
+        for variable, productions in grammar_rules.items():
+            for prod in productions:
+                if len(prod) == 1:
+                    # A -> B es unitaria si B tiene reglas; si no, A -> b
+                    # es léxica cuando b es terminal (como en to_cnf)
+                    symbol = prod[0]
+                    unit = symbol in variables and symbol in grammar_rules
+                    flags = (not unit and (symbol.islower() or symbol in terminals),)
+                else:
+                    flags = tuple(is_terminal(symbol) for symbol in prod)
+                for symbol, terminal in zip(prod, flags):
+                    if terminal:
+                        vocabulary.add(symbol)
+                self.by_variable[variable].append(len(self.rules))
+                self.rules.append((variable, prod))
+                self.terminal_flags.append(flags)
+        self.vocabulary = frozenset(vocabulary)
+
+        self._corners = {}   # variable -> variables de su esquina izquierda
+        self._first = {}     # variable -> terminales con los que puede empezar
+        self._table = {}     # (variable, lookahead) -> ids de reglas a predecir
+        self.chain_names = _binarization_names(grammar)
+
+    def left_corners(self, variable: str) -> frozenset:
+        """Variables B alcanzables desde `variable` por A -> B ... (incluida ella)"""
+        corners = self._corners.get(variable)
+        if corners is None:
+            seen = {variable}
+            stack = [variable]
+            while stack:
+                for rule_id in self.by_variable.get(stack.pop(), ()):
+                    if not self.terminal_flags[rule_id][0]:
+                        symbol = self.rules[rule_id][1][0]
+                        if symbol not in seen:
+                            seen.add(symbol)
+                            stack.append(symbol)
+            corners = frozenset(seen)
+            self._corners[variable] = corners
+        return corners
+
+    def first(self, variable: str) -> frozenset:
+        """Terminales con los que puede empezar una derivación de `variable`"""
+        first = self._first.get(variable)
+        if first is None:
+            first = frozenset(
+                self.rules[rule_id][1][0]
+                for corner in self.left_corners(variable)
+                for rule_id in self.by_variable.get(corner, ())
+                if self.terminal_flags[rule_id][0]
+            )
+            self._first[variable] = first
+        return first
+
+    def predict(self, variable: str, lookahead: str) -> tuple:
+        """Ids de las reglas que se predicen para `variable` con la palabra `lookahead`"""
+        key = (variable, lookahead)
+        rule_ids = self._table.get(key)
+        if rule_ids is None:
+            selected = []
+            for corner in sorted(self.left_corners(variable)):
+                for rule_id in self.by_variable.get(corner, ()):
+                    symbol = self.rules[rule_id][1][0]
+                    if self.terminal_flags[rule_id][0]:
+                        if symbol == lookahead:
+                            selected.append(rule_id)
+                    elif lookahead in self.first(symbol):
+                        selected.append(rule_id)
+            rule_ids = tuple(selected)
+            self._table[key] = rule_ids
+        return rule_ids
+
+
+def _binarization_names(grammar: Grammar) -> dict:
+    """
+    Nombres X<n> que to_cnf() asignaría a cada producción de 3 o más
+    símbolos: se eliminan las reglas unitarias de una copia de la gramática
+    y se recorren las reglas en el mismo orden que el paso 2 de to_cnf().
+    """
+    copy = Grammar()
+    copy.variables = set(grammar.variables)
+    copy.terminals = set(grammar.terminals)
+    copy.rules = defaultdict(list, {variable: list(productions)
+                                    for variable, productions in grammar.rules.items()})
+    copy._eliminate_unit_rules()
+
+    names = {}
+    counter = 0
+    for variable, productions in copy.rules.items():
+        for prod in productions:
+            if len(prod) > 2:
+                names[(variable, prod)] = tuple(f"X{counter + i}" for i in range(len(prod) - 2))
+                counter += len(prod) - 2
+    return names
+
+
+class EarleyParser(BaseParser):
+
+    engine_name = 'earley'
+
+    def __init__(self, grammar: Grammar, tracer=None, cache: ParseCache = None,
+                 metrics: MetricsRegistry = None):
+        super().__init__(grammar, tracer, cache, metrics)
+        # Conjuntos de Earley de la última sentencia: sets[j] es un dict
+        # (regla, punto, origen) -> posición donde empieza el último símbolo
+        # reconocido del ítem (su back-pointer)
+        self.sets = None
+        # completed[j]: (variable, origen) -> primer ítem completo de la
+        # variable sobre [origen, j)
+        self.completed = None
+
+    def _index(self) -> EarleyIndex:
+        return self.grammar.get_derived('earley_index', EarleyIndex)
+
+    def parse(self, sentence: str) -> Tuple[bool, float]:
+
+        start_time = time.perf_counter()
+        trace = self.tracer
+
+        words = self.grammar.tokenizer(sentence)
+        n = len(words)
+        self.words = words
+
+        if trace is not None:
+            trace(PARSE_STARTED, sentence=sentence, tokens=words)
+
+        self._cached_tree = None
+        self.sets = None
+        self.completed = None
+
+        # Rechazo temprano en O(n) con los terminales de la gramática original
+        index = self._index()
+        self.unknown_token = self._find_unknown(words, index.vocabulary)
+        if self.unknown_token is not None:
+            execution_time = time.perf_counter() - start_time
+            if trace is not None:
+                trace(PARSE_FINISHED, accepted=False, time=execution_time,
+                      unknown_token=self.unknown_token)
+            if self.metrics is not None:
+                self._record_metrics(sentence, False, execution_time)
+            return False, execution_time
+
+        if self.cache is not None:
+            cache_key = self.cache.make_key(self.grammar, words, ('earley',))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                accepted, self._cached_tree = cached
+                execution_time = time.perf_counter() - start_time
+                if trace is not None:
+                    trace(PARSE_FINISHED, accepted=accepted, time=execution_time, cached=True)
+                if self.metrics is not None:
+                    self._record_metrics(sentence, accepted, execution_time, cached=True)
+                return accepted, execution_time
+
+        accepted = self._recognize(index, words)
+
+        if self.cache is not None:
+            tree = compact_tree(self.build_parse_tree()) if accepted else None
+            self.cache.put(cache_key, (accepted, tree))
+
+        execution_time = time.perf_counter() - start_time
+        if trace is not None:
+            trace(PARSE_FINISHED, accepted=accepted, time=execution_time)
+        if self.metrics is not None:
+            self._record_metrics(sentence, accepted, execution_time)
+        return accepted, execution_time
+
+    def _chart_work(self) -> dict:
+        # Los conjuntos de Earley no tienen celdas: se cuentan los ítems
+        if self.sets is None:
+            return {}
+        return {"cyk_chart_entries_total": sum(map(len, self.sets))}
+
+    def _recognize(self, index: EarleyIndex, words: list) -> bool:
+        """Llena los conjuntos de Earley; True si S deriva toda la entrada"""
+        n = len(words)
+        rules = index.rules
+        terminal_flags = index.terminal_flags
+        start_symbol = self.grammar.start_symbol
+
+        sets = [{} for _ in range(n + 1)]
+        completed = [{} for _ in range(n + 1)]
+        # waiting[j]: variable -> ítems de sets[j] con el punto antes de ella
+        waiting = [defaultdict(list) for _ in range(n + 1)]
+        self.sets = sets
+        self.completed = completed
+
+        if n == 0:
+            return False
+        sets[0].update(((rule_id, 0, 0), 0) for rule_id in index.predict(start_symbol, words[0]))
+
+        for j in range(n + 1):
+            items = sets[j]
+            done = completed[j]
+            waiting_here = waiting[j]
+            predicted = set()
+            word = words[j] if j < n else None
+            following = sets[j + 1] if j < n else None
+            # El dict crece mientras se recorre: se avanza por posición
+            agenda = list(items)
+            position = 0
+            while position < len(agenda):
+                item = agenda[position]
+                position += 1
+                rule_id, dot, origin = item
+                variable, prod = rules[rule_id]
+
+                if dot == len(prod):
+                    # Completar: solo la primera vez por (variable, origen)
+                    if (variable, origin) in done:
+                        continue
+                    done[(variable, origin)] = item
+                    for parent_rule, parent_dot, parent_origin in waiting[origin].get(variable, ()):
+                        advanced = (parent_rule, parent_dot + 1, parent_origin)
+                        if advanced not in items:
+                            items[advanced] = origin
+                            agenda.append(advanced)
+                    continue
+
+                symbol = prod[dot]
+                if terminal_flags[rule_id][dot]:
+                    # Escanear
+                    if symbol == word:
+                        advanced = (rule_id, dot + 1, origin)
+                        if advanced not in following:
+                            following[advanced] = j
+                    continue
+
+                # Predecir (sin producciones vacías el origen nunca es j al completar)
+                waiting_here[symbol].append(item)
+                if word is None or symbol in predicted:
+                    continue
+                predicted.update(index.left_corners(symbol))
+                for predicted_rule in index.predict(symbol, word):
+                    new_item = (predicted_rule, 0, j)
+                    if new_item not in items:
+                        items[new_item] = j
+                        agenda.append(new_item)
+
+        return (start_symbol, 0) in completed[n]
+
+    def _children(self, prod: tuple, item: tuple, end: int) -> list:
+        """Hijos (símbolo, inicio, fin) de un ítem completo que termina en `end`"""
+        rule_id, dot, origin = item
+        children = []
+        while dot > 0:
+            split = self.sets[end][(rule_id, dot, origin)]
+            children.append((prod[dot - 1], split, end))
+            dot -= 1
+            end = split
+        children.reverse()
+        return children
+
+    def build_parse_tree(self, i: int = 0, j: int = None, variable: str = None) -> dict:
+        """
+        Árbol de derivación de `variable` sobre las palabras i..i+j (por
+        defecto la sentencia completa desde el símbolo inicial), con la forma
+        del árbol de CYKParser sobre la gramática en CNF. Se construye con
+        una pila explícita.
+        """
+
+        if self._cached_tree is not None and i == 0 and j is None and variable is None:
+            return expand_tree(self._cached_tree)
+
+        if j is None:
+            j = len(self.words) - 1
+        if variable is None:
+            variable = self.grammar.start_symbol
+
+        index = self._index()
+        root = {"node": variable}
+        if self.completed is None or i + j + 1 >= len(self.completed):
+            root["children"] = None
+            return root
+
+        # (nodo, variable cuyo ítem completo lo define, inicio, fin): en las
+        # cadenas unitarias el nodo conserva la etiqueta de arriba
+        stack = [(root, variable, i, i + j + 1)]
+        while stack:
+            tree, symbol, start, end = stack.pop()
+            item = self.completed[end].get((symbol, start))
+            if item is None:
+                tree["children"] = None
+                continue
+            rule_id = item[0]
+            flags = index.terminal_flags[rule_id]
+            children = self._children(index.rules[rule_id][1], item, end)
+
+            if len(children) == 1:
+                if flags[0]:
+                    tree["terminal"] = children[0][0]
+                else:
+                    # Regla unitaria: colapsada como en el cierre de to_cnf
+                    stack.append((tree, children[0][0], start, end))
+                continue
+
+            # Producción binarizada a la derecha: label -> c1 X0, X0 -> c2 X1, ...
+            prod = index.rules[rule_id][1]
+            names = index.chain_names[(tree["node"], prod)] if len(prod) > 2 else ()
+            current = tree
+            last = len(children) - 1
+            for position, (child, child_start, child_end) in enumerate(children):
+                node = {}
+                current["right" if position == last else "left"] = node
+                if flags[position]:
+                    node["node"] = f"T_{child}"
+                    node["terminal"] = child
+                else:
+                    node["node"] = child
+                    stack.append((node, child, child_start, child_end))
+                if position < last - 1:
+                    current["right"] = {"node": names[position]}
+                    current = current["right"]
+
+        return root
@@ -0,0 +1,51 @@
+from grammar import Grammar
+from cyk_parser import CYKParser
+from bitset_parser import BitsetCYKParser
+from earley_parser import EarleyParser
+from grammar_profiler import recommend_parser
+
+
+# Motores de parsing disponibles; todos comparten la API parse() / build_parse_tree()
+# (ver base_parser.py)
+ENGINES = {
+    'sets': CYKParser,
+    'bitset': BitsetCYKParser,
+    'earley': EarleyParser,
+}
+
+# Motores que trabajan sobre la gramática original, sin convertirla a CNF
+ORIGINAL_GRAMMAR_ENGINES = {'earley'}
+
+# Motores CYK (aceptan las opciones de CYKParser: recognize_only, viterbi, ...)
+CYK_ENGINES = [name for name in ENGINES if name not in ORIGINAL_GRAMMAR_ENGINES]
+
+# Motor que se elige según el perfil de costo de la gramática en CNF (ver grammar_profiler.py)
+AUTO_ENGINE = 'auto'
+
+
+def create_parser(grammar: Grammar, engine: str = None, **options):
+    """
+    Crea un parser para la gramática con el motor indicado.
+
+    Args:
+        grammar: Gramática en CNF ('sets', 'bitset') o la original ('earley')
+        engine: Nombre del motor ('sets', 'bitset' o 'earley'), o 'auto' para el
+            motor CYK y las opciones que recomienda el perfil de la gramática;
+            por defecto grammar.engine
+        **options: Opciones del parser (por ejemplo tracer=ConsoleTracer())
+
+    Returns:
+        Parser con la API de BaseParser
+    """
+    if engine is None:
+        engine = grammar.engine
+
+    if engine == AUTO_ENGINE:
+        engine, options = recommend_parser(grammar, **options)
+
+    if engine not in ENGINES:
+        raise ValueError(
+            f"Motor desconocido '{engine}'. Disponibles: {', '.join(sorted(ENGINES))} o '{AUTO_ENGINE}'"
+        )
+
+    return ENGINES[engine](grammar, **options)
@@ -0,0 +1,154 @@
+"""
+Bosque de análisis compartido (packed parse forest) sobre la tabla CYK.
+
+Cada nodo del bosque es un triple (i, j, variable) y sus alternativas son las
+derivaciones de parser.derivations(i, j, variable). Los subárboles iguales se
+comparten, así que el bosque ocupa O(n³·|G|) aunque el número de árboles
+crezca exponencialmente con la longitud de la sentencia.
+
+    parser = CYKParser(grammar, keep_all_derivations=True)
+    parser.parse("she eats a cake with a fork")
+    forest = parser.parse_forest()
+    forest.count()          # número de árboles distintos
+    forest.first(3)         # los primeros 3 árboles
+    for tree in forest.trees():
+        ...                 # uno a la vez, bajo demanda
+"""
+
+from itertools import islice
+from typing import Iterator, List
+
+
+class ParseForest:
+    """Bosque de la última sentencia analizada por un parser CYK"""
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.words = list(parser.words)
+        self.start_symbol = parser.grammar.start_symbol
+        # (i, j, variable) -> número de árboles del nodo
+        self._counts = {}
+
+    def _root(self, variable: str = None) -> tuple:
+        if variable is None:
+            variable = self.start_symbol
+        return (0, len(self.words) - 1, variable)
+
+    def count(self, variable: str = None) -> int:
+        """
+        Número de árboles de análisis de la sentencia completa con raíz
+        `variable` (por defecto el símbolo inicial). Programación dinámica
+        sobre el bosque: cada nodo se cuenta una sola vez.
+        """
+        if not self.words:
+            return 0
+        counts = self._counts
+        derivations = self.parser.derivations
+        root = self._root(variable)
+
+        # Recorrido en postorden con pila explícita (sin recursión)
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            if node in counts:
+                stack.pop()
+                continue
+            i, j, var = node
+            alternatives = derivations(i, j, var)
+            if j == 0:
+                counts[node] = len(alternatives)
+                stack.pop()
+                continue
+
+            pending = False
+            total = 0
+            for B, C, k in alternatives:
+                left = (i, k - 1, B)
+                right = (i + k, j - k, C)
+                left_count = counts.get(left)
+                right_count = counts.get(right)
+                if left_count is None:
+                    stack.append(left)
+                    pending = True
+                if right_count is None:
+                    stack.append(right)
+                    pending = True
+                if not pending:
+                    total += left_count * right_count
+            if not pending:
+                counts[node] = total
+                stack.pop()
+        return counts[root]
+
+    def trees(self, variable: str = None) -> Iterator[dict]:
+        """
+        Genera los árboles de análisis uno a la vez, con el mismo formato que
+        build_parse_tree(). Cada árbol se construye solo al pedirlo.
+        """
+        if not self.words:
+            return iter(())
+        return self._expand(*self._root(variable))
+
+    def first(self, k: int, variable: str = None) -> List[dict]:
+        """Los primeros k árboles de trees()"""
+        return list(islice(self.trees(variable), k))
+
+    def _expand(self, i: int, j: int, variable: str) -> Iterator[dict]:
+        """
+        Enumeración con pila explícita (sin recursión, como count()): cada
+        árbol es la secuencia en preorden de las derivaciones elegidas en sus
+        nodos, y los árboles salen en orden lexicográfico de esa secuencia
+        (la última elección cambia primero), el mismo orden que el producto
+        anidado "izquierdo × derecho" de cada nodo.
+        """
+        derivations = self.parser.derivations
+        # Nodos pendientes como lista enlazada persistente (nodo, resto):
+        # cada entrada del rastro guarda los pendientes en O(1)
+        pending = ((i, j, variable), None)
+        # Rastro en preorden: [nodo, alternativas, índice elegido, pendientes restantes]
+        trail = []
+        while True:
+            # Completar el árbol eligiendo la primera alternativa de cada nodo pendiente
+            dead_end = False
+            while pending is not None:
+                node, rest = pending
+                alternatives = derivations(*node)
+                if not alternatives:
+                    dead_end = True
+                    break
+                trail.append([node, alternatives, 0, rest])
+                pending = self._push_children(node, alternatives[0], rest)
+
+            if not dead_end:
+                yield self._build(trail)
+
+            # Retroceder hasta el último nodo con otra alternativa
+            while trail and trail[-1][2] + 1 >= len(trail[-1][1]):
+                trail.pop()
+            if not trail:
+                return
+            entry = trail[-1]
+            entry[2] += 1
+            pending = self._push_children(entry[0], entry[1][entry[2]], entry[3])
+
+    @staticmethod
+    def _push_children(node: tuple, derivation: tuple, rest):
+        i, j, _ = node
+        if j == 0:
+            return rest
+        B, C, k = derivation
+        # El hijo izquierdo se expande primero (preorden)
+        return ((i, k - 1, B), ((i + k, j - k, C), rest))
+
+    @staticmethod
+    def _build(trail: list) -> dict:
+        """Arma el árbol del rastro en preorden, recorriéndolo al revés"""
+        built = []
+        for (_, j, variable), alternatives, index, _ in reversed(trail):
+            if j == 0:
+                built.append({"node": variable, "terminal": alternatives[index][0]})
+            else:
+                left_tree = built.pop()
+                right_tree = built.pop()
+                built.append({"node": variable, "left": left_tree, "right": right_tree})
+        return built[0]
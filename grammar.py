@@ -1,7 +1,16 @@
 
 
+import hashlib
+import heapq
+import time
 from collections import defaultdict
 from typing import Dict, List, Set, Tuple
+from metrics import REGISTRY
+from rule_index import RuleIndex
+from tokenizer import Tokenizer
+
+# Versión del convertidor a CNF; cambiarla invalida las gramáticas compiladas
+CNF_CONVERTER_VERSION = 3
 
 
 class Grammar:
@@ -12,149 +21,441 @@ class Grammar:
         self.terminals = set()
         self.rules = defaultdict(list)  # Variable -> [(producción)]
         self.start_symbol = 'S'
+        self.engine = 'sets'  # Motor de parsing por defecto (ver engines.py)
+        self.tokenizer = Tokenizer()  # Reglas de tokenización (ver tokenizer.py)
+        # (Variable, producción) -> probabilidad, solo en gramáticas
+        # probabilísticas (PCFG); las reglas sin entrada reparten la masa restante
+        self.probabilities: Dict[Tuple[str, tuple], float] = {}
+        self._derived = {}  # Datos derivados de las reglas (índices, cachés)
         
-    def add_rule(self, variable: str, production: list):
-        """Agrega una regla a la gramática"""
-        self.variables.add(variable)
+    def add_rule(self, variable: str, production: list, probability: float = None):
+        """Agrega una regla a la gramática (opcionalmente con su probabilidad)"""
+        self.add_rules(((variable, production),))
+        if probability is not None:
+            self.set_probability(variable, production, probability)
+    
+    def add_rules(self, rules) -> int:
+        """
+        Agrega varias reglas (variable, producción) en orden, descartando los
+        índices derivados una sola vez al final.
         
-        # Verificar si es terminal o no
-        is_terminal = len(production) == 1 and production[0].islower()
+        Returns:
+            Número de reglas agregadas
+        """
+        variables = self.variables
+        terminals = self.terminals
+        grammar_rules = self.rules
+        count = 0
         
-        if is_terminal:
-            self.terminals.add(production[0])
-        else:
+        for variable, production in rules:
+            # Un símbolo es variable si tiene reglas propias; si aparece
+            # antes como terminal provisional, deja de serlo
+            variables.add(variable)
+            terminals.discard(variable)
+            
+            # Los símbolos sin reglas (todavía) son terminales, sin importar
+            # mayúsculas o puntuación: así coinciden con lo que produce el
+            # tokenizador ('She' con %lowercase no, '.' con %punctuation split)
             for symbol in production:
-                if symbol.isupper() or symbol == symbol.upper():
-                    self.variables.add(symbol)
+                if symbol not in variables:
+                    terminals.add(symbol)
+            
+            grammar_rules[variable].append(tuple(production))
+            count += 1
         
-        self.rules[variable].append(tuple(production))
+        self._invalidate()
+        return count
     
-    def to_cnf(self):
-        """Convierte la gramática a Forma Normal de Chomsky (CNF)"""
-        print("\nConvirtiendo gramática a CNF...")
+    def add_lexical_rules(self, variable: str, words) -> int:
+        """
+        Agrega las reglas variable -> palabra para todas las palabras de una
+        vez (carga de léxicos grandes). Las palabras son siempre terminales.
+        
+        Returns:
+            Número de reglas agregadas
+        """
+        if not isinstance(words, list):
+            words = list(words)
+        self.variables.add(variable)
+        self.terminals.update(words)
+        self.rules[variable].extend([(word,) for word in words])
+        self._invalidate()
+        return len(words)
+    
+    def set_probability(self, variable: str, production, probability: float):
+        """Asigna la probabilidad de la regla variable -> producción"""
+        self.set_probabilities({(variable, tuple(production)): probability})
+    
+    def set_probabilities(self, probabilities: dict):
+        """Asigna varias probabilidades {(variable, producción): p} de una vez"""
+        for (variable, production), probability in probabilities.items():
+            if not 0.0 < probability <= 1.0:
+                raise ValueError(
+                    f"Probabilidad inválida {probability} en {variable} -> {' '.join(production)} "
+                    f"(debe estar en (0, 1])"
+                )
+        self.probabilities.update(probabilities)
+        self._invalidate()
+    
+    def is_probabilistic(self) -> bool:
+        """True si alguna regla tiene probabilidad explícita"""
+        return bool(self.probabilities)
+    
+    def rule_probabilities(self) -> dict:
+        """
+        Probabilidad de cada regla (variable, producción), construida una sola
+        vez. Las reglas sin probabilidad explícita reparten en partes iguales
+        la masa que les queda a las de su variable (en una gramática sin
+        probabilidades, todas las reglas de una variable son equiprobables).
+        """
+        return self.get_derived('rule_probabilities', _complete_probabilities)
+    
+    def _invalidate(self):
+        """Descarta los datos derivados de las reglas (índices)"""
+        self._derived.clear()
+    
+    def get_derived(self, name: str, builder):
+        """
+        Devuelve un dato derivado de las reglas, construyéndolo con
+        builder(grammar) la primera vez. Se descarta al cambiar las reglas.
+        """
+        value = self._derived.get(name)
+        if value is None:
+            value = builder(self)
+            self._derived[name] = value
+        return value
+    
+    def fingerprint(self) -> str:
+        """
+        Huella estable (SHA-256) de las reglas y del símbolo inicial. Cambia
+        cuando cambian las reglas, por ejemplo al volver a ejecutar to_cnf().
+        """
+        return self.get_derived('fingerprint', _rules_fingerprint)
+    
+    def vocabulary(self) -> frozenset:
+        """Terminales con alguna regla léxica A -> terminal (construido una sola vez)"""
+        return self.get_derived('vocabulary', _lexical_vocabulary)
+    
+    def get_rule_index(self) -> RuleIndex:
+        """Devuelve los índices de búsqueda de reglas, construyéndolos una sola vez"""
+        return self.get_derived('rule_index', RuleIndex)
+    
+    def to_cnf(self, verbose: bool = False):
+        """
+        Convierte la gramática a Forma Normal de Chomsky (CNF)
+        
+        Args:
+            verbose: Imprimir el progreso y la gramática resultante
+        
+        El tiempo de conversión y el tamaño de la gramática resultante se
+        registran en metrics.REGISTRY.
+        """
+        if verbose:
+            print("\nConvirtiendo gramática a CNF...")
+        start_time = time.perf_counter()
+        
+        # Las probabilidades se completan antes de transformar las reglas
+        probabilities = self.rule_probabilities() if self.probabilities else None
         
         # Paso 1: Eliminar reglas unitarias (A -> B)
-        self._eliminate_unit_rules()
+        self._eliminate_unit_rules(probabilities)
+        probabilities = self.probabilities if probabilities is not None else None
         
         # Paso 2: Convertir a formato CNF estricto
         new_rules = defaultdict(list)
+        new_probabilities = {}
+        
+        def add_probability(variable: str, prod: tuple, probability: float):
+            # Si dos reglas terminan iguales se conserva la más probable (Viterbi)
+            key = (variable, prod)
+            if new_probabilities.get(key, 0.0) < probability:
+                new_probabilities[key] = probability
         new_var_counter = 0
         terminal_vars = {}  # Mapeo de terminales a variables nuevas
         
+        # Cada símbolo se clasifica una sola vez (no en cada producción)
+        variables = self.variables
+        terminals = self.terminals
+        nonterminal_cache = {}
+        terminal_cache = {}
+        
+        def is_nonterminal(symbol: str) -> bool:
+            # Un símbolo es no-terminal si está registrado en self.variables
+            # (incluye las auxiliares X0, T_) o si no es un terminal conocido;
+            # 'Xavier' o 'She' como terminales NO son variables
+            result = nonterminal_cache.get(symbol)
+            if result is None:
+                result = symbol in variables or symbol not in terminals
+                nonterminal_cache[symbol] = result
+            return result
+        
+        def replace_terminal(symbol: str) -> str:
+            # Un símbolo es terminal si está en minúscula o en terminales, y
+            # NO está en variables. Los terminales se reemplazan por T_symbol.
+            is_terminal = terminal_cache.get(symbol)
+            if is_terminal is None:
+                is_terminal = ((symbol.islower() or symbol in terminals) and
+                               symbol not in variables)
+                terminal_cache[symbol] = is_terminal
+            if not is_terminal:
+                return symbol
+            variable = terminal_vars.get(symbol)
+            if variable is None:
+                # Es terminal, crear variable nueva si no existe
+                variable = f"T_{symbol}"
+                terminal_vars[symbol] = variable
+                variables.add(variable)
+                new_rules[variable].append((symbol,))
+                if probabilities is not None:
+                    new_probabilities[(variable, (symbol,))] = 1.0
+            return variable
+        
         for variable, productions in self.rules.items():
             for prod in productions:
                 if len(prod) == 1:
                     # Regla A -> a (terminal): Ya está en CNF
-                    if prod[0].islower() or prod[0] in self.terminals:
+                    if prod[0].islower() or prod[0] in terminals:
                         new_rules[variable].append(prod)
+                        if probabilities is not None:
+                            add_probability(variable, prod, probabilities[(variable, prod)])
                 
                 elif len(prod) == 2:
-                    # CORRECCIÓN: Verificar si son variables REALES, no solo por mayúsculas
-                    # Un símbolo es no-terminal si:
-                    # 1. Está en mayúscula, O
-                    # 2. Es una variable auxiliar (X0, T_), O
-                    # 3. Está registrado en self.variables
-                    
-                    both_nonterminals = all(
-                        p.isupper() or 
-                        p.startswith('X') or 
-                        p.startswith('T_') or
-                        p in self.variables  # ← CORRECCIÓN: Verificar si es variable registrada
-                        for p in prod
-                    )
-                    
-                    if both_nonterminals:
+                    if is_nonterminal(prod[0]) and is_nonterminal(prod[1]):
                         # Ya está en CNF: A -> BC
                         new_rules[variable].append(prod)
+                        if probabilities is not None:
+                            add_probability(variable, prod, probabilities[(variable, prod)])
                     else:
                         # Tiene terminales mezclados: reemplazar terminales con variables
-                        new_prod = []
-                        for symbol in prod:
-                            # Un símbolo es terminal si:
-                            # 1. Está en minúscula Y
-                            # 2. NO está en variables Y
-                            # 3. Está en terminales
-                            is_terminal = (
-                                (symbol.islower() or symbol in self.terminals) and
-                                symbol not in self.variables  # ← CORRECCIÓN
-                            )
-                            
-                            if is_terminal:
-                                # Es terminal, crear variable nueva si no existe
-                                if symbol not in terminal_vars:
-                                    terminal_vars[symbol] = f"T_{symbol}"
-                                    self.variables.add(terminal_vars[symbol])
-                                    new_rules[terminal_vars[symbol]].append((symbol,))
-                                new_prod.append(terminal_vars[symbol])
-                            else:
-                                # Es no-terminal (variable)
-                                new_prod.append(symbol)
-                        new_rules[variable].append(tuple(new_prod))
+                        new_prod = (replace_terminal(prod[0]), replace_terminal(prod[1]))
+                        new_rules[variable].append(new_prod)
+                        if probabilities is not None:
+                            add_probability(variable, new_prod, probabilities[(variable, prod)])
                 
                 else:
                     # Regla con más de 2 símbolos: A -> X1 X2 X3 ... Xn
                     # Convertir a: A -> X1 Y1, Y1 -> X2 Y2, ..., Yn-2 -> Xn-1 Xn
                     
                     # Primero, reemplazar terminales con variables
-                    prod_list = []
-                    for symbol in prod:
-                        is_terminal = (
-                            (symbol.islower() or symbol in self.terminals) and
-                            symbol not in self.variables  # ← CORRECCIÓN
-                        )
-                        
-                        if is_terminal:
-                            if symbol not in terminal_vars:
-                                terminal_vars[symbol] = f"T_{symbol}"
-                                self.variables.add(terminal_vars[symbol])
-                                new_rules[terminal_vars[symbol]].append((symbol,))
-                            prod_list.append(terminal_vars[symbol])
-                        else:
-                            prod_list.append(symbol)
+                    prod_list = [replace_terminal(symbol) for symbol in prod]
                     
                     # Ahora dividir en reglas binarias
                     current_var = variable
                     for i in range(len(prod_list) - 2):
                         new_var = f"X{new_var_counter}"
                         new_var_counter += 1
-                        self.variables.add(new_var)
+                        variables.add(new_var)
                         
                         new_rules[current_var].append((prod_list[i], new_var))
+                        if probabilities is not None:
+                            # La probabilidad va en la primera regla; las
+                            # auxiliares X<n> tienen una sola producción
+                            add_probability(current_var, (prod_list[i], new_var),
+                                            probabilities[(variable, prod)] if i == 0 else 1.0)
                         current_var = new_var
                     
                     # Última regla
                     new_rules[current_var].append((prod_list[-2], prod_list[-1]))
+                    if probabilities is not None:
+                        add_probability(current_var, (prod_list[-2], prod_list[-1]), 1.0)
         
         self.rules = new_rules
-        print("Gramática convertida a CNF")
-        self._print_cnf_grammar()
+        if probabilities is not None:
+            self.probabilities = new_probabilities
+        self._invalidate()
+        REGISTRY.observe('cyk_cnf_seconds', time.perf_counter() - start_time)
+        REGISTRY.set_gauge('cyk_grammar_rules', sum(map(len, new_rules.values())))
+        REGISTRY.set_gauge('cyk_grammar_variables', len(new_rules))
+        REGISTRY.set_gauge('cyk_grammar_terminals', len(self.terminals))
+        if verbose:
+            print("Gramática convertida a CNF")
+            self._print_cnf_grammar()
     
-    def _eliminate_unit_rules(self):
-        """Elimina reglas unitarias (A -> B)"""
-        changed = True
-        while changed:
-            changed = False
-            new_rules = defaultdict(list)
-            
-            for variable, productions in self.rules.items():
-                for prod in productions:
-                    # CORRECCIÓN: Verificar si es unitaria chequeando self.variables
-                    if len(prod) == 1 and prod[0] in self.variables and prod[0] in self.rules:
-                        # Es regla unitaria A -> B, expandir con las reglas de B
-                        for b_prod in self.rules[prod[0]]:
-                            if b_prod not in new_rules[variable]:
-                                new_rules[variable].append(b_prod)
-                                changed = True
-                    else:
-                        # No es unitaria, mantener
-                        if prod not in new_rules[variable]:
-                            new_rules[variable].append(prod)
-            
-            self.rules = new_rules
+    def _eliminate_unit_rules(self, probabilities: dict = None):
+        """
+        Elimina reglas unitarias (A -> B) en una sola pasada.
+        
+        Cada variable recibe, en orden y sin duplicados, sus producciones no
+        unitarias y las de las variables alcanzables por reglas unitarias (el
+        mismo resultado que reemplazar A -> B por las reglas de B hasta llegar
+        a un punto fijo). Las variables se procesan en postorden del grafo de
+        reglas unitarias, así que el cierre de B ya está calculado al
+        procesar A -> B; los ciclos (A -> B, B -> A) se recorren una sola vez.
+        
+        Con probabilidades (todas las reglas, ver rule_probabilities()), cada
+        regla A -> β del cierre recibe la probabilidad de la mejor cadena
+        A -> B1 -> ... -> Bk -> β (máximo del producto, como en Viterbi), y
+        self.probabilities se reemplaza por las de las reglas resultantes.
+        """
+        rules = self.rules
+        variables = self.variables
+        
+        # Grafo de reglas unitarias: A -> [B, ...] (B con reglas propias)
+        unit_targets = {}
+        for variable, productions in rules.items():
+            targets = [prod[0] for prod in productions
+                       if len(prod) == 1 and prod[0] in variables and prod[0] in rules]
+            if targets:
+                unit_targets[variable] = targets
+        
+        # Postorden del grafo con pila explícita
+        postorder = []
+        visited = set()
+        for root in unit_targets:
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(unit_targets[root]))]
+            while stack:
+                variable, targets = stack[-1]
+                for target in targets:
+                    if target not in visited:
+                        visited.add(target)
+                        stack.append((target, iter(unit_targets.get(target, ()))))
+                        break
+                else:
+                    stack.pop()
+                    postorder.append(variable)
+        
+        # Cierre de cada variable con reglas unitarias: lista ordenada + conjunto
+        closures = {}
+        for root in postorder:
+            closure = []
+            seen = set()
+            expanded = {root}
+            stack = [iter(rules[root])]
+            while stack:
+                for prod in stack[-1]:
+                    target = prod[0] if len(prod) == 1 else None
+                    if target is not None and target in variables and target in rules:
+                        # Regla unitaria: agregar las reglas de target una sola vez
+                        if target in expanded:
+                            continue
+                        expanded.add(target)
+                        known = closures.get(target)
+                        if known is not None:
+                            for b_prod in known:
+                                if b_prod not in seen:
+                                    seen.add(b_prod)
+                                    closure.append(b_prod)
+                        elif target in unit_targets:
+                            # Solo en ciclos: target aún no tiene su cierre
+                            stack.append(iter(rules[target]))
+                            break
+                        else:
+                            for b_prod in rules[target]:
+                                if b_prod not in seen:
+                                    seen.add(b_prod)
+                                    closure.append(b_prod)
+                    elif prod not in seen:
+                        seen.add(prod)
+                        closure.append(prod)
+                else:
+                    stack.pop()
+            closures[root] = closure
+        
+        new_rules = defaultdict(list)
+        for variable, productions in rules.items():
+            closure = closures.get(variable)
+            if closure is None:
+                # Sin reglas unitarias: solo quitar duplicados
+                closure = list(dict.fromkeys(productions))
+            if closure:
+                new_rules[variable] = closure
+        
+        if probabilities is not None:
+            self.probabilities = _unit_closure_probabilities(
+                rules, unit_targets, probabilities, new_rules)
+        self.rules = new_rules
+        self._invalidate()
     
     def _print_cnf_grammar(self):
         """Imprime la gramática en CNF"""
         print("\nGramática en CNF:")
         for var in sorted(self.rules.keys()):
             productions = [' '.join(prod) for prod in self.rules[var]]
-            print(f"  {var} → {' | '.join(productions)}")
\ No newline at end of file
+            print(f"  {var} → {' | '.join(productions)}")
+
+
+def _rules_fingerprint(grammar: Grammar) -> str:
+    digest = hashlib.sha256(grammar.start_symbol.encode())
+    probabilities = grammar.probabilities
+    for variable in sorted(grammar.rules):
+        # El orden de las producciones define los back-pointers, así que se conserva
+        for prod in grammar.rules[variable]:
+            digest.update(f"\n{variable}\t{' '.join(prod)}".encode())
+            if probabilities:
+                digest.update(f"\t{probabilities.get((variable, prod))!r}".encode())
+    return digest.hexdigest()
+
+
+def _complete_probabilities(grammar: Grammar) -> dict:
+    given = grammar.probabilities
+    probabilities = {}
+    for variable, productions in grammar.rules.items():
+        missing = []
+        total = 0.0
+        for prod in dict.fromkeys(productions):
+            probability = given.get((variable, prod))
+            if probability is None:
+                missing.append(prod)
+            else:
+                probabilities[(variable, prod)] = probability
+                total += probability
+        if total > 1.0 + 1e-9:
+            raise ValueError(f"Las probabilidades de las reglas de {variable} suman {total:.6g} (> 1)")
+        if missing:
+            rest = 1.0 - total
+            if rest <= 1e-12:
+                raise ValueError(
+                    f"Las reglas de {variable} sin probabilidad no tienen masa restante "
+                    f"(las demás ya suman {total:.6g})"
+                )
+            for prod in missing:
+                probabilities[(variable, prod)] = rest / len(missing)
+    return probabilities
+
+
+def _unit_closure_probabilities(rules: dict, unit_targets: dict, probabilities: dict,
+                                new_rules: dict) -> dict:
+    """
+    Probabilidades de las reglas sin unitarias: para cada variable, la mejor
+    cadena de reglas unitarias hasta cada B alcanzable (búsqueda del máximo
+    producto; como las probabilidades son <= 1, los ciclos nunca mejoran un
+    camino) multiplicada por la probabilidad de cada regla no unitaria de B.
+    """
+    result = {}
+    for variable, closure in new_rules.items():
+        if variable not in unit_targets:
+            for prod in closure:
+                result[(variable, prod)] = probabilities[(variable, prod)]
+            continue
+        
+        best = {variable: 1.0}
+        heap = [(-1.0, variable)]
+        while heap:
+            negative, source = heapq.heappop(heap)
+            if -negative < best[source]:
+                continue
+            for target in unit_targets.get(source, ()):
+                candidate = -negative * probabilities[(source, (target,))]
+                if candidate > best.get(target, 0.0):
+                    best[target] = candidate
+                    heapq.heappush(heap, (-candidate, target))
+        
+        # Solo las reglas no unitarias de cada B llegan al cierre
+        for prod in closure:
+            result[(variable, prod)] = 0.0
+        for source, chain in best.items():
+            for prod in rules[source]:
+                key = (variable, prod)
+                if key in result:
+                    probability = chain * probabilities[(source, prod)]
+                    if probability > result[key]:
+                        result[key] = probability
+    return result
+
+
+def _lexical_vocabulary(grammar: Grammar) -> frozenset:
+    return frozenset(prod[0] for productions in grammar.rules.values()
+                     for prod in productions if len(prod) == 1)
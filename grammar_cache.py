@@ -0,0 +1,138 @@
+"""
+Caché en disco de gramáticas compiladas.
+
+Guarda junto al archivo fuente (por ejemplo 'grammar.txt.cnfc') las reglas
+ya convertidas a CNF y los índices de búsqueda, serializados con marshal.
+El artefacto se identifica con un hash del texto de la gramática, la versión
+del convertidor a CNF y la versión del formato marshal, de modo que las
+cargas posteriores omiten tanto la lectura de reglas como to_cnf(). Si el
+artefacto está desactualizado o dañado se reconstruye automáticamente.
+"""
+
+import hashlib
+import marshal
+import mmap
+import os
+import sys
+from collections import defaultdict
+
+from grammar import Grammar, CNF_CONVERTER_VERSION
+from grammar_loader import load_grammar_from_file
+from rule_index import RuleIndex
+from tokenizer import Tokenizer
+
+
+MAGIC = b"CYKG"
+COMPILED_SUFFIX = ".cnfc"
+_KEY_SIZE = 32  # sha256
+
+
+def compiled_path(filename: str) -> str:
+    """Ruta del artefacto compilado para un archivo de gramática"""
+    return filename + COMPILED_SUFFIX
+
+
+def grammar_key(grammar_text: bytes) -> bytes:
+    """Hash del texto de la gramática y de las versiones del formato"""
+    digest = hashlib.sha256()
+    digest.update(f"cnf={CNF_CONVERTER_VERSION};marshal={marshal.version};"
+                  f"python={sys.version_info[0]}.{sys.version_info[1]}\n".encode())
+    digest.update(grammar_text)
+    return digest.digest()
+
+
+def _grammar_state(grammar: Grammar) -> dict:
+    return {
+        "start_symbol": grammar.start_symbol,
+        "variables": frozenset(grammar.variables),
+        "terminals": frozenset(grammar.terminals),
+        "rules": {variable: tuple(prods) for variable, prods in grammar.rules.items()},
+        "rule_index": grammar.get_rule_index().to_state(),
+        "tokenizer": grammar.tokenizer.to_state(),
+        "probabilities": dict(grammar.probabilities),
+    }
+
+
+def _grammar_from_state(state: dict) -> Grammar:
+    grammar = Grammar()
+    grammar.start_symbol = state["start_symbol"]
+    grammar.variables = set(state["variables"])
+    grammar.terminals = set(state["terminals"])
+    grammar.rules = defaultdict(list, {v: list(p) for v, p in state["rules"].items()})
+    if "tokenizer" in state:
+        grammar.tokenizer = Tokenizer.from_state(state["tokenizer"])
+    grammar.probabilities = dict(state.get("probabilities", {}))
+    # Los índices se cargan ya construidos
+    grammar._derived['rule_index'] = RuleIndex.from_state(state["rule_index"])
+    return grammar
+
+
+def save_compiled_grammar(grammar: Grammar, path: str, key: bytes):
+    """Escribe el artefacto de forma atómica (archivo temporal + rename)"""
+    payload = marshal.dumps(_grammar_state(grammar))
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(MAGIC + key + payload)
+    os.replace(temp_path, path)
+
+
+def read_compiled_grammar(path: str, key: bytes) -> Grammar:
+    """
+    Lee un artefacto compilado mapeándolo en memoria.
+
+    Returns:
+        Grammar en CNF, o None si el artefacto no existe, es de otra
+        versión de la gramática o está dañado.
+    """
+    try:
+        with open(path, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                header_size = len(MAGIC) + _KEY_SIZE
+                if data[:len(MAGIC)] != MAGIC or data[len(MAGIC):header_size] != key:
+                    return None
+                state = marshal.loads(data[header_size:])
+        return _grammar_from_state(state)
+    except (OSError, ValueError, EOFError, TypeError, KeyError):
+        return None
+
+
+def load_compiled_grammar(filename: str, verbose: bool = False) -> Grammar:
+    """
+    Carga una gramática en CNF usando el artefacto compilado si está vigente;
+    en caso contrario la carga desde el archivo, la convierte a CNF y
+    regenera el artefacto.
+
+    Args:
+        filename: Archivo de gramática en formato de texto
+        verbose: Imprimir el progreso de la carga y de la conversión
+
+    Returns:
+        Grammar: Gramática ya convertida a CNF
+    """
+    try:
+        with open(filename, 'rb') as file:
+            grammar_text = file.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"❌ No se encontró el archivo '{filename}'")
+
+    key = grammar_key(grammar_text)
+    path = compiled_path(filename)
+
+    grammar = read_compiled_grammar(path, key)
+    if grammar is not None:
+        if verbose:
+            print(f"\nGramática compilada cargada desde '{path}'")
+        return grammar
+
+    grammar = load_grammar_from_file(filename, verbose)
+    grammar.to_cnf(verbose)
+
+    try:
+        save_compiled_grammar(grammar, path, key)
+        if verbose:
+            print(f"\nGramática compilada guardada en '{path}'")
+    except OSError as error:
+        # Sin permisos de escritura: se sigue sin caché
+        print(f"No se pudo guardar la gramática compilada: {error}", file=sys.stderr)
+
+    return grammar
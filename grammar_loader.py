@@ -1,132 +1,322 @@
-
+import sys
+from collections import defaultdict
 from grammar import Grammar
+from tokenizer import Tokenizer
+
+
+# Formato de una línea de reglas o de léxico
+EXPECTED_FORMAT = "Variable -> produccion1 | produccion2   o   Variable: palabra1 palabra2 ..."
+
+# Probabilidad opcional al final de una producción o después de una palabra
+# del léxico: "S -> NP VP [0.9]", "N: cat [0.4] dog [0.6]"
+PROBABILITY_FORMAT = "[p] con 0 < p <= 1"
+
+# Reglas que se acumulan antes de insertarlas en la gramática
+RULE_BLOCK_SIZE = 4096
+
+# Directivas de tokenización: %nombre valor -> (argumento de Tokenizer, valores)
+TOKENIZER_DIRECTIVES = {
+    'lowercase': ('lowercase', {'yes': True, 'no': False}),
+    'punctuation': ('split_punctuation', {'split': True, 'keep': False}),
+}
+
 
+def _parse_directive(line: str, line_number: int, options: dict):
+    """Interpreta una directiva '%nombre valor' y guarda la opción en options"""
+    parts = line[1:].split()
+    directive = TOKENIZER_DIRECTIVES.get(parts[0]) if len(parts) == 2 else None
+    if directive is None or parts[1] not in directive[1]:
+        expected = ', '.join(f"%{name} {'|'.join(values)}"
+                             for name, (_, values) in TOKENIZER_DIRECTIVES.items())
+        raise ValueError(
+            f"Error en línea {line_number}: directiva inválida '{line}'\n"
+            f"   Directivas válidas: {expected}"
+        )
+    option, values = directive
+    options[option] = values[parts[1]]
 
-def load_grammar_from_file(filename: str) -> Grammar:
-  
-    print(f"\nCargando gramática desde '{filename}'...")
-    
+
+def _parse_probability(token: str, line_number: int) -> float:
+    """Valor de un token '[p]' (ValueError con el número de línea si es inválido)"""
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-    except FileNotFoundError:
-        raise FileNotFoundError(f"❌ No se encontró el archivo '{filename}'")
-    
-    grammar = Grammar()
-    line_number = 0
+        probability = float(token[1:-1])
+    except ValueError:
+        probability = None
+    if probability is None or not 0.0 < probability <= 1.0:
+        raise ValueError(
+            f"Error en línea {line_number}: probabilidad inválida '{token}'\n"
+            f"   Formato esperado: {PROBABILITY_FORMAT}"
+        )
+    return probability
+
+
+def _load_lines(grammar: Grammar, lines, verbose: bool = False, strict: bool = True) -> int:
+    """
+    Carga reglas línea por línea (sin leer todo el archivo en memoria).
+
+    Acepta dos formatos por línea:
+        Variable -> produccion1 | produccion2      reglas generales
+        Variable: palabra1 palabra2 palabra3       sección léxica compacta
+    y directivas de tokenización (%lowercase yes|no, %punctuation split|keep).
+    Cada producción o palabra puede llevar su probabilidad como '[p]' (PCFG);
+    las repetidas suman sus probabilidades.
+
+    Las reglas léxicas se acumulan por variable y se insertan en bloque al
+    final, conservando el orden del archivo dentro de cada variable.
+
+    Args:
+        strict: Lanzar ValueError (con el número de línea) ante una línea
+            inválida; si es False, la línea se ignora
+
+    Returns:
+        Número de reglas cargadas
+    """
+    intern = sys.intern
+    pending = []  # Reglas leídas que aún no se agregan (se insertan por bloques)
+    # Los símbolos repetidos se internan: cada variable, terminal y producción
+    # de un solo símbolo se guarda una sola vez aunque aparezca en miles de líneas
+    single_productions = {}
+    lexicon = defaultdict(list)  # Variable -> palabras de la sección léxica
+    tokenizer_options = {}
+    probabilities = {}  # (Variable, producción) -> probabilidad
+    lexicon_probabilities = {}  # (Variable, (palabra,)) -> probabilidad, sin normalizar
     rules_loaded = 0
-    
-    for line in lines:
-        line_number += 1
-        
+
+    for line_number, line in enumerate(lines, 1):
         # Limpiar espacios en blanco
         line = line.strip()
-        
+
         # Ignorar líneas vacías o comentarios
         if not line or line.startswith('#'):
             continue
-        
-        # Verificar que tenga el formato correcto
+
+        if line.startswith('%'):
+            try:
+                _parse_directive(line, line_number, tokenizer_options)
+            except ValueError:
+                if strict:
+                    raise
+            continue
+
         if '->' not in line:
-            raise ValueError(
-                f"Error en línea {line_number}: '{line}'\n"
-                f"   Formato esperado: Variable -> produccion1 | produccion2"
-            )
-        
+            # Sección léxica compacta: "N: cat dog beer"
+            variable, colon, words = line.partition(':')
+            variable = variable.strip()
+            if not colon or not variable or ' ' in variable:
+                if not strict:
+                    continue
+                raise ValueError(
+                    f"Error en línea {line_number}: '{line}'\n"
+                    f"   Formato esperado: {EXPECTED_FORMAT}"
+                )
+            words = words.split()
+            if '[' in line:
+                try:
+                    words = _lexicon_probabilities(variable, words, line_number, lexicon_probabilities)
+                except ValueError:
+                    if strict:
+                        raise
+                    continue
+            if not words:
+                if not strict:
+                    continue
+                raise ValueError(
+                    f"Error en línea {line_number}: La variable '{variable}' no tiene palabras"
+                )
+            lexicon[intern(variable)].extend(map(intern, words))
+            rules_loaded += len(words)
+            if verbose:
+                print(f"  ✓ {variable}: {len(words)} palabras")
+            continue
+
         # Dividir en variable y producciones
         parts = line.split('->')
         if len(parts) != 2:
+            if not strict:
+                continue
             raise ValueError(
                 f"Error en línea {line_number}: '{line}'\n"
                 f"   Debe haber exactamente una flecha '->'"
             )
-        
+
         variable = parts[0].strip()
         productions_str = parts[1].strip()
-        
+
         # Validar que la variable no esté vacía
         if not variable:
+            if not strict:
+                continue
             raise ValueError(
                 f"Error en línea {line_number}: La variable está vacía"
             )
-        
-        # Dividir las producciones por |
-        productions_list = productions_str.split('|')
-        
-        # Procesar cada producción
-        for production_str in productions_list:
-            production_str = production_str.strip()
-            
-            if not production_str:
-                continue
-            
+        variable = intern(variable)
+
+        # Procesar cada producción (separadas por |)
+        for production_str in productions_str.split('|'):
             # Dividir la producción en símbolos (por espacios)
             symbols = production_str.split()
-            
+            probability = None
+            if symbols and symbols[-1].startswith('[') and symbols[-1].endswith(']'):
+                try:
+                    probability = _parse_probability(symbols.pop(), line_number)
+                except ValueError:
+                    if strict:
+                        raise
+                    continue
+            if len(symbols) == 1:
+                production = single_productions.get(symbols[0])
+                if production is None:
+                    production = (intern(symbols[0]),)
+                    single_productions[symbols[0]] = production
+            elif symbols:
+                production = tuple(map(intern, symbols))
+            else:
+                continue
+
             # Agregar la regla a la gramática
-            grammar.add_rule(variable, symbols)
+            pending.append((variable, production))
             rules_loaded += 1
-            
-            print(f"  ✓ {variable} -> {' '.join(symbols)}")
-    
-    print(f"\nGramática cargada exitosamente:")
-    print(f"   - {len(grammar.variables)} variables")
-    print(f"   - {len(grammar.terminals)} terminales")
-    print(f"   - {rules_loaded} reglas")
-    
+            if probability is not None:
+                key = (variable, production)
+                probabilities[key] = probabilities.get(key, 0.0) + probability
+
+            if verbose:
+                print(f"  ✓ {variable} -> {' '.join(symbols)}")
+
+        if len(pending) >= RULE_BLOCK_SIZE:
+            grammar.add_rules(pending)
+            pending.clear()
+
+    grammar.add_rules(pending)
+
+    # Las directivas pueden aparecer en cualquier línea: el tokenizador se
+    # arma antes de insertar el léxico para que sus palabras coincidan con
+    # los tokens de la entrada ('Paris' es 'paris' si %lowercase yes)
+    if tokenizer_options:
+        grammar.tokenizer = Tokenizer(**tokenizer_options)
+    normalize = grammar.tokenizer.normalize
+
+    # Inserción en bloque de la sección léxica (liberando cada lista al insertarla)
+    for variable in list(lexicon):
+        words = [intern(normalize(word)) for word in lexicon.pop(variable)]
+        grammar.add_lexical_rules(variable, words)
+
+    for (variable, (word,)), probability in lexicon_probabilities.items():
+        key = (variable, (intern(normalize(word)),))
+        probabilities[key] = probabilities.get(key, 0.0) + probability
+
+    if probabilities:
+        grammar.set_probabilities(probabilities)
+
+    return rules_loaded
+
+
+def _lexicon_probabilities(variable: str, tokens: list, line_number: int, probabilities: dict) -> list:
+    """
+    Separa las probabilidades '[p]' de una línea léxica compacta: cada una
+    se aplica a la palabra anterior. Devuelve solo las palabras.
+    """
+    words = []
+    for token in tokens:
+        if token.startswith('[') and token.endswith(']'):
+            if not words:
+                raise ValueError(
+                    f"Error en línea {line_number}: probabilidad '{token}' sin palabra"
+                )
+            key = (variable, (words[-1],))
+            probabilities[key] = probabilities.get(key, 0.0) + _parse_probability(token, line_number)
+        else:
+            words.append(token)
+    return words
+
+
+def load_grammar_from_file(filename: str, verbose: bool = False) -> Grammar:
+
+    if verbose:
+        print(f"\nCargando gramática desde '{filename}'...")
+
+    grammar = Grammar()
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            rules_loaded = _load_lines(grammar, file, verbose)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"❌ No se encontró el archivo '{filename}'")
+
+    if verbose:
+        print(f"\nGramática cargada exitosamente:")
+        print(f"   - {len(grammar.variables)} variables")
+        print(f"   - {len(grammar.terminals)} terminales")
+        print(f"   - {rules_loaded} reglas")
+
     return grammar
 
 
-def load_grammar_from_string(grammar_text: str) -> Grammar:
-   
-    print("\nCargando gramática desde texto...")
-    
+def load_grammar_from_string(grammar_text: str, verbose: bool = False) -> Grammar:
+
+    if verbose:
+        print("\nCargando gramática desde texto...")
+
     grammar = Grammar()
-    lines = grammar_text.strip().split('\n')
-    rules_loaded = 0
-    
-    for line_number, line in enumerate(lines, 1):
-        line = line.strip()
-        
-        if not line or line.startswith('#'):
-            continue
-        
-        if '->' not in line:
-            continue
-        
-        parts = line.split('->')
-        if len(parts) != 2:
-            continue
-        
-        variable = parts[0].strip()
-        productions_str = parts[1].strip()
-        
-        productions_list = productions_str.split('|')
-        
-        for production_str in productions_list:
-            production_str = production_str.strip()
-            
-            if not production_str:
-                continue
-            
-            symbols = production_str.split()
-            grammar.add_rule(variable, symbols)
-            rules_loaded += 1
-    
-    print(f"{rules_loaded} reglas cargadas")
-    
+    # Las líneas inválidas se ignoran
+    rules_loaded = _load_lines(grammar, grammar_text.strip().split('\n'), strict=False)
+
+    if verbose:
+        print(f"{rules_loaded} reglas cargadas")
+
     return grammar
 
 
+def load_lexicon(grammar: Grammar, filename: str, verbose: bool = False) -> int:
+    """
+    Agrega a la gramática un léxico en un archivo TSV aparte, con una entrada
+    por línea: palabra<TAB>Variable (por ejemplo 'cat\\tN'). Las líneas vacías
+    y las que empiezan con '#' se ignoran. Las palabras pasan por la
+    normalización del tokenizador de la gramática.
+
+    Returns:
+        Número de reglas léxicas agregadas
+    """
+    lexicon = defaultdict(list)
+    entries = 0
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            for line_number, line in enumerate(file, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                fields = line.split('\t')
+                if len(fields) != 2 or not fields[0].strip() or not fields[1].strip():
+                    raise ValueError(
+                        f"Error en línea {line_number} de '{filename}': '{line}'\n"
+                        f"   Formato esperado: palabra<TAB>Variable"
+                    )
+                lexicon[sys.intern(fields[1].strip())].append(sys.intern(fields[0].strip()))
+                entries += 1
+    except FileNotFoundError:
+        raise FileNotFoundError(f"❌ No se encontró el archivo '{filename}'")
+
+    # Las palabras se normalizan como los tokens de la entrada
+    normalize = grammar.tokenizer.normalize
+    variables = len(lexicon)
+    for variable in list(lexicon):
+        grammar.add_lexical_rules(variable, [sys.intern(normalize(word))
+                                             for word in lexicon.pop(variable)])
+
+    if verbose:
+        print(f"Léxico '{filename}': {entries} entradas en {variables} variables")
+    return entries
+
+
 # Función de conveniencia para cargar la gramática del proyecto
-def load_project_grammar(filename: str = "grammar.txt") -> Grammar:
+def load_project_grammar(filename: str = "grammar.txt", verbose: bool = False) -> Grammar:
     """
     Carga la gramática del proyecto desde un archivo
-    
+
     Args:
         filename: Nombre del archivo (por defecto 'grammar.txt')
-        
+        verbose: Imprimir cada regla cargada
+
     Returns:
         Grammar: Gramática cargada y lista para usar
     """
-    return load_grammar_from_file(filename)
\ No newline at end of file
+    return load_grammar_from_file(filename, verbose)
@@ -0,0 +1,223 @@
+"""
+Optimización de gramáticas en CNF.
+
+Se aplica después de Grammar.to_cnf() y reduce las variables y reglas que el
+parser revisa en cada celda, sin cambiar el lenguaje aceptado:
+
+1. Símbolos inútiles: se eliminan las variables que no generan ninguna
+   cadena de terminales y las que no son alcanzables desde el símbolo inicial.
+2. Variables equivalentes: las variables con exactamente las mismas
+   producciones se fusionan en una sola (clases léxicas repetidas, variables
+   auxiliares T_x / X<n> con la misma parte derecha). Al fusionar, otras
+   variables pueden quedar iguales (por ejemplo, dos cadenas de binarización
+   con el mismo sufijo), así que se repite hasta que no haya cambios.
+
+Los nombres de las variables fusionadas cambian en los parse trees (se
+conserva el símbolo inicial, o la primera variable del grupo). En una PCFG
+solo se fusionan variables con las mismas producciones y probabilidades.
+
+    grammar.to_cnf()
+    report = optimize_grammar(grammar)
+    print(report["rules_before"], "->", report["rules_after"])
+"""
+
+from collections import defaultdict
+
+from grammar import Grammar
+
+
+def _count(grammar: Grammar) -> dict:
+    lexical = binary = 0
+    for productions in grammar.rules.values():
+        for prod in productions:
+            if len(prod) == 1:
+                lexical += 1
+            else:
+                binary += 1
+    return {"variables": len(grammar.rules), "rules": lexical + binary,
+            "lexical": lexical, "binary": binary}
+
+
+def _generating(rules: dict) -> set:
+    """Variables que derivan alguna cadena de terminales (lineal en el tamaño)"""
+    generating = set()
+    # Producción binaria -> número de símbolos que aún no se sabe si generan
+    pending = {}
+    # Símbolo -> producciones binarias (variable, producción) donde aparece
+    uses = defaultdict(list)
+    queue = []
+
+    for variable, productions in rules.items():
+        for prod in productions:
+            if len(prod) == 1:
+                if variable not in generating:
+                    generating.add(variable)
+                    queue.append(variable)
+            else:
+                key = (variable, prod)
+                pending[key] = len(prod)
+                for symbol in prod:
+                    uses[symbol].append(key)
+
+    while queue:
+        symbol = queue.pop()
+        for key in uses.pop(symbol, ()):
+            pending[key] -= 1
+            variable = key[0]
+            if pending[key] == 0 and variable not in generating:
+                generating.add(variable)
+                queue.append(variable)
+    return generating
+
+
+def _reachable(rules: dict, start: str) -> set:
+    """Variables alcanzables desde el símbolo inicial"""
+    reachable = {start}
+    stack = [start]
+    while stack:
+        for prod in rules.get(stack.pop(), ()):
+            if len(prod) == 1:
+                continue
+            for symbol in prod:
+                if symbol not in reachable:
+                    reachable.add(symbol)
+                    stack.append(symbol)
+    return reachable
+
+
+def remove_useless_symbols(grammar: Grammar) -> int:
+    """
+    Elimina las variables no generadoras y las no alcanzables, con sus reglas.
+
+    Returns:
+        Número de variables eliminadas
+    """
+    rules = grammar.rules
+    before = len(rules)
+
+    generating = _generating(rules)
+    productive = {}
+    for variable, productions in rules.items():
+        if variable not in generating:
+            continue
+        kept = [prod for prod in productions
+                if len(prod) == 1 or all(symbol in generating for symbol in prod)]
+        productive[variable] = kept
+
+    reachable = _reachable(productive, grammar.start_symbol)
+    new_rules = defaultdict(list)
+    for variable, productions in productive.items():
+        if variable in reachable:
+            new_rules[variable] = productions
+
+    grammar.rules = new_rules
+    if grammar.probabilities:
+        grammar.probabilities = {key: p for key, p in grammar.probabilities.items()
+                                 if key[0] in new_rules and key[1] in new_rules[key[0]]}
+    return before - len(new_rules)
+
+
+def merge_equivalent_variables(grammar: Grammar) -> int:
+    """
+    Fusiona las variables con las mismas producciones hasta llegar a un
+    punto fijo.
+
+    Returns:
+        Número de variables eliminadas por fusión
+    """
+    rules = grammar.rules
+    probabilities = grammar.probabilities
+    start = grammar.start_symbol
+    merged = 0
+
+    while True:
+        # Producciones (como conjunto) -> variables con esas producciones
+        groups = defaultdict(list)
+        for variable, productions in rules.items():
+            if probabilities:
+                groups[frozenset((prod, probabilities.get((variable, prod)))
+                                 for prod in productions)].append(variable)
+            else:
+                groups[frozenset(productions)].append(variable)
+
+        renames = {}
+        for group in groups.values():
+            if len(group) == 1:
+                continue
+            # El símbolo inicial siempre representa a su grupo
+            kept = start if start in group else group[0]
+            for variable in group:
+                if variable != kept:
+                    renames[variable] = kept
+        if not renames:
+            break
+        merged += len(renames)
+
+        new_rules = defaultdict(list)
+        new_probabilities = {}
+        for variable, productions in rules.items():
+            if variable in renames:
+                continue
+            renamed = (tuple(renames.get(symbol, symbol) for symbol in prod)
+                       if len(prod) == 2 else prod
+                       for prod in productions)
+            if probabilities:
+                renamed = list(renamed)
+                for prod, renamed_prod in zip(productions, renamed):
+                    # Dos reglas que quedan iguales: se conserva la más probable
+                    probability = probabilities.get((variable, prod))
+                    key = (variable, renamed_prod)
+                    if probability is not None and new_probabilities.get(key, 0.0) < probability:
+                        new_probabilities[key] = probability
+            # Quitar duplicados conservando el orden
+            new_rules[variable] = list(dict.fromkeys(renamed))
+        rules = new_rules
+        if probabilities:
+            probabilities = new_probabilities
+
+    grammar.rules = rules
+    grammar.probabilities = probabilities
+    return merged
+
+
+def optimize_grammar(grammar: Grammar, verbose: bool = False) -> dict:
+    """
+    Optimiza una gramática que ya está en CNF (la modifica en el lugar).
+
+    Returns:
+        Reporte con el tamaño antes y después: variables, reglas, reglas
+        léxicas y binarias, variables inútiles eliminadas y variables fusionadas
+    """
+    before = _count(grammar)
+
+    useless = remove_useless_symbols(grammar)
+    merged = merge_equivalent_variables(grammar)
+
+    # Actualizar variables y terminales con los símbolos que quedaron
+    variables = set(grammar.rules)
+    terminals = set()
+    for productions in grammar.rules.values():
+        for prod in productions:
+            if len(prod) == 1:
+                terminals.add(prod[0])
+            else:
+                variables.update(prod)
+    variables.add(grammar.start_symbol)
+    grammar.variables = variables
+    grammar.terminals = terminals
+    grammar._invalidate()
+
+    after = _count(grammar)
+    report = {"useless_removed": useless, "merged": merged}
+    for key in ("variables", "rules", "lexical", "binary"):
+        report[f"{key}_before"] = before[key]
+        report[f"{key}_after"] = after[key]
+
+    if verbose:
+        print("\nOptimización de la gramática en CNF:")
+        print(f"  Variables: {before['variables']} → {after['variables']} "
+              f"({useless} inútiles eliminadas, {merged} fusionadas)")
+        print(f"  Reglas: {before['rules']} → {after['rules']} "
+              f"(léxicas {before['lexical']} → {after['lexical']}, "
+              f"binarias {before['binary']} → {after['binary']})")
+    return report
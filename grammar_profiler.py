@@ -0,0 +1,386 @@
+"""
+Perfil de costo de una gramática en CNF y elección automática del motor.
+
+El tiempo de CYK depende mucho de la forma de la gramática: cuántas
+variables tiene cada terminal (ambigüedad léxica), cuántas variables
+comparten el mismo par (B, C) y la recursión a izquierda (VP -> VP PP), que
+llena las celdas largas con las mismas variables una y otra vez.
+profile_grammar() calcula esas estadísticas sobre las reglas y además analiza
+unas pocas sentencias de prueba cortas (derivaciones aleatorias de la
+gramática) con cada motor CYK:
+
+- Densidad de la tabla: variables por celda según la longitud del tramo,
+  medida en la prueba. Más allá de la longitud de prueba se supone que la
+  densidad ya no crece (las celdas largas de una gramática ambigua se
+  saturan) y se usa la media de los tramos más largos de la prueba.
+- Costo por celda: una celda de longitud L examina, en cada partición k,
+  |celda izquierda|·|celda derecha| pares (B, C), así que con la densidad
+  d(L) cuesta la suma de d(k)·d(L - k). El costo por sentencia suma todas
+  las celdas.
+- Tiempo estimado por sentencia para cada motor: el motor 'sets' examina
+  pares (B, C) y 'bitset' recorre las variables de la celda izquierda (el
+  lado derecho es una máscara), y los dos tienen además un costo fijo por
+  celda y por partición con la celda izquierda no vacía. El tiempo medido
+  en la prueba calibra el segundo por unidad de trabajo de cada motor.
+- Reglas calientes (las que más se aplicaron en la prueba) y terminales ambiguos.
+- Recomendación: el motor más rápido y, si hay más de un núcleo y las
+  sentencias largas tardan, el llenado paralelo desde la longitud en la que
+  conviene.
+
+    grammar.to_cnf()
+    report = profile_grammar(grammar, verbose=True)
+    parser = create_parser(grammar, 'auto')   # usa recommend_parser()
+
+Earley no se prueba: trabaja sobre la gramática original y sobre una
+gramática en CNF densa es mucho más lento que CYK.
+"""
+
+import os
+import random
+import sys
+from collections import Counter
+
+from bitset_parser import BitsetCYKParser
+from cyk_parser import CYKParser
+from grammar import Grammar
+from tracing import CELL_FILLED, RULE_APPLIED
+
+# Motores que se prueban (los dos aceptan la gramática en CNF y todas las opciones de CYK)
+PROBED_ENGINES = {'sets': CYKParser, 'bitset': BitsetCYKParser}
+
+# Sentencias de prueba: cantidad y longitud. Son cortas para que el perfil
+# tarde poco incluso con gramáticas densas de miles de reglas.
+PROBE_SAMPLES = 3
+PROBE_LENGTH = 10
+
+# Repeticiones de cada sentencia al medir el tiempo (se toma la mejor)
+PROBE_REPEAT = 3
+
+# Longitud de sentencia para la que se estima el costo
+DEFAULT_LENGTH = 20
+
+# Con más de un núcleo, el llenado paralelo se activa para las sentencias
+# que se estima que tardan al menos esto (segundos); por debajo, el reparto
+# entre procesos cuesta más de lo que ahorra
+PARALLEL_MIN_SECONDS = 1.0
+MAX_PARALLEL_WORKERS = 4
+
+# Entradas de las listas de reglas calientes y terminales ambiguos
+TOP = 10
+
+
+def partitions(n: int) -> int:
+    """Particiones (i, longitud, k) que revisa el llenado de una sentencia de n tokens"""
+    return (n ** 3 - n) // 6
+
+
+def _recursive(graph: dict) -> set:
+    """Variables que están en un ciclo del grafo (Tarjan iterativo)"""
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    cyclic = set()
+    counter = 0
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph.get(root, ())))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = low[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(graph.get(successor, ()))))
+                    break
+                if successor in on_stack:
+                    low[node] = min(low[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in graph.get(node, ()):
+                        cyclic.update(component)
+    return cyclic
+
+
+def _shape(grammar: Grammar) -> dict:
+    """Estadísticas de las reglas: ambigüedad léxica, pares (B, C) y recursión"""
+    index = grammar.get_rule_index()
+    ambiguity = {word: len(variables) for word, variables in index.lexical.items()}
+    heads = [len(variables) for variables in index.binary.values()]
+    left_corner = {}
+    right_corner = {}
+    for (B, C), variables in index.binary.items():
+        for A in variables:
+            left_corner.setdefault(A, set()).add(B)
+            right_corner.setdefault(A, set()).add(C)
+    ambiguous = sorted((item for item in ambiguity.items() if item[1] > 1),
+                       key=lambda item: (-item[1], item[0]))
+    return {
+        "variables": len(grammar.rules),
+        "terminals": len(ambiguity),
+        "lexical_rules": sum(ambiguity.values()),
+        "binary_rules": sum(heads),
+        "lexical_ambiguity": sum(ambiguity.values()) / len(ambiguity) if ambiguity else 0.0,
+        "max_lexical_ambiguity": max(ambiguity.values(), default=0),
+        "ambiguous_terminals": ambiguous[:TOP],
+        "pairs": len(heads),
+        "shared_pairs": sum(1 for count in heads if count > 1),
+        "max_heads_per_pair": max(heads, default=0),
+        "left_fanout": len(index.binary) / len(index.by_left) if index.by_left else 0.0,
+        "left_recursive": sorted(_recursive(left_corner)),
+        "right_recursive": sorted(_recursive(right_corner)),
+    }
+
+
+def _derivable_lengths(grammar: Grammar, length: int) -> dict:
+    """Variable -> longitudes (hasta `length`) de las cadenas que deriva"""
+    possible = {variable: {1} if any(len(prod) == 1 for prod in productions) else set()
+                for variable, productions in grammar.rules.items()}
+    for n in range(2, length + 1):
+        for variable, productions in grammar.rules.items():
+            if any(len(prod) == 2
+                   and any(k in possible.get(prod[0], ()) and n - k in possible.get(prod[1], ())
+                           for k in range(1, n))
+                   for prod in productions):
+                possible[variable].add(n)
+    return possible
+
+
+def _derive(grammar: Grammar, rng: random.Random, variable: str, n: int, possible: dict) -> list:
+    """Tokens de una derivación aleatoria de `variable` con exactamente n tokens"""
+    productions = grammar.rules[variable]
+    if n == 1:
+        return [rng.choice([prod[0] for prod in productions if len(prod) == 1])]
+    choices = [(B, C, k) for prod in productions if len(prod) == 2 for B, C in (prod,)
+               for k in range(1, n) if k in possible.get(B, ()) and n - k in possible.get(C, ())]
+    B, C, k = rng.choice(choices)
+    return (_derive(grammar, rng, B, k, possible)
+            + _derive(grammar, rng, C, n - k, possible))
+
+
+def sample_sentences(grammar: Grammar, samples: int, length: int, seed: int) -> list:
+    """
+    Sentencias de prueba: derivaciones aleatorias del símbolo inicial (como
+    las que se van a analizar), o terminales al azar del vocabulario si el
+    símbolo inicial no deriva cadenas de esa longitud
+    """
+    rng = random.Random(seed)
+    possible = _derivable_lengths(grammar, length)
+    if length in possible.get(grammar.start_symbol, ()):
+        return [' '.join(_derive(grammar, rng, grammar.start_symbol, length, possible))
+                for _ in range(samples)]
+    vocabulary = sorted(grammar.vocabulary())
+    return [' '.join(rng.choice(vocabulary) for _ in range(length)) for _ in range(samples)]
+
+
+def _probe_work(grammar: Grammar, sentences: list) -> tuple:
+    """
+    Densidad media por longitud de tramo (lista desde la longitud 1) y
+    aplicaciones de cada regla binaria, con el motor 'sets'
+    """
+    entries = Counter()
+    cells = Counter()
+    applied = Counter()
+
+    def observe(event: str, **fields):
+        if event == CELL_FILLED:
+            cells[fields["length"]] += 1
+            entries[fields["length"]] += len(fields["variables"])
+        elif event == RULE_APPLIED:
+            for head in fields["heads"]:
+                applied[(head, fields["left"], fields["right"])] += 1
+
+    parser = CYKParser(grammar, tracer=observe)
+    for sentence in sentences:
+        parser.parse(sentence)
+    density = [entries[size] / cells[size] for size in range(1, max(cells, default=0) + 1)]
+    return density, applied
+
+
+def _probe_time(grammar: Grammar, engine: str, sentences: list) -> float:
+    """Tiempo total de las sentencias de prueba (mejor de PROBE_REPEAT, con calentamiento)"""
+    parser = PROBED_ENGINES[engine](grammar)
+    parser.parse(sentences[0])  # Índices compilados del motor
+    return sum(min(parser.parse(sentence)[1] for _ in range(PROBE_REPEAT))
+               for sentence in sentences)
+
+
+def _work(density: list, n: int) -> dict:
+    """
+    Trabajo estimado de una sentencia de n tokens con la densidad dada:
+    pares (B, C), variables de las celdas izquierdas, particiones con la
+    izquierda no vacía y celdas, en total, y pares de la celda más larga
+    """
+    # Densidad para los tramos más largos que la prueba: la media de la mitad
+    # larga de la prueba sin la celda de toda la sentencia (que siempre tiene
+    # el símbolo inicial, porque las sentencias de prueba son derivaciones)
+    longer = density[len(density) // 2:-1] or density[-1:]
+    saturated = sum(longer) / len(longer)
+
+    def d(size: int) -> float:
+        return density[size - 1] if size <= len(density) else saturated
+
+    work = {"pairs": 0.0, "lefts": 0.0, "partitions": 0.0, "cells": n * (n + 1) // 2,
+            "longest_pairs": 0.0}
+    for size in range(2, n + 1):
+        cells = n - size + 1
+        work["pairs"] += cells * sum(d(k) * d(size - k) for k in range(1, size))
+        work["lefts"] += cells * sum(d(k) for k in range(1, size))
+        # Las particiones con la celda izquierda vacía se saltan casi gratis
+        work["partitions"] += cells * sum(min(1.0, d(k)) for k in range(1, size))
+        work["longest_pairs"] = sum(d(k) * d(size - k) for k in range(1, size))
+    return work
+
+
+# Unidades de trabajo de cada motor (ver el docstring del módulo)
+def _units(engine: str, work: dict) -> float:
+    return ((work["pairs"] if engine == 'sets' else work["lefts"])
+            + work["partitions"] + work["cells"])
+
+
+def _parallel_settings(estimated_time, length: int) -> dict:
+    """Opciones de llenado paralelo, o {} si no conviene en esta máquina"""
+    cpus = os.cpu_count() or 1
+    if cpus < 2:
+        return {}
+    # Solo se considera hasta 16 veces la longitud estimada: más allá
+    # convendría con sentencias que no se van a analizar
+    limit = max(length, PROBE_LENGTH) * 16
+    min_length = next((n for n in range(2, limit + 1)
+                       if estimated_time(n) >= PARALLEL_MIN_SECONDS), None)
+    if min_length is None:
+        return {}
+    return {"parallel_workers": min(cpus, MAX_PARALLEL_WORKERS),
+            "parallel_min_length": min_length}
+
+
+def profile_grammar(grammar: Grammar, length: int = DEFAULT_LENGTH, samples: int = PROBE_SAMPLES,
+                    probe_length: int = PROBE_LENGTH, seed: int = 0, verbose: bool = False) -> dict:
+    """
+    Perfil de costo de una gramática que ya está en CNF (no la modifica).
+
+    Args:
+        grammar: Gramática en CNF
+        length: Longitud de sentencia para la que se estima el costo
+        samples: Sentencias de prueba
+        probe_length: Tokens de cada sentencia de prueba
+        seed: Semilla de las sentencias de prueba
+        verbose: Imprimir un resumen
+
+    Returns:
+        Reporte con las estadísticas de las reglas (ver _shape), la densidad
+        por longitud medida en la prueba, la estimación para `length` tokens,
+        las reglas calientes y la recomendación {"engine": ..., "options": {...}}
+    """
+    if probe_length < 2:
+        raise ValueError("Las sentencias de prueba necesitan al menos 2 tokens")
+    report = _shape(grammar)
+    sentences = sample_sentences(grammar, samples, probe_length, seed) if report["terminals"] else []
+    if not sentences:
+        # Sin reglas léxicas no se acepta ninguna sentencia: cualquier motor sirve
+        density, applied = [0.0], Counter()
+        seconds_per_unit = {engine: 0.0 for engine in PROBED_ENGINES}
+    else:
+        density, applied = _probe_work(grammar, sentences)
+        probe_length = len(density)
+        probed = _work(density, probe_length)
+        seconds_per_unit = {
+            engine: _probe_time(grammar, engine, sentences) / max(1.0, len(sentences) * _units(engine, probed))
+            for engine in PROBED_ENGINES
+        }
+
+    def estimated_time(engine: str, n: int) -> float:
+        return seconds_per_unit[engine] * _units(engine, _work(density, n))
+
+    work = _work(density, length)
+    cells = length * (length + 1) // 2
+    report["density_by_length"] = density
+    report["hot_rules"] = [(f"{head} -> {B} {C}", count)
+                           for (head, B, C), count in applied.most_common(TOP)]
+    report["estimate"] = {
+        "length": length,
+        "cells": cells,
+        # Celda más larga (toda la sentencia) y promedio de la tabla
+        "checks_per_cell": work["longest_pairs"],
+        "mean_checks_per_cell": work["pairs"] / cells,
+        "checks": work["pairs"],
+        "time": {engine: estimated_time(engine, length) for engine in PROBED_ENGINES},
+    }
+
+    times = report["estimate"]["time"]
+    engine = min(times, key=lambda name: (times[name], name))
+    report["recommendation"] = {
+        "engine": engine,
+        "options": _parallel_settings(lambda n: estimated_time(engine, n), length),
+    }
+
+    if verbose:
+        print("\nPerfil de la gramática en CNF:")
+        print(f"  Variables: {report['variables']}, terminales: {report['terminals']}, "
+              f"reglas léxicas: {report['lexical_rules']}, binarias: {report['binary_rules']}")
+        print(f"  Ambigüedad léxica: {report['lexical_ambiguity']:.2f} variables por terminal "
+              f"(máximo {report['max_lexical_ambiguity']})")
+        print(f"  Pares (B, C): {report['pairs']} ({report['shared_pairs']} compartidos, "
+              f"hasta {report['max_heads_per_pair']} variables por par)")
+        recursive = report["left_recursive"]
+        print(f"  Recursión a izquierda: {len(recursive)} variables"
+              + (f" ({', '.join(recursive[:TOP])}{', ...' if len(recursive) > TOP else ''})"
+                 if recursive else ""))
+        if report["ambiguous_terminals"]:
+            print("  Terminales ambiguos: " + ', '.join(
+                f"{word} ({count})" for word, count in report["ambiguous_terminals"]))
+        if report["hot_rules"]:
+            print("  Reglas calientes: " + ', '.join(
+                f"{rule} ({count})" for rule, count in report["hot_rules"]))
+        estimate = report["estimate"]
+        print("  Densidad por longitud: " + ' '.join(f"{value:.1f}" for value in density))
+        print(f"  Estimación para {length} tokens: {estimate['checks']:.0f} pares (B, C), "
+              + ', '.join(f"{name} {seconds:.4f} s" for name, seconds in estimate["time"].items()))
+        print(f"  Recomendación: motor '{engine}' {report['recommendation']['options'] or ''}")
+    return report
+
+
+def recommend_parser(grammar: Grammar, **options) -> tuple:
+    """
+    Motor y opciones recomendados para la gramática en CNF.
+
+    El perfil se calcula una sola vez por gramática (se descarta al cambiar
+    las reglas). Las opciones dadas tienen prioridad sobre las recomendadas;
+    con viterbi=True el motor es siempre 'sets'.
+
+    Returns:
+        (engine, options) para create_parser
+    """
+    recommendation = grammar.get_derived('cost_profile', profile_grammar)["recommendation"]
+    engine = 'sets' if options.get("viterbi") else recommendation["engine"]
+    return engine, {**recommendation["options"], **options}
+
+
+if __name__ == "__main__":
+    from project_grammar import create_project_grammar
+    from grammar_loader import load_grammar_from_file
+
+    if len(sys.argv) > 1:
+        grammar = load_grammar_from_file(sys.argv[1])
+    else:
+        grammar = create_project_grammar()
+    grammar.to_cnf()
+    profile_grammar(grammar, verbose=True)
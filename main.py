@@ -1,7 +1,8 @@
 from grammar import Grammar
-from cyk_parser import CYKParser
-from grammar_loader import load_grammar_from_file
+from engines import create_parser
+from grammar_cache import load_compiled_grammar
 from project_grammar import create_project_grammar
+from tracing import ConsoleTracer
 import os
 
 
@@ -35,11 +36,14 @@ def cargar_gramatica():
                     input("\nPresiona Enter para continuar...")
                     continue
                 
-                return load_grammar_from_file('grammar.txt'), True
+                # Usa la gramática compilada (ya en CNF) si está vigente
+                return load_compiled_grammar('grammar.txt', verbose=True), True
             
             elif opcion == '2':
                 print("\nCargando gramática predefinida del proyecto...")
-                return create_project_grammar(), False
+                gramatica = create_project_grammar()
+                gramatica.to_cnf(verbose=True)
+                return gramatica, False
             
             else:
                 print("\nOpción inválida. Por favor selecciona 1 o 2.")
@@ -89,7 +93,7 @@ def ejecutar_ejemplos(grammar):
     
     for sentencia, descripcion in ejemplos:
         print(f"\n{descripcion}")
-        parser = CYKParser(grammar)
+        parser = create_parser(grammar, tracer=ConsoleTracer())
         es_aceptada, tiempo = parser.parse(sentencia)
         
         print("\n" + "-" * 70)
@@ -101,6 +105,9 @@ def ejecutar_ejemplos(grammar):
             parser.print_parse_tree_compact(arbol)
         else:
             print(f"NO - La sentencia NO es aceptada")
+            if parser.unknown_token is not None:
+                posicion, palabra = parser.unknown_token
+                print(f"Palabra desconocida: '{palabra}' (posicion {posicion})")
             print(f"Tiempo de ejecucion: {tiempo:.6f} segundos")
         print("-" * 70)
     
@@ -126,7 +133,7 @@ def modo_interactivo(grammar):
             print("Por favor ingresa una sentencia valida")
             continue
         
-        parser = CYKParser(grammar)
+        parser = create_parser(grammar, tracer=ConsoleTracer())
         es_aceptada, tiempo = parser.parse(sentencia)
         
         print("\n" + "-" * 70)
@@ -138,6 +145,9 @@ def modo_interactivo(grammar):
             parser.print_parse_tree_compact(arbol)
         else:
             print(f"NO - La sentencia NO es aceptada")
+            if parser.unknown_token is not None:
+                posicion, palabra = parser.unknown_token
+                print(f"Palabra desconocida: '{palabra}' (posicion {posicion})")
             print(f"Tiempo de ejecucion: {tiempo:.6f} segundos")
         print("-" * 70)
 
@@ -157,7 +167,6 @@ def ver_gramatica_cnf(grammar):
 print_header()
 
 gramatica, desde_archivo = cargar_gramatica()
-gramatica.to_cnf()
 
 # loop principal del programa
 while True:
@@ -174,7 +183,6 @@ while True:
                 modo_interactivo(gramatica)
             elif opcion == '3':
                 gramatica, desde_archivo = cargar_gramatica()
-                gramatica.to_cnf()
             elif opcion == '4':
                 ver_gramatica_cnf(gramatica)
             elif opcion == '5':
@@ -192,7 +200,6 @@ while True:
                 modo_interactivo(gramatica)
             elif opcion == '2':
                 gramatica, desde_archivo = cargar_gramatica()
-                gramatica.to_cnf()
             elif opcion == '3':
                 ver_gramatica_cnf(gramatica)
             elif opcion == '4':
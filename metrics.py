@@ -0,0 +1,194 @@
+"""
+Métricas en proceso: contadores, gauges e histogramas de latencia.
+
+Los parsers registran métricas solo si se les pasa un registro
+(create_parser(grammar, metrics=REGISTRY)); sin registro no se cuenta nada.
+Con registro, cada análisis suma O(1) al final más un contador por celda, y
+los percentiles se calculan recién al leerlos (export_json / export_prometheus),
+así que mientras nadie lee las métricas el costo es mínimo.
+
+Métricas de los parsers (etiqueta engine):
+    cyk_parse_seconds          histograma de la latencia de parse()
+    cyk_parses_total           análisis, con etiqueta result (accepted/rejected)
+    cyk_parse_cache_hits_total resultados tomados de ParseCache
+    cyk_cells_filled_total     celdas de la tabla calculadas (no sembradas ni de la caché)
+    cyk_binary_checks_total    pares (B, C) examinados: |izquierda|·|derecha| por partición
+    cyk_chart_entries_total    entradas de la tabla: (celda, variable), o ítems en Earley
+
+Métricas de Grammar.to_cnf() (siempre en REGISTRY):
+    cyk_cnf_seconds            histograma del tiempo de conversión
+    cyk_grammar_rules          reglas de la última gramática convertida
+    cyk_grammar_variables      variables de la última gramática convertida
+    cyk_grammar_terminals      terminales de la última gramática convertida
+
+    from metrics import REGISTRY
+    parser = create_parser(grammar, metrics=REGISTRY)
+    ...
+    print(REGISTRY.export_prometheus())
+    REGISTRY.export_json()["histograms"]["cyk_parse_seconds{engine=\"sets\"}"]["p99"]
+"""
+
+import heapq
+import json
+import math
+from collections import deque
+
+# Observaciones recientes que se conservan para los percentiles
+DEFAULT_WINDOW = 10000
+
+# Observaciones más lentas que se conservan con su etiqueta (por ejemplo la
+# sentencia), para encontrar los casos patológicos
+DEFAULT_SLOWEST = 10
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada (0.0 si está vacía)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Histogram:
+    """
+    Distribución de valores: cantidad, suma y máximo de todas las
+    observaciones, percentiles de las últimas `window` y las `slowest`
+    mayores con su etiqueta.
+    """
+
+    __slots__ = ('count', 'sum', 'max', '_recent', '_slowest', '_keep')
+
+    def __init__(self, window: int = DEFAULT_WINDOW, slowest: int = DEFAULT_SLOWEST):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+        self._slowest = []  # Montículo de mínimos (valor, etiqueta)
+        self._keep = slowest
+
+    def observe(self, value: float, label: str = None):
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+        self._recent.append(value)
+        if label is not None and self._keep:
+            if len(self._slowest) < self._keep:
+                heapq.heappush(self._slowest, (value, label))
+            elif value > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, (value, label))
+
+    def summary(self) -> dict:
+        """Cantidad, suma, media, p50/p95/p99 (ventana reciente), máximo y los más lentos"""
+        recent = sorted(self._recent)
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": percentile(recent, 0.50),
+            "p95": percentile(recent, 0.95),
+            "p99": percentile(recent, 0.99),
+            "max": self.max,
+            "slowest": [{"value": value, "label": label}
+                        for value, label in sorted(self._slowest, reverse=True)],
+        }
+
+
+def _series(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+def _series_name(series: tuple, extra: tuple = ()) -> str:
+    """Nombre con etiquetas en el formato de Prometheus: name{a="x",b="y"}"""
+    name, labels = series
+    labels = labels + extra
+    if not labels:
+        return name
+    text = ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels)
+    return f"{name}{{{text}}}"
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """Registro de métricas con nombre y etiquetas opcionales"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW, slowest: int = DEFAULT_SLOWEST):
+        self.window = window
+        self.slowest = slowest
+        self.counters = {}    # (nombre, etiquetas) -> valor
+        self.gauges = {}      # (nombre, etiquetas) -> valor
+        self.histograms = {}  # (nombre, etiquetas) -> Histogram
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = _series(name, labels)
+        self.counters[series] = self.counters.get(series, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self.gauges[_series(name, labels)] = value
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """Histograma de la serie, creado en la primera observación"""
+        series = _series(name, labels)
+        histogram = self.histograms.get(series)
+        if histogram is None:
+            histogram = self.histograms[series] = Histogram(self.window, self.slowest)
+        return histogram
+
+    def observe(self, name: str, value: float, label: str = None, **labels):
+        self.histogram(name, **labels).observe(value, label)
+
+    def reset(self):
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+    def export_json(self) -> dict:
+        """Instantánea de todas las métricas (serializable con json.dumps)"""
+        return {
+            "counters": {_series_name(series): value
+                         for series, value in sorted(self.counters.items())},
+            "gauges": {_series_name(series): value
+                       for series, value in sorted(self.gauges.items())},
+            "histograms": {_series_name(series): histogram.summary()
+                           for series, histogram in sorted(self.histograms.items(),
+                                                           key=lambda item: item[0])},
+        }
+
+    def export_json_text(self) -> str:
+        return json.dumps(self.export_json(), ensure_ascii=False)
+
+    def export_prometheus(self) -> str:
+        """
+        Formato de texto de Prometheus. Los histogramas se exportan como
+        summary: cuantiles 0.5, 0.95 y 0.99 de la ventana reciente, _sum y _count.
+        """
+        lines = []
+        typed = set()
+
+        def declare(name: str, kind: str):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for series, value in sorted(self.counters.items()):
+            declare(series[0], "counter")
+            lines.append(f"{_series_name(series)} {value}")
+        for series, value in sorted(self.gauges.items()):
+            declare(series[0], "gauge")
+            lines.append(f"{_series_name(series)} {value}")
+        for series, histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            declare(series[0], "summary")
+            summary = histogram.summary()
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                lines.append(f"{_series_name(series, (('quantile', quantile),))} {summary[key]}")
+            name, labels = series
+            lines.append(f"{_series_name((name + '_sum', labels))} {summary['sum']}")
+            lines.append(f"{_series_name((name + '_count', labels))} {summary['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registro por defecto del proceso
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,198 @@
+"""
+Llenado paralelo de la tabla CYK por frentes de onda.
+
+Todas las celdas de una misma longitud dependen solo de celdas más cortas,
+así que cada nivel de la tabla (una antidiagonal) se reparte en rangos
+contiguos de posiciones iniciales entre varios workers:
+
+- Con el GIL (CPython normal) se usan procesos. Cada proceso tiene su propio
+  parser con una copia de la tabla; al empezar un nivel recibe solo las
+  celdas del nivel anterior (O(n) celdas por nivel, no la tabla completa),
+  llena su rango y devuelve esas celdas. Con el motor 'bitset' cada celda es
+  un entero, así que copiar y combinar un nivel es casi gratis.
+- En builds sin GIL (free-threaded) se usan hilos que escriben directamente
+  en la tabla del parser, sin copias.
+
+Cada celda se calcula con el mismo _fill_cell que el llenado secuencial y
+sobre el mismo contenido, así que el resultado (celdas y back-pointers) es
+idéntico. Los niveles con pocas celdas se llenan en el proceso principal.
+
+    parser = create_parser(grammar, parallel_workers=4, parallel_min_length=300)
+    parser.parse(sentencia_larga)   # paralelo solo con 300 tokens o más
+    parser.close()                  # termina los workers
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pipe, Process
+
+# Celdas mínimas por worker para repartir un nivel; con menos, el costo de
+# comunicación supera al del llenado
+MIN_CELLS_PER_WORKER = 4
+
+# True en builds de CPython sin GIL: los hilos llenan celdas en paralelo
+FREE_THREADED = hasattr(sys, '_is_gil_enabled') and not sys._is_gil_enabled()
+
+
+def _split(start: int, stop: int, parts: int) -> list:
+    """Divide range(start, stop) en `parts` rangos contiguos de tamaño parejo"""
+    size, extra = divmod(stop - start, parts)
+    ranges = []
+    for part in range(parts):
+        end = start + size + (1 if part < extra else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _worker_main(conn, parser_class, grammar, options: dict):
+    """Bucle de un proceso worker: mensajes ('start' | 'level' | 'stop', ...)"""
+    parser = parser_class(grammar, **options)
+    while True:
+        message = conn.recv()
+        try:
+            if message[0] == 'start':
+                parser._begin_chart(message[1])
+                for i in range(len(message[1])):
+                    parser._fill_lexical(i)
+                continue
+            if message[0] == 'stop':
+                break
+            _, length, previous, start, stop = message
+            chart = parser.chart
+            if previous is not None:
+                # Nivel anterior completo: solo lo que lee _fill_cell (el
+                # contenido y, en modo Viterbi, los puntajes)
+                j, values, scores = previous
+                for i, value in enumerate(values):
+                    chart.set(i, j, value, scores=scores[i] if scores is not None else None)
+            for i in range(start, stop):
+                parser._fill_cell(i, length)
+            conn.send([chart.export_cell(i, length - 1) for i in range(start, stop)])
+        except Exception as error:  # El proceso principal vuelve a lanzar el error
+            conn.send(error)
+    conn.close()
+
+
+class ParallelFiller:
+    """Pool de workers persistente para llenar la tabla de un parser"""
+
+    def __init__(self, parser, workers: int):
+        self.parser = parser
+        self.workers = workers
+        self.use_threads = FREE_THREADED
+        self._executor = None
+        self._connections = []
+        self._processes = []
+
+    def _start_workers(self):
+        if self.use_threads:
+            self._executor = ThreadPoolExecutor(self.workers)
+            return
+        parser = self.parser
+        options = {
+            "keep_all_derivations": parser.keep_all_derivations,
+            "recognize_only": parser.recognize_only,
+            "viterbi": parser.viterbi,
+            "beam": parser.beam,
+            "threshold": parser.threshold,
+        }
+        for _ in range(self.workers):
+            conn, child_conn = Pipe()
+            process = Process(target=_worker_main, daemon=True,
+                              args=(child_conn, type(parser), parser.grammar, options))
+            process.start()
+            child_conn.close()
+            self._connections.append(conn)
+            self._processes.append(process)
+
+    def fill(self, n: int):
+        """
+        Llena los niveles 2..n de la tabla del parser (la tabla ya está creada
+        con _begin_chart y la diagonal llena).
+        """
+        if self._executor is None and not self._connections:
+            self._start_workers()
+        try:
+            if self.use_threads:
+                self._fill_threads(n)
+            else:
+                self._fill_processes(n)
+        except BaseException:
+            # Los workers pueden quedar a mitad de un nivel: se descartan
+            self.close()
+            raise
+
+    def _fill_threads(self, n: int):
+        parser = self.parser
+        for length in range(2, n + 1):
+            count = n - length + 1
+            if count < self.workers * MIN_CELLS_PER_WORKER:
+                for i in range(count):
+                    parser._fill_cell(i, length)
+                continue
+            futures = [self._executor.submit(_fill_range, parser, length, start, stop)
+                       for start, stop in _split(0, count, self.workers)]
+            for future in futures:
+                future.result()
+
+    def _fill_processes(self, n: int):
+        parser = self.parser
+        chart = parser.chart
+        for conn in self._connections:
+            conn.send(('start', parser.words))
+
+        # Nivel anterior que los workers aún no tienen completo: (j, contenidos,
+        # puntajes); la diagonal la llena cada worker al empezar
+        previous = None
+        for length in range(2, n + 1):
+            count = n - length + 1
+            if count < self.workers * MIN_CELLS_PER_WORKER:
+                # Niveles altos (pocas celdas): en el proceso principal. Los
+                # niveles siguientes también son chicos, así que los workers
+                # ya no necesitan estas celdas.
+                for i in range(count):
+                    parser._fill_cell(i, length)
+                continue
+
+            ranges = _split(0, count, self.workers)
+            for conn, (start, stop) in zip(self._connections, ranges):
+                conn.send(('level', length, previous, start, stop))
+            values = []
+            scores = [] if chart.scores is not None else None
+            for conn, (start, stop) in zip(self._connections, ranges):
+                states = conn.recv()
+                if isinstance(states, Exception):
+                    raise states
+                for i, state in zip(range(start, stop), states):
+                    chart.import_cell(i, length - 1, state)
+                    values.append(state[0])
+                    if scores is not None:
+                        scores.append(state[3])
+            # Cada worker recibe el nivel completo con el próximo mensaje
+            # (también su propio rango, que sobrescribe con el mismo contenido)
+            previous = (length - 1, values, scores)
+
+    def close(self):
+        """Termina los workers (se vuelven a crear en el próximo fill)"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for conn in self._connections:
+            try:
+                conn.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        self._connections = []
+        self._processes = []
+
+
+def _fill_range(parser, length: int, start: int, stop: int):
+    for i in range(start, stop):
+        parser._fill_cell(i, length)
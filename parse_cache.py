@@ -0,0 +1,132 @@
+"""
+Caché LRU de resultados de parsing.
+
+La clave es la huella de las reglas de la gramática en CNF más la tupla de
+tokens normalizados; el valor es (aceptada, árbol compacto) (en modo Viterbi,
+además la log probabilidad del árbol). Como la huella
+cambia cuando cambian las reglas (por ejemplo al recargar y volver a
+ejecutar to_cnf()), los resultados de una gramática anterior nunca se
+reutilizan y se descartan al detectar el cambio.
+
+Formato del árbol compacto (tuplas anidadas):
+    (variable, palabra)            para A -> palabra
+    (variable, izquierdo, derecho) para A -> B C
+"""
+
+from collections import OrderedDict
+
+
+class ParseCache:
+    """Caché de resultados con memoria acotada y desalojo LRU"""
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize <= 0:
+            raise ValueError("El tamaño de la caché debe ser positivo")
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        # id(gramática) -> última huella vista, para detectar cambios
+        self._fingerprints = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def make_key(self, grammar, tokens, variant: tuple = None) -> tuple:
+        """
+        Clave de caché para una gramática y una secuencia de tokens. variant
+        distingue modos del parser que dan otro árbol (por ejemplo Viterbi).
+        """
+        fingerprint = grammar.fingerprint()
+        previous = self._fingerprints.get(id(grammar))
+        if previous != fingerprint:
+            if previous is not None:
+                self._invalidate(previous)
+            self._fingerprints[id(grammar)] = fingerprint
+        if variant is not None:
+            return (fingerprint, tuple(tokens), variant)
+        return (fingerprint, tuple(tokens))
+
+    def _invalidate(self, fingerprint: str):
+        """Descarta los resultados de una versión anterior de la gramática"""
+        stale = [key for key in self._entries if key[0] == fingerprint]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def get(self, key: tuple):
+        """Devuelve (aceptada, árbol compacto) o None si no está en la caché"""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value: tuple):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._fingerprints.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def compact_tree(tree: dict) -> tuple:
+    """Convierte un parse tree (diccionarios) a tuplas anidadas"""
+    # Postorden con pila explícita: las tuplas se arman cuando sus hijos ya
+    # están en `results`
+    results = []
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if "terminal" in node:
+            results.append((node["node"], node["terminal"]))
+        elif "left" in node and "right" in node:
+            if expanded:
+                right = results.pop()
+                left = results.pop()
+                results.append((node["node"], left, right))
+            else:
+                stack.append((node, True))
+                stack.append((node["right"], False))
+                stack.append((node["left"], False))
+        else:
+            results.append((node["node"],))
+    return results[0]
+
+
+def expand_tree(compact: tuple) -> dict:
+    """Convierte un árbol compacto al formato de build_parse_tree"""
+    root = {"node": compact[0]}
+    stack = [(compact, root)]
+    while stack:
+        compact, tree = stack.pop()
+        if len(compact) == 2:
+            tree["terminal"] = compact[1]
+        elif len(compact) == 3:
+            left = {"node": compact[1][0]}
+            right = {"node": compact[2][0]}
+            tree["left"] = left
+            tree["right"] = right
+            stack.append((compact[2], right))
+            stack.append((compact[1], left))
+    return root
@@ -0,0 +1,473 @@
+"""
+Servicio local de parsing sobre TCP (asyncio, sin dependencias externas).
+
+La gramática se carga y se convierte a CNF una sola vez al iniciar. Cada
+conexión envía un pedido JSON por línea y recibe una respuesta JSON por
+línea (con el mismo "id"; las respuestas pueden llegar en otro orden):
+
+    {"id": 1, "sentence": "she eats a cake"}
+    {"id": 1, "accepted": true, "time": 0.0003, "latency": 0.006, ...}
+
+    {"id": 2, "sentence": "...", "timeout": 0.5}   tiempo máximo propio
+    {"command": "health"}                            estado del servicio
+    {"command": "stats"}                             cola, lotes y latencias
+    {"command": "metrics"}                           métricas en texto de Prometheus
+                                                     ("format": "json" para JSON)
+
+Una línea que no es JSON se toma como la sentencia (útil con nc/telnet).
+
+Los pedidos de todas las conexiones entran a una cola acotada y se agrupan
+en lotes: el lote se despacha al juntar batch_size sentencias o al pasar
+batch_window segundos desde la primera. Los lotes se analizan en un pool
+de procesos (ver batch.py), con a lo sumo un lote en curso por proceso.
+
+Contrapresión: si la cola está llena, la conexión deja de leer hasta que
+haya lugar (el cliente queda frenado por TCP), y cada conexión tiene un
+máximo de pedidos sin responder. Un pedido que vence antes de despacharse
+no se analiza.
+
+Uso:
+    python parse_server.py --grammar proyecto --port 8765 --workers 4
+    printf '{"id": 1, "sentence": "she eats a cake"}\\n' | nc 127.0.0.1 8765
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import init_worker, parse_sentence
+from batch_cli import load_grammar
+from engines import AUTO_ENGINE, ENGINES, ORIGINAL_GRAMMAR_ENGINES
+from grammar import Grammar
+from grammar_optimizer import optimize_grammar
+from grammar_profiler import recommend_parser
+from metrics import MetricsRegistry
+from tree_format import to_json
+
+
+# Latencias que se conservan para los percentiles de stats
+LATENCY_WINDOW = 10000
+
+# Longitud máxima de una línea de pedido (bytes)
+MAX_LINE = 1 << 20
+
+
+def _parse_batch(sentences: list) -> list:
+    """Analiza un lote en un proceso del pool (parser creado por init_worker)"""
+    return [parse_sentence(sentence) for sentence in sentences]
+
+
+class _Request:
+    """Pedido en la cola: sentencia, momento de llegada y futuro de la respuesta"""
+
+    __slots__ = ('sentence', 'received', 'deadline', 'future')
+
+    def __init__(self, sentence: str, received: float, deadline: float, future):
+        self.sentence = sentence
+        self.received = received
+        self.deadline = deadline
+        self.future = future
+
+
+class ParseServer:
+    """
+    Servicio de parsing con lotes y pool de procesos.
+
+    Args:
+        grammar: Gramática en CNF
+        workers: Procesos del pool (por defecto, uno por núcleo)
+        engine: Motor de parsing (por defecto grammar.engine; 'auto' según el perfil de la gramática)
+        batch_size: Máximo de sentencias por lote
+        batch_window: Segundos que se espera a completar un lote
+        max_queue: Pedidos en cola antes de aplicar contrapresión
+        max_pending: Pedidos sin responder por conexión
+        timeout: Tiempo máximo por pedido en segundos (None = sin límite)
+        build_trees: Incluir el parse tree de las sentencias aceptadas
+    """
+
+    def __init__(self, grammar: Grammar, workers: int = None, engine: str = None,
+                 batch_size: int = 64, batch_window: float = 0.005, max_queue: int = 1024,
+                 max_pending: int = 256, timeout: float = 10.0, build_trees: bool = False):
+        if batch_size < 1 or max_queue < 1 or max_pending < 1:
+            raise ValueError("batch_size, max_queue y max_pending deben ser positivos")
+        self.grammar = grammar
+        self.workers = workers or os.cpu_count() or 1
+        self.engine = engine or grammar.engine
+        if self.engine == AUTO_ENGINE:
+            # Se perfila una sola vez aquí y no en cada proceso; las opciones
+            # de llenado paralelo no se usan (el pool ya reparte las sentencias)
+            self.engine = recommend_parser(grammar)[0]
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_queue = max_queue
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.build_trees = build_trees
+
+        self._queue = None
+        self._pool = None
+        self._server = None
+        self._batcher = None
+        self._slots = None  # Un lote en curso por proceso
+        self._started = None
+        self._clients = set()  # Tareas de las conexiones abiertas
+        self._running = set()  # Lotes enviados al pool que aún no terminan
+
+        self.requests = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_sentences = 0
+        self.in_flight = 0
+        self.connections = 0
+        # Latencia de punta a punta de cada pedido (las más lentas con su sentencia)
+        self.metrics = MetricsRegistry(window=LATENCY_WINDOW)
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765):
+        """Inicia el pool, el armado de lotes y el servidor TCP"""
+        self._queue = asyncio.Queue(self.max_queue)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._pool = ProcessPoolExecutor(
+            self.workers, initializer=init_worker,
+            initargs=(self.grammar, self.engine, self.build_trees),
+        )
+        self._started = time.monotonic()
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self._server = await asyncio.start_server(self._handle_client, host, port, limit=MAX_LINE)
+        return self._server
+
+    @property
+    def port(self) -> int:
+        """Puerto en el que escucha (útil con port=0)"""
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Deja de aceptar conexiones y termina el pool"""
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._clients):
+            task.cancel()
+        if self._clients:
+            await asyncio.gather(*self._clients, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+        if self._pool is not None:
+            # Los lotes que aún no empezaron se cancelan (equivale a
+            # shutdown(cancel_futures=True), que necesita Python 3.9)
+            for future in list(self._running):
+                future.cancel()
+            self._pool.shutdown()
+
+    # -----------------------------------------------------------------------
+    # Conexiones
+    # -----------------------------------------------------------------------
+
+    async def _handle_client(self, reader, writer):
+        self.connections += 1
+        self._clients.add(asyncio.current_task())
+        pending = asyncio.Semaphore(self.max_pending)
+        tasks = set()
+        try:
+            while True:
+                # Contrapresión por conexión: no leer más allá de max_pending
+                await pending.acquire()
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    pending.release()
+                    await self._write(writer, {"error": "línea demasiado larga"})
+                    break
+                if not line:
+                    pending.release()
+                    break
+                line = line.decode('utf-8', errors='replace').strip()
+                if not line:
+                    pending.release()
+                    continue
+                task = asyncio.create_task(self._answer(line, writer, pending))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # Cierre del servicio: se descartan los pedidos sin responder
+            for task in tasks:
+                task.cancel()
+        finally:
+            self.connections -= 1
+            self._clients.discard(asyncio.current_task())
+            writer.close()
+
+    async def _answer(self, line: str, writer, pending):
+        try:
+            response = await self._respond(line)
+            await self._write(writer, response)
+        finally:
+            pending.release()
+
+    @staticmethod
+    async def _write(writer, response):
+        text = response if isinstance(response, str) else json.dumps(response, ensure_ascii=False)
+        writer.write(text.encode('utf-8') + b"\n")
+        await writer.drain()
+
+    async def _respond(self, line: str):
+        """Respuesta (diccionario o texto JSON) para una línea de pedido"""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            message = {"sentence": line}
+        if not isinstance(message, dict):
+            message = {"sentence": str(message)}
+
+        request_id = message.get("id")
+        command = message.get("command")
+        if command == "health":
+            return {"id": request_id, **self.health()}
+        if command == "stats":
+            return {"id": request_id, **self.stats()}
+        if command == "metrics":
+            self._export_gauges()
+            if message.get("format") == "json":
+                return {"id": request_id, **self.metrics.export_json()}
+            return {"id": request_id, "text": self.metrics.export_prometheus()}
+        if command is not None:
+            return {"id": request_id, "error": f"comando desconocido '{command}'"}
+
+        sentence = message.get("sentence")
+        if not isinstance(sentence, str):
+            self.errors += 1
+            return {"id": request_id, "error": "falta 'sentence' (texto)"}
+        timeout = message.get("timeout", self.timeout)
+        if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0):
+            self.errors += 1
+            return {"id": request_id, "error": "'timeout' debe ser un número positivo"}
+
+        try:
+            result, latency = await self.parse(sentence, timeout)
+        except asyncio.TimeoutError:
+            return {"id": request_id, "error": "timeout"}
+        except Exception as error:
+            self.errors += 1
+            return {"id": request_id, "error": f"{type(error).__name__}: {error}"}
+
+        response = {"id": request_id, "accepted": result["accepted"],
+                    "time": result["time"], "latency": latency}
+        if "unknown_token" in result:
+            position, token = result["unknown_token"]
+            response["unknown_token"] = {"position": position, "token": token}
+        text = json.dumps(response, ensure_ascii=False)
+        if self.build_trees:
+            # Igual que batch_cli: el árbol se serializa sin recursión
+            tree = result.get("tree")
+            tree = to_json(tree, ensure_ascii=False) if tree is not None else "null"
+            text = f'{text[:-1]}, "tree": {tree}}}'
+        return text
+
+    # -----------------------------------------------------------------------
+    # Cola y lotes
+    # -----------------------------------------------------------------------
+
+    async def parse(self, sentence: str, timeout: float = None):
+        """
+        Encola una sentencia y espera su resultado.
+
+        Returns:
+            (resultado de batch.parse_sentence, latencia total en segundos)
+
+        Raises:
+            asyncio.TimeoutError: Si vence el tiempo máximo (contando la espera
+                en la cola)
+        """
+        loop = asyncio.get_running_loop()
+        received = time.monotonic()
+        deadline = received + timeout if timeout is not None else None
+        request = _Request(sentence, received, deadline, loop.create_future())
+        self.requests += 1
+        try:
+            await asyncio.wait_for(self._enqueue_and_wait(request), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            # Si aún no se despachó, el armado de lotes lo descarta
+            request.future.cancel()
+            raise
+        latency = time.monotonic() - received
+        self.completed += 1
+        self.metrics.observe('parse_server_latency_seconds', latency, sentence)
+        return request.future.result(), latency
+
+    async def _enqueue_and_wait(self, request: _Request):
+        # put() espera si la cola está llena (contrapresión)
+        await self._queue.put(request)
+        await asyncio.shield(request.future)
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            first = await queue.get()
+            batch = [first]
+            window_end = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = window_end - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Los pedidos vencidos o cancelados no se analizan
+            now = time.monotonic()
+            batch = [request for request in batch if not request.future.done()
+                     and (request.deadline is None or request.deadline > now)]
+            if not batch:
+                continue
+
+            # Un lote en curso por proceso: si todos están ocupados, la cola crece
+            await self._slots.acquire()
+            self.in_flight += 1
+            self.batches += 1
+            self.batched_sentences += len(batch)
+            future = loop.run_in_executor(self._pool, _parse_batch,
+                                          [request.sentence for request in batch])
+            self._running.add(future)
+            future.add_done_callback(lambda done, batch=batch: self._batch_done(done, batch))
+
+    def _batch_done(self, done, batch: list):
+        self._running.discard(done)
+        self.in_flight -= 1
+        self._slots.release()
+        error = done.exception() if not done.cancelled() else asyncio.CancelledError()
+        if error is not None:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(error)
+            return
+        for request, result in zip(batch, done.result()):
+            if not request.future.done():
+                request.future.set_result(result)
+
+    # -----------------------------------------------------------------------
+    # Estado
+    # -----------------------------------------------------------------------
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "grammar": self.grammar.fingerprint()[:12],
+            "engine": self.engine,
+            "workers": self.workers,
+            "uptime": time.monotonic() - self._started if self._started is not None else 0.0,
+        }
+
+    def _export_gauges(self):
+        """Copia los contadores del servicio al registro de métricas"""
+        metrics = self.metrics
+        metrics.set_gauge('parse_server_queue_depth',
+                          self._queue.qsize() if self._queue is not None else 0)
+        metrics.set_gauge('parse_server_in_flight_batches', self.in_flight)
+        metrics.set_gauge('parse_server_connections', self.connections)
+        for name in ('requests', 'completed', 'timeouts', 'errors', 'batches'):
+            metrics.set_gauge(f'parse_server_{name}', getattr(self, name))
+
+    def stats(self) -> dict:
+        latency = self.metrics.histogram('parse_server_latency_seconds').summary()
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "in_flight_batches": self.in_flight,
+            "connections": self.connections,
+            "requests": self.requests,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_sentences / self.batches if self.batches else 0.0,
+            "latency": {
+                "samples": latency["count"],
+                "p50": latency["p50"],
+                "p95": latency["p95"],
+                "p99": latency["p99"],
+                "max": latency["max"],
+            },
+        }
+
+
+async def _serve(server: ParseServer, host: str, port: int):
+    await server.start(host, port)
+    print(f"Servicio de parsing en {host}:{server.port} "
+          f"({server.workers} procesos, motor '{server.engine}')", file=sys.stderr)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(
+        description="Servicio local de parsing CYK (JSON por línea sobre TCP)"
+    )
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--grammar', choices=['archivo', 'proyecto'], default='proyecto',
+                            help="gramática desde archivo o la predefinida del proyecto")
+    arg_parser.add_argument('--grammar-file', default='grammar.txt',
+                            help="archivo de gramática para --grammar archivo")
+    arg_parser.add_argument('--optimize', action='store_true',
+                            help="optimizar la gramática en CNF")
+    arg_parser.add_argument('--engine', choices=sorted(ENGINES) + [AUTO_ENGINE], default=None,
+                            help="motor de parsing ('auto': el que recomienda el perfil de la gramática)")
+    arg_parser.add_argument('--workers', type=int, default=None,
+                            help="procesos del pool (por defecto, uno por núcleo)")
+    arg_parser.add_argument('--batch-size', type=int, default=64)
+    arg_parser.add_argument('--batch-window', type=float, default=0.005,
+                            help="segundos de espera para completar un lote")
+    arg_parser.add_argument('--max-queue', type=int, default=1024,
+                            help="pedidos en cola antes de frenar las conexiones")
+    arg_parser.add_argument('--timeout', type=float, default=10.0,
+                            help="tiempo máximo por pedido en segundos")
+    arg_parser.add_argument('--trees', action='store_true',
+                            help="incluir el parse tree de las sentencias aceptadas")
+    args = arg_parser.parse_args(argv)
+    original = args.engine in ORIGINAL_GRAMMAR_ENGINES
+    if original and args.optimize:
+        arg_parser.error(f"--optimize no se usa con --engine {args.engine} (gramática original)")
+
+    try:
+        grammar = load_grammar(args.grammar, args.grammar_file, cnf=not original)
+    except (OSError, ValueError) as error:
+        print(f"Error al cargar la gramática: {error}", file=sys.stderr)
+        return 1
+    if args.optimize:
+        print(f"Optimización: {optimize_grammar(grammar)}", file=sys.stderr)
+
+    server = ParseServer(grammar, args.workers, args.engine, args.batch_size,
+                         args.batch_window, args.max_queue, timeout=args.timeout,
+                         build_trees=args.trees)
+    try:
+        asyncio.run(_serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
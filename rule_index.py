@@ -0,0 +1,219 @@
+import math
+from collections import defaultdict
+from typing import Dict, Set, Tuple
+
+
+class RuleIndex:
+    """Índices precalculados sobre las reglas de una gramática en CNF.
+
+    - lexical: terminal -> conjunto de variables A con A -> terminal
+    - binary: (B, C) -> conjunto de variables A con A -> B C
+    - by_left: B -> {C: ((A, orden), ...)}, para recorrer solo los pares
+      (B, C) que realmente aparecen en la gramática
+
+    El orden de cada regla binaria es su posición al recorrer grammar.rules,
+    y permite al parser elegir el mismo back-pointer que el recorrido lineal.
+    """
+
+    def __init__(self, grammar):
+        self.lexical: Dict[str, Set[str]] = defaultdict(set)
+        self.binary: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self.by_left: Dict[str, Dict[str, tuple]] = {}
+
+        by_left = defaultdict(lambda: defaultdict(list))
+        order = 0
+        for variable, productions in grammar.rules.items():
+            for prod in productions:
+                if len(prod) == 1:
+                    self.lexical[prod[0]].add(variable)
+                elif len(prod) == 2:
+                    B, C = prod
+                    self.binary[(B, C)].add(variable)
+                    by_left[B][C].append((variable, order))
+                order += 1
+
+        # Congelar las listas internas en tuplas (más compactas y de solo lectura)
+        for B, by_right in by_left.items():
+            self.by_left[B] = {C: tuple(heads) for C, heads in by_right.items()}
+
+    def to_state(self) -> tuple:
+        """Estado serializable (solo tipos básicos) para guardar el índice"""
+        return (
+            {word: frozenset(variables) for word, variables in self.lexical.items()},
+            {pair: frozenset(heads) for pair, heads in self.binary.items()},
+            self.by_left,
+        )
+
+    @classmethod
+    def from_state(cls, state: tuple) -> 'RuleIndex':
+        """Reconstruye el índice desde to_state() sin recorrer la gramática"""
+        lexical, binary, by_left = state
+        index = cls.__new__(cls)
+        index.lexical = defaultdict(set, {word: set(v) for word, v in lexical.items()})
+        index.binary = defaultdict(set, {pair: set(h) for pair, h in binary.items()})
+        index.by_left = by_left
+        return index
+
+    def lexical_variables(self, word: str) -> Set[str]:
+        """Variables A con A -> word (conjunto vacío si no hay ninguna)"""
+        return self.lexical.get(word, set())
+
+
+class ViterbiIndex:
+    """Reglas de una PCFG en CNF con log-probabilidades, para el CYK Viterbi.
+
+    - lexical: terminal -> ((A, log p), ...) con A -> terminal
+    - by_left: B -> {C: ((A, log p), ...)} con A -> B C
+
+    Las probabilidades salen de grammar.rule_probabilities() (equiprobables
+    por variable si la gramática no tiene probabilidades).
+    """
+
+    def __init__(self, grammar):
+        probabilities = grammar.rule_probabilities()
+        lexical = defaultdict(dict)
+        by_left = defaultdict(lambda: defaultdict(dict))
+        for variable, productions in grammar.rules.items():
+            for prod in productions:
+                log_probability = math.log(probabilities[(variable, prod)])
+                if len(prod) == 1:
+                    heads = lexical[prod[0]]
+                else:
+                    heads = by_left[prod[0]][prod[1]]
+                # Una regla repetida cuenta una sola vez
+                heads[variable] = max(heads.get(variable, -math.inf), log_probability)
+
+        self.lexical: Dict[str, tuple] = {
+            word: tuple(heads.items()) for word, heads in lexical.items()
+        }
+        self.by_left: Dict[str, Dict[str, tuple]] = {
+            B: {C: tuple(heads.items()) for C, heads in by_right.items()}
+            for B, by_right in by_left.items()
+        }
+
+
+def _propagate(masks: dict, dependents: dict) -> dict:
+    """
+    Propaga máscaras por las aristas B -> [A, ...] (masks[A] contiene a
+    masks[B]) hasta llegar a un punto fijo.
+    """
+    queue = list(masks)
+    while queue:
+        source = queue.pop()
+        mask = masks[source]
+        for target in dependents.get(source, ()):
+            current = masks.get(target, 0)
+            if current | mask != current:
+                masks[target] = current | mask
+                queue.append(target)
+    return masks
+
+
+class ReachabilityIndex:
+    """Relaciones de arriba hacia abajo sobre una gramática en CNF.
+
+    Una variable A en la celda de la subcadena [i, e] solo puede formar parte
+    de un S que cubra toda la entrada [0, n-1] si existe un camino S -> ... -> A
+    de hijos izquierdos/derechos compatible con la posición de la celda:
+
+    - prefix: celdas con i = 0 y e < n-1 (camino de solo hijos izquierdos)
+    - suffix: celdas con i > 0 y e = n-1 (camino de solo hijos derechos)
+    - inner: celdas con i > 0 y e < n-1 (al menos un paso de cada tipo)
+    - la celda completa solo necesita el símbolo inicial
+
+    y los tokens vecinos deben poder aparecer junto a A: el token e+1 debe
+    poder seguir a A (FOLLOW) y el token i-1 debe poder precederla (PRECEDE).
+    FIRST, LAST, FOLLOW y PRECEDE se calculan como máscaras de bits sobre los
+    terminales, a partir de qué variables son hijo izquierdo o derecho de cuáles.
+
+    Además, heads: B -> {C: frozenset de A con A -> B C}, para el llenado sin
+    back-pointers.
+    """
+
+    def __init__(self, grammar):
+        start = grammar.start_symbol
+        children = defaultdict(list)  # A -> [(B, C), ...]
+        heads = defaultdict(lambda: defaultdict(set))
+        lexical = defaultdict(list)   # A -> [terminal, ...]
+        for variable, productions in grammar.rules.items():
+            for prod in productions:
+                if len(prod) == 2:
+                    children[variable].append(prod)
+                    heads[prod[0]][prod[1]].add(variable)
+                else:
+                    lexical[variable].append(prod[0])
+
+        self.start = start
+        self.heads: Dict[str, Dict[str, frozenset]] = {
+            B: {C: frozenset(h) for C, h in by_right.items()} for B, by_right in heads.items()
+        }
+
+        # Estados (variable, pasos): bit 1 = algún paso izquierdo, bit 2 = algún
+        # paso derecho desde la raíz
+        seen = {(start, 0)}
+        stack = [(start, 0)]
+        while stack:
+            variable, steps = stack.pop()
+            for B, C in children.get(variable, ()):
+                for state in ((B, steps | 1), (C, steps | 2)):
+                    if state not in seen:
+                        seen.add(state)
+                        stack.append(state)
+
+        self.full = frozenset((start,))
+        self.prefix = frozenset(v for v, steps in seen if steps == 1)
+        self.suffix = frozenset(v for v, steps in seen if steps == 2)
+        self.inner = frozenset(v for v, steps in seen if steps == 3)
+
+        # Terminal -> bit
+        self.terminal_bit = {t: bit for bit, t in enumerate(sorted(
+            {t for words in lexical.values() for t in words}))}
+        first = {A: 0 for A in children}
+        for A, words in lexical.items():
+            first[A] = sum(1 << b for b in {self.terminal_bit[t] for t in words})
+        last = dict(first)
+        follow = {}
+        precede = {}
+        first_edges = defaultdict(list)    # B -> A con A -> B C
+        last_edges = defaultdict(list)     # C -> A con A -> B C
+        follow_edges = defaultdict(list)   # X -> A con X -> B A
+        precede_edges = defaultdict(list)  # X -> A con X -> A C
+        for X, pairs in children.items():
+            for B, C in pairs:
+                first_edges[B].append(X)
+                last_edges[C].append(X)
+                follow_edges[X].append(C)
+                precede_edges[X].append(B)
+        _propagate(first, first_edges)
+        _propagate(last, last_edges)
+        for X, pairs in children.items():
+            for B, C in pairs:
+                follow[B] = follow.get(B, 0) | first.get(C, 0)
+                precede[C] = precede.get(C, 0) | last.get(B, 0)
+        self.follow = _propagate(follow, follow_edges)
+        self.precede = _propagate(precede, precede_edges)
+        self._followed_by = {}
+        self._preceded_by = {}
+
+    def allowed(self, i: int, end: int, n: int) -> frozenset:
+        """Variables que pueden aparecer en la celda [i, end] de una entrada de n tokens"""
+        if i == 0:
+            return self.full if end == n - 1 else self.prefix
+        return self.suffix if end == n - 1 else self.inner
+
+    def followed_by(self, word: str) -> frozenset:
+        """Variables que pueden ir inmediatamente antes del token `word`"""
+        return self._context(word, self.follow, self._followed_by)
+
+    def preceded_by(self, word: str) -> frozenset:
+        """Variables que pueden ir inmediatamente después del token `word`"""
+        return self._context(word, self.precede, self._preceded_by)
+
+    def _context(self, word: str, relation: dict, memo: dict) -> frozenset:
+        variables = memo.get(word)
+        if variables is None:
+            bit = self.terminal_bit.get(word)
+            variables = frozenset(A for A, mask in relation.items()
+                                  if bit is not None and mask >> bit & 1)
+            memo[word] = variables
+        return variables
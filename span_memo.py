@@ -0,0 +1,75 @@
+"""
+Memoria de frases entre sentencias.
+
+En un corpus las sentencias comparten frases ("a cake with a fork", "the
+cat"), y el contenido de una celda CYK depende solo de los tokens de su
+tramo: las variables, los back-pointers (con la partición relativa al
+inicio del tramo) y, en modo Viterbi, los puntajes son los mismos en
+cualquier sentencia donde aparezca la frase. SpanMemo guarda, para cada
+frase de min_length a max_length tokens, el contenido completo de su celda;
+la subtabla de una frase son las celdas de sus subfrases, que se guardan con
+su propia clave.
+
+Antes del llenado el parser siembra la tabla nueva con las frases que ya
+están en la memoria y después llena solo las celdas que faltan; al terminar
+guarda las celdas calculadas. El tramo de toda la sentencia nunca se guarda
+ni se siembra (de eso se encarga ParseCache, y en modo Viterbi con beam esa
+celda no se poda).
+
+    memo = SpanMemo(maxsize=100000)
+    parser = create_parser(grammar, span_memo=memo)
+    for sentence in corpus:
+        parser.parse(sentence)
+    print(memo.stats())   # hits, misses, hit_rate, ...
+
+Las claves tienen la huella de la gramática, así que como en ParseCache las
+frases de una versión anterior de la gramática se descartan solas.
+
+Copiar una celda cuesta casi lo mismo que calcularla en gramáticas chicas:
+solo conviene cuando el corpus repite frases largas y las celdas son caras
+(gramáticas densas). En los benchmarks del proyecto no acelera (ver README).
+"""
+
+from parse_cache import ParseCache
+
+
+class SpanMemo(ParseCache):
+    """Frases (tuplas de tokens) -> celda CYK, con memoria acotada y desalojo LRU"""
+
+    def __init__(self, maxsize: int = 65536, min_length: int = 2, max_length: int = 16):
+        super().__init__(maxsize)
+        if not 2 <= min_length <= max_length:
+            raise ValueError("Se necesita 2 <= min_length <= max_length")
+        self.min_length = min_length
+        self.max_length = max_length
+        self.stored = 0  # Celdas calculadas y guardadas (los hits son las sembradas)
+
+    def fingerprint(self, grammar, variant: tuple) -> str:
+        """Huella de la gramática para armar las claves (fingerprint, frase, variant)"""
+        return self.make_key(grammar, (), variant)[0]
+
+    def lookup_run(self, fingerprint: str, variant: tuple, words: list, i: int, longest: int) -> list:
+        """
+        Celdas de las frases words[i:i+min_length], words[i:i+min_length+1],
+        ... hasta longest tokens, en orden, hasta la primera que no está.
+        Las frases más largas desde i se guardaron junto con las más cortas,
+        así que después de la primera que falta no se buscan más.
+        """
+        entries = self._entries
+        states = []
+        for end in range(i + self.min_length, i + longest + 1):
+            key = (fingerprint, tuple(words[i:end]), variant)
+            state = entries.get(key)
+            if state is None:
+                self.misses += 1
+                break
+            entries.move_to_end(key)
+            states.append(state)
+        self.hits += len(states)
+        return states
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update(stored=self.stored,
+                     min_length=self.min_length, max_length=self.max_length)
+        return stats
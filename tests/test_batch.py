@@ -0,0 +1,54 @@
+"""Parsing por lotes con el motor automático"""
+
+from multiprocessing import Pool
+
+import batch
+from batch import parse_many
+from grammar_profiler import recommend_parser
+from project_grammar import create_project_grammar
+
+SENTENCES = ["she eats a cake with a fork", "he drinks the beer", "the cat eats", "eats the cat"]
+
+
+def _grammar_recommending_parallel_fill():
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    # Perfil ya calculado que recomienda llenado paralelo desde 2 tokens
+    # (como en una máquina con varios núcleos)
+    grammar.get_derived('cost_profile', lambda _: {
+        "recommendation": {"engine": 'bitset',
+                           "options": {"parallel_workers": 2, "parallel_min_length": 2}},
+    })
+    return grammar
+
+
+def test_auto_engine_in_pool_workers():
+    results = parse_many(_grammar_recommending_parallel_fill(), SENTENCES * 4,
+                         workers=2, chunksize=2, engine='auto')
+    assert [result["accepted"] for result in results] == [True, True, True, False] * 4
+
+
+def test_auto_engine_single_process_matches_pool():
+    grammar = _grammar_recommending_parallel_fill()
+    single = parse_many(grammar, SENTENCES, workers=1, build_trees=True, engine='auto')
+    pooled = parse_many(grammar, SENTENCES, workers=2, build_trees=True, engine='auto')
+    assert [result["tree"] for result in single] == [result["tree"] for result in pooled]
+
+
+def _worker_settings(_):
+    parser = batch._worker_parser
+    return parser.engine_name, parser.parallel_workers
+
+
+def test_pool_workers_get_recommended_engine_without_parallel_fill():
+    grammar = _grammar_recommending_parallel_fill()
+    engine, options = recommend_parser(grammar)
+    with Pool(2, initializer=batch.init_worker,
+              initargs=(grammar, engine, False, options)) as pool:
+        assert set(pool.map(_worker_settings, range(4))) == {('bitset', 0)}
+
+
+def test_single_process_keeps_parallel_fill_options():
+    grammar = _grammar_recommending_parallel_fill()
+    assert parse_many(grammar, SENTENCES, workers=1, engine='auto')[0]["accepted"]
+    assert _worker_settings(None) == ('bitset', 2)
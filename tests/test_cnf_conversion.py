@@ -0,0 +1,87 @@
+"""to_cnf() con cadenas y ciclos de reglas unitarias conserva el lenguaje"""
+
+import itertools
+
+import pytest
+
+from benchmark import create_random_cfg, random_sentence
+from engines import create_parser
+from grammar_loader import load_grammar_from_string
+
+UNIT_CHAINS = """
+S -> Clause | VP
+Clause -> NP Pred
+Pred -> VP
+VP -> V | V NP | VP PP
+V -> Verb
+Verb -> eats | sees
+NP -> N | Det N | NP PP
+N -> Noun
+Noun -> she | fish
+Det -> the
+PP -> P NP
+P -> with
+"""
+
+# Mismo lenguaje con el ciclo S -> Clause -> S (el convertidor anterior no
+# terminaba con ciclos de reglas unitarias)
+UNIT_CYCLE = UNIT_CHAINS.replace("Clause -> NP Pred", "Clause -> S | NP Pred")
+
+VOCABULARY = ['she', 'fish', 'eats', 'with', 'the']
+
+# Sentencias de hasta 4 palabras de VOCABULARY que aceptaba la gramática
+# UNIT_CHAINS convertida con el convertidor anterior (CNF_CONVERTER_VERSION 1)
+PREVIOUS_ACCEPTED = {
+    'eats', 'she eats', 'fish eats', 'eats she', 'eats fish', 'she eats she',
+    'she eats fish', 'fish eats she', 'fish eats fish', 'eats with she',
+    'eats with fish', 'eats the she', 'eats the fish', 'the she eats', 'the fish eats',
+    'she eats with she', 'she eats with fish', 'she eats the she', 'she eats the fish',
+    'she with she eats', 'she with fish eats', 'fish eats with she', 'fish eats with fish',
+    'fish eats the she', 'fish eats the fish', 'fish with she eats', 'fish with fish eats',
+    'eats she with she', 'eats she with fish', 'eats fish with she', 'eats fish with fish',
+    'eats with the she', 'eats with the fish', 'the she eats she', 'the she eats fish',
+    'the fish eats she', 'the fish eats fish',
+}
+
+CORPUS = [' '.join(words) for length in range(1, 5)
+          for words in itertools.product(VOCABULARY, repeat=length)]
+
+
+def _cnf(grammar_text: str):
+    grammar = load_grammar_from_string(grammar_text)
+    grammar.to_cnf()
+    for productions in grammar.rules.values():
+        for production in productions:
+            assert (len(production) == 1 and production[0] in grammar.terminals
+                    or len(production) == 2 and all(symbol in grammar.variables
+                                                    for symbol in production))
+    return grammar
+
+
+@pytest.mark.parametrize("grammar_text", [UNIT_CHAINS, UNIT_CYCLE], ids=['chains', 'cycle'])
+@pytest.mark.parametrize("engine", ['sets', 'bitset'])
+def test_same_language_as_previous_converter(grammar_text, engine):
+    parser = create_parser(_cnf(grammar_text), engine)
+    accepted = {sentence for sentence in CORPUS if parser.parse(sentence)[0]}
+    assert accepted == PREVIOUS_ACCEPTED
+
+
+@pytest.mark.parametrize("grammar_text", [UNIT_CHAINS, UNIT_CYCLE], ids=['chains', 'cycle'])
+def test_same_language_as_original_grammar(grammar_text):
+    earley = create_parser(load_grammar_from_string(grammar_text), 'earley')
+    parser = create_parser(_cnf(grammar_text))
+    for sentence in CORPUS + ['she sees the fish with the fish with she']:
+        assert parser.parse(sentence)[0] == earley.parse(sentence)[0], sentence
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_grammars_with_unit_rules(seed):
+    original = create_random_cfg(8, 3, 40, seed=seed, unit_ratio=0.4)
+    converted = create_random_cfg(8, 3, 40, seed=seed, unit_ratio=0.4)
+    converted.to_cnf()
+    earley = create_parser(original, 'earley')
+    parser = create_parser(converted)
+    for length in range(1, 9):
+        for k in range(5):
+            sentence = random_sentence(original, length, seed * 100 + length * 10 + k)
+            assert parser.parse(sentence)[0] == earley.parse(sentence)[0], sentence
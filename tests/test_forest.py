@@ -0,0 +1,44 @@
+"""Enumeración de árboles del bosque de análisis"""
+
+import json
+
+from engines import create_parser
+from grammar_loader import load_grammar_from_string
+
+
+def _forest(grammar, sentence: str, engine: str = 'sets'):
+    parser = create_parser(grammar, engine, keep_all_derivations=True)
+    accepted, _ = parser.parse(sentence)
+    assert accepted
+    return parser.parse_forest()
+
+
+def test_trees_match_count_on_ambiguous_sentence():
+    grammar = load_grammar_from_string("S -> S S | a")
+    grammar.to_cnf()
+    for engine in ('sets', 'bitset'):
+        forest = _forest(grammar, "a a a a a a", engine)
+        trees = [json.dumps(tree, sort_keys=True) for tree in forest.trees()]
+        # Número de Catalan C5 = 42 parentizaciones
+        assert len(trees) == len(set(trees)) == forest.count() == 42
+        assert forest.first(2) == [json.loads(tree) for tree in trees[:2]]
+
+
+def test_first_on_deep_right_branching_parse():
+    # 1500 niveles de anidamiento: más que el límite de recursión de Python
+    length = 1500
+    grammar = load_grammar_from_string("S -> A S | b\nA -> a")
+    grammar.to_cnf()
+    forest = _forest(grammar, ' '.join(['a'] * (length - 1) + ['b']))
+
+    trees = forest.first(2)
+    assert len(trees) == forest.count() == 1
+    depth = 0
+    node = trees[0]
+    while "right" in node:
+        assert node["left"] == {"node": "A", "terminal": "a"}
+        node = node["right"]
+        depth += 1
+    assert depth == length - 1
+    assert node == {"node": "S", "terminal": "b"}
+    assert len(list(forest.trees())) == 1
@@ -0,0 +1,118 @@
+"""Ciclo de vida de las gramáticas compiladas (artefacto .cnfc)"""
+
+import os
+
+import pytest
+
+import grammar_cache
+from engines import create_parser
+from grammar_cache import compiled_path, load_compiled_grammar
+from grammar_loader import load_grammar_from_file
+
+GRAMMAR_TEXT = """
+%punctuation split
+S -> NP VP End | NP VP
+VP -> VP PP | V NP | eats | drinks
+PP -> P NP
+NP -> Det N | she | he
+End -> .
+V: eats drinks cuts
+P: with in
+N: cake fork beer oven
+Det: a the
+"""
+
+SENTENCES = ["she eats a cake with a fork.", "he drinks the beer in the oven",
+             "eats she", "she eats a pizza", "she cuts a cake with a fork in the oven."]
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    path = tmp_path / "grammar.txt"
+    path.write_text(GRAMMAR_TEXT, encoding='utf-8')
+    # Cuenta las cargas desde el texto (cada una es una reconstrucción)
+    builds = []
+
+    def counting_loader(filename, verbose=False):
+        builds.append(filename)
+        return load_grammar_from_file(filename, verbose)
+
+    monkeypatch.setattr(grammar_cache, "load_grammar_from_file", counting_loader)
+    return str(path), builds
+
+
+def _uncached(filename: str):
+    grammar = load_grammar_from_file(filename)
+    grammar.to_cnf()
+    return grammar
+
+
+def _assert_parses_like(grammar, reference):
+    for engine in ('sets', 'bitset'):
+        parser = create_parser(grammar, engine)
+        expected_parser = create_parser(reference, engine)
+        for sentence in SENTENCES:
+            accepted, _ = parser.parse(sentence)
+            expected, _ = expected_parser.parse(sentence)
+            assert accepted == expected, sentence
+            assert parser.build_parse_tree() == expected_parser.build_parse_tree()
+
+
+def test_fresh_build_then_hit(source):
+    filename, builds = source
+    reference = _uncached(filename)
+
+    grammar = load_compiled_grammar(filename)
+    assert len(builds) == 1
+    assert os.path.exists(compiled_path(filename))
+    _assert_parses_like(grammar, reference)
+
+    cached = load_compiled_grammar(filename)
+    assert len(builds) == 1
+    assert cached.fingerprint() == reference.fingerprint()
+    assert cached.tokenizer.split_punctuation
+    _assert_parses_like(cached, reference)
+
+
+def test_touched_source_with_same_text_is_a_hit(source):
+    filename, builds = source
+    load_compiled_grammar(filename)
+    stat = os.stat(filename)
+    os.utime(filename, (stat.st_atime + 10, stat.st_mtime + 10))
+    _assert_parses_like(load_compiled_grammar(filename), _uncached(filename))
+    assert len(builds) == 1
+
+
+def test_changed_source_rebuilds(source):
+    filename, builds = source
+    load_compiled_grammar(filename)
+    with open(filename, 'a', encoding='utf-8') as file:
+        file.write("N: pizza\n")
+
+    grammar = load_compiled_grammar(filename)
+    assert len(builds) == 2
+    reference = _uncached(filename)
+    _assert_parses_like(grammar, reference)
+    assert create_parser(grammar).parse("she eats a pizza")[0]
+    # El artefacto nuevo queda vigente
+    load_compiled_grammar(filename)
+    assert len(builds) == 2
+
+
+@pytest.mark.parametrize("content", [b"", b"CYKG", b"not a compiled grammar", None])
+def test_corrupt_artifact_rebuilds(source, content):
+    filename, builds = source
+    load_compiled_grammar(filename)
+    path = compiled_path(filename)
+    if content is None:
+        # Encabezado correcto con el contenido truncado
+        with open(path, 'rb') as file:
+            content = file.read()[:60]
+    with open(path, 'wb') as file:
+        file.write(content)
+
+    grammar = load_compiled_grammar(filename)
+    assert len(builds) == 2
+    _assert_parses_like(grammar, _uncached(filename))
+    load_compiled_grammar(filename)
+    assert len(builds) == 2
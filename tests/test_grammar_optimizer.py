@@ -0,0 +1,73 @@
+"""optimize_grammar() no cambia el lenguaje aceptado"""
+
+import itertools
+import random
+
+import pytest
+
+from benchmark import create_random_cfg
+from engines import create_parser
+from grammar_loader import load_grammar_from_string
+from grammar_optimizer import optimize_grammar
+from project_grammar import create_project_grammar
+
+# Z no genera cadenas, U y W no son alcanzables, N/M y Det/Art son iguales
+REDUNDANT_GRAMMAR = """
+S -> NP VP | NP VP Z | Art M
+NP -> Det N | Art M | she
+VP -> V NP | V OBJ | eats
+OBJ -> Art M
+V -> eats | sees
+Det -> a | the
+Art -> a | the
+N -> cat | dog
+M -> cat | dog
+Z -> Z Z | NP Z
+U -> cat
+W -> U U
+"""
+
+
+def _assert_same_language(make_grammar, max_length: int):
+    original = make_grammar()
+    original.to_cnf()
+    optimized = make_grammar()
+    optimized.to_cnf()
+    report = optimize_grammar(optimized)
+    terminals = sorted(original.vocabulary())
+    for engine in ('sets', 'bitset'):
+        before = create_parser(original, engine)
+        after = create_parser(optimized, engine)
+        for length in range(1, max_length + 1):
+            for words in itertools.product(terminals, repeat=length):
+                sentence = ' '.join(words)
+                assert after.parse(sentence)[0] == before.parse(sentence)[0], sentence
+    return report
+
+
+def test_redundant_grammar():
+    report = _assert_same_language(lambda: load_grammar_from_string(REDUNDANT_GRAMMAR), 4)
+    assert report["useless_removed"] > 0
+    assert report["merged"] > 0
+    assert report["rules_after"] < report["rules_before"]
+
+
+def test_project_grammar():
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    optimized = create_project_grammar()
+    optimized.to_cnf()
+    optimize_grammar(optimized)
+    corpus = ["she eats a cake with a fork", "he cuts the meat in the oven with a knife",
+              "eats she", "she eats a cake with", "the cat drinks the beer"]
+    before = create_parser(grammar)
+    after = create_parser(optimized)
+    for sentence in corpus:
+        assert after.parse(sentence)[0] == before.parse(sentence)[0], sentence
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_grammars(seed):
+    rng = random.Random(seed)
+    size = (rng.randint(3, 10), 3, rng.randint(10, 40))
+    _assert_same_language(lambda: create_random_cfg(*size, seed=seed), 4)
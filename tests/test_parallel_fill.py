@@ -0,0 +1,63 @@
+"""El llenado paralelo deja la misma tabla que el llenado secuencial"""
+
+import pytest
+
+import parallel_fill
+from benchmark import create_synthetic_grammar, project_sentence, random_sentence
+from engines import create_parser
+from project_grammar import create_project_grammar
+
+CONFIGURATIONS = [
+    ('sets', {}),
+    ('sets', {"keep_all_derivations": True}),
+    ('sets', {"viterbi": True}),
+    ('sets', {"recognize_only": True}),
+    ('bitset', {}),
+    ('bitset', {"recognize_only": True}),
+]
+
+
+@pytest.fixture(scope="module")
+def project_grammar():
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    return grammar
+
+
+@pytest.fixture(params=[False, True], ids=['processes', 'threads'])
+def threads(request, monkeypatch):
+    monkeypatch.setattr(parallel_fill, 'FREE_THREADED', request.param)
+    return request.param
+
+
+def _assert_same_chart(grammar, engine, sentences, options):
+    sequential = create_parser(grammar, engine, **options)
+    parallel = create_parser(grammar, engine, parallel_workers=2, parallel_min_length=2, **options)
+    try:
+        for sentence in sentences:
+            accepted = parallel.parse(sentence)[0]
+            assert accepted == sequential.parse(sentence)[0], sentence
+            assert parallel._filler is not None
+            expected, actual = sequential.chart, parallel.chart
+            assert actual.cells == expected.cells, sentence
+            assert actual.pointers == expected.pointers, sentence
+            assert actual.alternatives == expected.alternatives, sentence
+            assert actual.scores == expected.scores, sentence
+            if accepted and not options.get("recognize_only"):
+                assert parallel.build_parse_tree() == sequential.build_parse_tree()
+    finally:
+        parallel.close()
+
+
+@pytest.mark.parametrize("engine,options", CONFIGURATIONS)
+def test_project_grammar(project_grammar, engine, options, threads):
+    accepted = project_sentence(30, 1)
+    sentences = [accepted, accepted.rsplit(' ', 1)[0], project_sentence(45, 2)]
+    _assert_same_chart(project_grammar, engine, sentences, options)
+
+
+@pytest.mark.parametrize("engine", ['sets', 'bitset'])
+def test_synthetic_grammar(engine, threads):
+    grammar = create_synthetic_grammar(12, 8, 120, seed=3)
+    sentences = [random_sentence(grammar, 40, seed) for seed in range(3)]
+    _assert_same_chart(grammar, engine, sentences, {})
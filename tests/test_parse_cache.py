@@ -0,0 +1,72 @@
+"""Caché de resultados: huella de la gramática y aciertos iguales a un análisis nuevo"""
+
+import pytest
+
+from benchmark import project_sentence
+from engines import create_parser
+from parse_cache import ParseCache
+from project_grammar import create_project_grammar
+
+CORPUS = ["she eats a cake with a fork", "eats she", "she eats pizza", "he drinks the beer",
+          ""] + [project_sentence(length, seed) for length in (5, 9, 13) for seed in range(3)]
+
+
+def _grammar():
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    return grammar
+
+
+def test_fingerprint_follows_rules():
+    grammar = _grammar()
+    fingerprint = grammar.fingerprint()
+    assert _grammar().fingerprint() == fingerprint
+    grammar.add_rule('N', ['zebra'])
+    assert grammar.fingerprint() != fingerprint
+
+
+def test_grammar_change_invalidates_entries():
+    grammar = _grammar()
+    cache = ParseCache()
+    parser = create_parser(grammar, 'sets', cache=cache)
+    assert not parser.parse("eats she")[0]
+    assert parser.parse("she eats")[0]
+    assert len(cache) == 2
+
+    # S -> VP NP acepta ahora "eats she": el rechazo guardado no debe reutilizarse
+    grammar.add_rule('S', ['VP', 'NP'])
+    assert parser.parse("eats she")[0]
+    assert cache.invalidations == 2
+    assert len(cache) == 1
+    assert parser.build_parse_tree() == {
+        "node": "S", "left": {"node": "VP", "terminal": "eats"},
+        "right": {"node": "NP", "terminal": "she"},
+    }
+
+
+@pytest.mark.parametrize("engine, options", [
+    ('sets', {}), ('bitset', {}), ('earley', {}), ('sets', {"viterbi": True}),
+])
+def test_cached_hit_matches_fresh_parse(engine, options):
+    grammar = _grammar()
+    cache = ParseCache()
+    cached = create_parser(grammar, engine, cache=cache, **options)
+    fresh = create_parser(grammar, engine, **options)
+    for sentence in CORPUS:
+        cached.parse(sentence)
+    hits = cache.hits
+    for sentence in CORPUS:
+        accepted, _ = cached.parse(sentence)
+        expected, _ = fresh.parse(sentence)
+        assert accepted == expected, sentence
+        assert cached.build_parse_tree() == fresh.build_parse_tree()
+        assert getattr(cached, "log_probability", None) == getattr(fresh, "log_probability", None)
+    # Los rechazos por token desconocido no pasan por la caché
+    assert cache.hits - hits == len(CORPUS) - 1
+
+
+def test_cached_rejection_tree():
+    parser = create_parser(_grammar(), 'sets', cache=ParseCache())
+    parser.parse("eats she")
+    assert not parser.parse("eats she")[0]
+    assert parser.build_parse_tree() == {"node": "S", "children": None}
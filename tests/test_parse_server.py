@@ -0,0 +1,90 @@
+"""Servicio de parsing sobre TCP en un puerto efímero"""
+
+import asyncio
+import json
+
+from benchmark import project_sentence
+from parse_server import ParseServer
+from project_grammar import create_project_grammar
+
+
+def _grammar():
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    return grammar
+
+
+async def _exchange(port: int, messages: list) -> list:
+    """Envía todos los pedidos por una conexión y lee una respuesta por pedido"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for message in messages:
+        text = message if isinstance(message, str) else json.dumps(message)
+        writer.write(text.encode('utf-8') + b"\n")
+    await writer.drain()
+    responses = [json.loads(await asyncio.wait_for(reader.readline(), 30))
+                 for _ in messages]
+    writer.close()
+    return responses
+
+
+def _run(server: ParseServer, scenario):
+    async def main():
+        await server.start('127.0.0.1', 0)
+        try:
+            return await scenario(server.port)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_requests_are_batched():
+    server = ParseServer(_grammar(), workers=1, batch_size=64, batch_window=0.05,
+                         build_trees=True)
+    sentences = ["she eats a cake with a fork", "eats she", "she eats pizza"] * 10
+    messages = [{"id": number, "sentence": sentence} for number, sentence in enumerate(sentences)]
+
+    async def scenario(port):
+        responses = await _exchange(port, messages)
+        stats, = await _exchange(port, [{"command": "stats"}])
+        return responses, stats
+
+    responses, stats = _run(server, scenario)
+    by_id = {response["id"]: response for response in responses}
+    assert sorted(by_id) == list(range(len(sentences)))
+    for number, sentence in enumerate(sentences):
+        assert by_id[number]["accepted"] == (sentence == "she eats a cake with a fork")
+    assert by_id[0]["tree"]["node"] == "S"
+    assert by_id[2]["unknown_token"] == {"position": 2, "token": "pizza"}
+
+    assert stats["requests"] == stats["completed"] == len(sentences)
+    assert stats["batches"] < len(sentences)
+    assert stats["mean_batch_size"] > 1
+    assert stats["latency"]["samples"] == len(sentences)
+    assert stats["timeouts"] == stats["errors"] == 0
+
+
+def test_request_timeout_and_stats():
+    server = ParseServer(_grammar(), workers=1, batch_window=0.05)
+
+    async def scenario(port):
+        # Las respuestas de una conexión pueden llegar en otro orden: se
+        # identifican por "id"
+        responses = await _exchange(port, [
+            {"id": "slow", "sentence": project_sentence(150), "timeout": 0.01},
+            "she eats",
+            {"id": "invalid", "sentence": "she eats", "timeout": -1},
+            {"id": "health", "command": "health"},
+        ])
+        stats, = await _exchange(port, [{"command": "stats"}])
+        return {response["id"]: response for response in responses}, stats
+
+    responses, stats = _run(server, scenario)
+    assert responses["slow"] == {"id": "slow", "error": "timeout"}
+    assert responses[None]["accepted"] is True
+    assert "error" in responses["invalid"]
+    assert responses["health"]["status"] == "ok" and responses["health"]["workers"] == 1
+    assert stats["requests"] == 2
+    assert stats["completed"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["errors"] == 1
+    assert stats["queue_depth"] == 0
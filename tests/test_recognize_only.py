@@ -0,0 +1,66 @@
+"""recognize_only acepta exactamente lo mismo que el análisis completo"""
+
+import itertools
+
+import pytest
+
+from benchmark import create_synthetic_grammar, project_sentence, random_sentence
+from engines import create_parser
+from parse_cache import ParseCache
+from project_grammar import create_project_grammar
+
+PROJECT_CORPUS = [
+    "she eats a cake with a fork",
+    "he cuts the meat in the oven with a knife",
+    "she eats a cake with",
+    "eats she a cake",
+    "a fork",
+    "she",
+    "the the the",
+]
+
+
+@pytest.fixture(scope="module")
+def project_grammar():
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    return grammar
+
+
+def _assert_same_acceptance(grammar, engine, sentences, **options):
+    full = create_parser(grammar, engine)
+    recognizer = create_parser(grammar, engine, recognize_only=True, **options)
+    for sentence in sentences:
+        assert recognizer.parse(sentence)[0] == full.parse(sentence)[0], sentence
+
+
+@pytest.mark.parametrize("engine", ['sets', 'bitset'])
+def test_project_corpus(project_grammar, engine):
+    long = [project_sentence(length, seed) for length, seed in ((12, 0), (25, 1), (40, 2))]
+    broken = [sentence.rsplit(' ', 1)[0] for sentence in long]
+    _assert_same_acceptance(project_grammar, engine, PROJECT_CORPUS + long + broken)
+
+
+@pytest.mark.parametrize("engine", ['sets', 'bitset'])
+def test_all_short_sentences(project_grammar, engine):
+    vocabulary = ['she', 'eats', 'a', 'fork', 'with']
+    sentences = [' '.join(words) for length in range(1, 5)
+                 for words in itertools.product(vocabulary, repeat=length)]
+    _assert_same_acceptance(project_grammar, engine, sentences)
+
+
+@pytest.mark.parametrize("engine", ['sets', 'bitset'])
+@pytest.mark.parametrize("seed", range(5))
+def test_synthetic_grammars(engine, seed):
+    # Gramática densa: acepta cerca de un tercio de las sentencias aleatorias
+    grammar = create_synthetic_grammar(6, 3, 30, seed=seed)
+    sentences = [random_sentence(grammar, length, seed * 1000 + length * 10 + k)
+                 for length in range(1, 13) for k in range(4)]
+    _assert_same_acceptance(grammar, engine, sentences)
+
+
+@pytest.mark.parametrize("engine", ['sets', 'bitset'])
+def test_with_cache(project_grammar, engine):
+    sentences = PROJECT_CORPUS + [project_sentence(15, 3)]
+    # Dos pasadas: la segunda lee los rechazos guardados en la caché
+    _assert_same_acceptance(project_grammar, engine, sentences * 2, cache=ParseCache())
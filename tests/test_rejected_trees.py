@@ -0,0 +1,35 @@
+"""build_parse_tree() después de un rechazo"""
+
+import pytest
+
+from engines import create_parser
+from parse_cache import ParseCache
+from project_grammar import create_project_grammar
+
+REJECTED = {"node": "S", "children": None}
+
+
+@pytest.fixture(scope="module")
+def grammar():
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    return grammar
+
+
+@pytest.mark.parametrize("engine", ['sets', 'bitset', 'earley'])
+@pytest.mark.parametrize("sentence", ["she eats pizza", "", "eats she"])
+def test_rejected_sentence_has_no_children(grammar, engine, sentence):
+    parser = create_parser(grammar, engine)
+    assert not parser.parse(sentence)[0]
+    assert parser.build_parse_tree() == REJECTED
+    parser.parse_tree_bracketed()
+
+
+@pytest.mark.parametrize("engine", ['sets', 'bitset', 'earley'])
+def test_cached_rejection_has_no_children(grammar, engine):
+    parser = create_parser(grammar, engine, cache=ParseCache())
+    for _ in range(2):
+        assert not parser.parse("eats she")[0]
+        assert parser.build_parse_tree() == REJECTED
+    assert parser.parse("she eats")[0]
+    assert parser.build_parse_tree()["left"] == {"node": "NP", "terminal": "she"}
@@ -0,0 +1,105 @@
+"""reparse_edit(): mismo resultado, tabla y árbol que parse() de la sentencia editada"""
+
+import random
+
+import pytest
+
+from benchmark import create_synthetic_grammar, random_sentence
+from engines import create_parser
+from project_grammar import create_project_grammar
+
+SENTENCE = "she eats a cake with a fork in the oven"
+LAST = len(SENTENCE.split())
+
+# (operación, posición, token) al inicio, en el medio y al final
+EDITS = [
+    ('replace', 0, 'he'), ('replace', 3, 'meat'), ('replace', LAST - 1, 'spoon'),
+    ('replace', 4, 'in'), ('replace', 2, 'eats'),
+    ('insert', 0, 'the'), ('insert', 4, 'with'), ('insert', LAST, 'with'),
+    ('delete', 0, None), ('delete', 4, None), ('delete', LAST - 1, None),
+]
+
+
+@pytest.fixture(scope="module")
+def grammar():
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    return grammar
+
+
+def _assert_same_as_parse(edited, reference):
+    accepted, _ = reference.parse(' '.join(edited.words))
+    assert edited.unknown_token == reference.unknown_token
+    chart, expected = edited.chart, reference.chart
+    assert chart.cells == expected.cells
+    assert chart.pointers == expected.pointers
+    assert chart.alternatives == expected.alternatives
+    assert chart.scores == expected.scores
+    assert edited.build_parse_tree() == reference.build_parse_tree()
+    assert edited.log_probability == reference.log_probability
+    return accepted
+
+
+@pytest.mark.parametrize("engine", ['sets', 'bitset'])
+@pytest.mark.parametrize("operation, position, word", EDITS)
+def test_single_edit(grammar, engine, operation, position, word):
+    edited = create_parser(grammar, engine)
+    reference = create_parser(grammar, engine)
+    edited.parse(SENTENCE)
+    accepted, _ = edited.reparse_edit(operation, position, word)
+    assert accepted == _assert_same_as_parse(edited, reference)
+
+
+@pytest.mark.parametrize("options", [{}, {"keep_all_derivations": True},
+                                     {"viterbi": True}, {"viterbi": True, "beam": 2}])
+def test_edit_sequence(grammar, options):
+    edited = create_parser(grammar, 'sets', **options)
+    reference = create_parser(grammar, 'sets', **options)
+    edited.parse(SENTENCE)
+    for operation, position, word in EDITS:
+        position = min(position, len(edited.words) - (operation != 'insert'))
+        accepted, _ = edited.reparse_edit(operation, position, word)
+        assert accepted == _assert_same_as_parse(edited, reference)
+
+
+def test_random_edits_on_dense_grammar():
+    grammar = create_synthetic_grammar(20, 30, 300, seed=2)
+    vocabulary = sorted(grammar.vocabulary())
+    rng = random.Random(0)
+    for engine in ('sets', 'bitset'):
+        edited = create_parser(grammar, engine)
+        reference = create_parser(grammar, engine)
+        edited.parse(random_sentence(grammar, 10, 1))
+        for _ in range(30):
+            n = len(edited.words)
+            operation = rng.choice(['replace', 'insert', 'delete'] if n > 1 else ['replace', 'insert'])
+            position = rng.randrange(n + (operation == 'insert'))
+            word = rng.choice(vocabulary) if operation != 'delete' else None
+            accepted, _ = edited.reparse_edit(operation, position, word)
+            assert accepted == _assert_same_as_parse(edited, reference)
+
+
+def test_unknown_token_then_correction(grammar):
+    edited = create_parser(grammar, 'sets')
+    reference = create_parser(grammar, 'sets')
+    edited.parse(SENTENCE)
+    accepted, _ = edited.reparse_edit('replace', 3, 'pizza')
+    assert not accepted
+    assert edited.unknown_token == (3, 'pizza')
+    accepted, _ = edited.reparse_edit('replace', 3, 'soup')
+    assert accepted == _assert_same_as_parse(edited, reference) is True
+
+
+def test_invalid_edits(grammar):
+    parser = create_parser(grammar, 'sets')
+    with pytest.raises(ValueError):
+        parser.reparse_edit('replace', 0, 'he')
+    parser.parse(SENTENCE)
+    with pytest.raises(ValueError):
+        parser.reparse_edit('swap', 0, 'he')
+    with pytest.raises(ValueError):
+        parser.reparse_edit('insert', LAST + 1, 'he')
+    with pytest.raises(ValueError):
+        parser.reparse_edit('replace', 0)
+    with pytest.raises(ValueError):
+        create_parser(grammar, 'sets', recognize_only=True).reparse_edit('delete', 0)
@@ -0,0 +1,52 @@
+"""Memoria de frases entre sentencias: mismo resultado que sin memoria"""
+
+import pytest
+
+from benchmark import create_synthetic_grammar, project_sentence, random_sentence
+from engines import create_parser
+from project_grammar import create_project_grammar
+from span_memo import SpanMemo
+
+PROJECT_CORPUS = [
+    "she eats a cake with a fork",
+    "she cuts a cake with a fork",
+    "he drinks the beer with a fork in the oven",
+    "she cuts the meat with a knife with a fork",
+] + [project_sentence(length, seed) for length in (7, 13, 19) for seed in range(4)]
+
+
+def _assert_memo_matches_parse(grammar, corpus, engine, memo, **options):
+    plain = create_parser(grammar, engine, **options)
+    memoized = create_parser(grammar, engine, span_memo=memo, **options)
+    # Dos pasadas: la segunda siembra casi todas las frases
+    for sentence in corpus + corpus:
+        expected, _ = plain.parse(sentence)
+        accepted, _ = memoized.parse(sentence)
+        assert accepted == expected, (sentence, memo.min_length)
+        if expected:
+            assert memoized.build_parse_tree() == plain.build_parse_tree()
+
+
+@pytest.mark.parametrize("engine", ['sets', 'bitset'])
+@pytest.mark.parametrize("min_length", [2, 3, 4])
+def test_project_grammar(engine, min_length):
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    _assert_memo_matches_parse(grammar, PROJECT_CORPUS, engine,
+                               SpanMemo(min_length=min_length, max_length=6))
+
+
+@pytest.mark.parametrize("min_length", [3, 5])
+def test_synthetic_grammar(min_length):
+    grammar = create_synthetic_grammar(12, 8, 120, seed=3)
+    phrases = [random_sentence(grammar, 4, seed) for seed in range(5)]
+    corpus = [' '.join(phrases[(seed + k) % 5] for k in range(3)) for seed in range(5)]
+    for engine in ('sets', 'bitset'):
+        _assert_memo_matches_parse(grammar, corpus, engine, SpanMemo(min_length=min_length))
+
+
+def test_viterbi_with_min_length():
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    _assert_memo_matches_parse(grammar, PROJECT_CORPUS, 'sets', SpanMemo(min_length=3),
+                               viterbi=True)
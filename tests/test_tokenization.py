@@ -0,0 +1,68 @@
+"""Directivas de tokenización con reglas '->' y léxico compacto"""
+
+import pytest
+
+from engines import create_parser
+from grammar_loader import load_grammar_from_string
+
+CASE_SENSITIVE_GRAMMAR = """
+%lowercase no
+%punctuation split
+S -> NP VP End
+NP -> She
+VP -> eats
+End -> .
+"""
+
+INLINE_PUNCTUATION_GRAMMAR = """
+%lowercase no
+%punctuation split
+S -> NP VP .
+NP -> She
+VP -> eats
+"""
+
+
+def _parse(grammar_text: str, engine: str, sentence: str) -> bool:
+    grammar = load_grammar_from_string(grammar_text)
+    if engine != 'earley':
+        grammar.to_cnf()
+    parser = create_parser(grammar, engine)
+    accepted, _ = parser.parse(sentence)
+    return accepted
+
+
+@pytest.mark.parametrize("engine", ['sets', 'bitset', 'earley'])
+@pytest.mark.parametrize("grammar_text", [CASE_SENSITIVE_GRAMMAR, INLINE_PUNCTUATION_GRAMMAR])
+def test_terminals_follow_tokenizer(grammar_text, engine):
+    assert _parse(grammar_text, engine, "She eats.")
+    assert not _parse(grammar_text, engine, "she eats.")
+    assert not _parse(grammar_text, engine, "She eats")
+
+
+def test_symbols_without_rules_are_terminals():
+    grammar = load_grammar_from_string(INLINE_PUNCTUATION_GRAMMAR)
+    assert {'She', 'eats', '.'} <= grammar.terminals
+    assert not {'She', 'eats', '.'} & grammar.variables
+    assert {'S', 'NP', 'VP'} <= grammar.variables
+
+
+def test_later_rule_head_is_variable():
+    grammar = load_grammar_from_string("S -> A B\nA -> x\nB -> y")
+    assert {'A', 'B'} <= grammar.variables
+    assert grammar.terminals == {'x', 'y'}
+
+
+@pytest.mark.parametrize("engine", ['sets', 'earley'])
+def test_lexicon_words_are_normalized(engine):
+    grammar_text = "S -> N V\nN: Paris London\nV: Sleeps"
+    assert _parse(grammar_text, engine, "paris sleeps")
+    assert _parse(grammar_text, engine, "LONDON SLEEPS")
+    assert _parse("%lowercase no\n" + grammar_text, engine, "Paris Sleeps")
+    assert not _parse("%lowercase no\n" + grammar_text, engine, "paris Sleeps")
+
+
+def test_lexicon_probabilities_follow_normalization():
+    grammar = load_grammar_from_string("S -> N N\nN: Cat [0.4] dog [0.6]")
+    assert grammar.probabilities[('N', ('cat',))] == pytest.approx(0.4)
+    assert grammar.probabilities[('N', ('dog',))] == pytest.approx(0.6)
@@ -0,0 +1,34 @@
+"""Modo Viterbi: log_probability de cada análisis"""
+
+from engines import create_parser
+from parse_cache import ParseCache
+from project_grammar import create_project_grammar
+
+
+def _grammar():
+    grammar = create_project_grammar()
+    grammar.to_cnf()
+    return grammar
+
+
+def test_unknown_token_resets_log_probability():
+    parser = create_parser(_grammar(), 'sets', viterbi=True)
+    assert parser.parse("she eats a cake")[0]
+    assert parser.log_probability is not None
+
+    accepted, _ = parser.parse("she eats a zebra")
+    assert not accepted
+    assert parser.unknown_token == (3, 'zebra')
+    assert parser.log_probability is None
+
+
+def test_rejection_after_cached_hit_resets_log_probability():
+    parser = create_parser(_grammar(), 'sets', viterbi=True, cache=ParseCache())
+    parser.parse("she eats a cake")
+    assert parser.parse("she eats a cake")[0]
+    assert parser.log_probability is not None
+
+    assert not parser.parse("she eats a zebra")[0]
+    assert parser.log_probability is None
+    assert not parser.parse("eats she a cake")[0]
+    assert parser.log_probability is None
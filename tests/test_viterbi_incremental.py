@@ -0,0 +1,66 @@
+"""Modo incremental (feed) con Viterbi y beam"""
+
+import random
+
+import pytest
+
+from benchmark import create_random_cfg
+from engines import create_parser
+from grammar_loader import load_grammar_from_string
+
+PCFG = """
+S -> NP VP [1.0]
+NP -> Det N [0.5] | NP PP [0.2] | she [0.3]
+VP -> V NP [0.6] | VP PP [0.4]
+PP -> P NP [1.0]
+Det: the [0.6] a [0.4]
+N: man [0.5] telescope [0.3] dog [0.2]
+V -> saw [1.0]
+P -> with [1.0]
+"""
+
+
+def _random_pcfg(seed: int):
+    grammar = create_random_cfg(8, 3, 30, seed=seed)
+    rng = random.Random(seed)
+    probabilities = {}
+    for variable, productions in sorted(grammar.rules.items()):
+        productions = list(dict.fromkeys(productions))
+        for production in productions:
+            probabilities[(variable, production)] = 0.9 / len(productions) * (0.5 + rng.random()) / 1.5
+    grammar.set_probabilities(probabilities)
+    grammar.to_cnf()
+    return grammar
+
+
+def _assert_feed_matches_parse(grammar, words, **options):
+    incremental = create_parser(grammar, 'sets', viterbi=True, **options)
+    complete = create_parser(grammar, 'sets', viterbi=True, **options)
+    incremental.start_incremental()
+    for n, word in enumerate(words, 1):
+        accepted = incremental.feed(word)
+        expected, _ = complete.parse(' '.join(words[:n]))
+        assert accepted == expected, (words[:n], options)
+        if expected:
+            assert incremental.log_probability == pytest.approx(complete.log_probability)
+            assert incremental.build_parse_tree() == complete.build_parse_tree()
+        else:
+            assert incremental.log_probability is None
+
+
+@pytest.mark.parametrize("options", [{}, {"beam": 1}, {"beam": 2}, {"threshold": 1e-2}])
+def test_feed_matches_parse_on_pcfg(options):
+    grammar = load_grammar_from_string(PCFG)
+    grammar.to_cnf()
+    _assert_feed_matches_parse(grammar, "she saw the man with the telescope".split(), **options)
+
+
+@pytest.mark.parametrize("options", [{"beam": 1}, {"beam": 2}, {"threshold": 0.05}])
+def test_feed_matches_parse_on_random_pcfgs(options):
+    for seed in range(20):
+        grammar = _random_pcfg(seed)
+        terminals = sorted(grammar.vocabulary())
+        rng = random.Random(seed)
+        for _ in range(5):
+            words = [rng.choice(terminals) for _ in range(rng.randint(1, 7))]
+            _assert_feed_matches_parse(grammar, words, **options)
@@ -0,0 +1,51 @@
+"""
+Tokenización de sentencias.
+
+Cada gramática tiene su tokenizer (Grammar.tokenizer). El de por defecto
+equivale a sentence.lower().split(); se puede desactivar el paso a
+minúsculas o separar la puntuación en tokens propios:
+
+    grammar.tokenizer = Tokenizer(lowercase=False, split_punctuation=True)
+
+En un archivo de gramática se configura con directivas:
+
+    %lowercase no
+    %punctuation split
+"""
+
+import re
+
+# Palabras (letras, dígitos, guion bajo y apóstrofos internos) o un signo de
+# puntuación suelto
+_PUNCTUATION_PATTERN = re.compile(r"\w+(?:'\w+)*|[^\w\s]")
+
+
+class Tokenizer:
+    """Divide una sentencia en tokens según las reglas de la gramática"""
+
+    def __init__(self, lowercase: bool = True, split_punctuation: bool = False):
+        self.lowercase = lowercase
+        self.split_punctuation = split_punctuation
+
+    def normalize(self, token: str) -> str:
+        """Normaliza un token suelto (modo incremental)"""
+        return token.lower() if self.lowercase else token
+
+    def __call__(self, sentence: str) -> list:
+        if self.lowercase:
+            sentence = sentence.lower()
+        if self.split_punctuation:
+            return _PUNCTUATION_PATTERN.findall(sentence)
+        return sentence.split()
+
+    def to_state(self) -> dict:
+        """Configuración serializable (para las gramáticas compiladas)"""
+        return {"lowercase": self.lowercase, "split_punctuation": self.split_punctuation}
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'Tokenizer':
+        return cls(**state)
+
+    def __repr__(self) -> str:
+        return (f"Tokenizer(lowercase={self.lowercase}, "
+                f"split_punctuation={self.split_punctuation})")
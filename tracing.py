@@ -0,0 +1,66 @@
+"""
+Trazas opcionales del parser CYK.
+
+Un tracer es cualquier función tracer(event, **fields). Los parsers solo lo
+invocan si se les pasa uno; sin tracer no se construye ningún evento.
+
+Eventos emitidos:
+    PARSE_STARTED   sentence, tokens
+    SPLIT_TRIED     i, length, k
+    RULE_APPLIED    i, length, k, left, right, heads   (heads: variables A de A -> left right)
+    CELL_FILLED     i, length, variables, word (word solo en la diagonal)
+    PARSE_FINISHED  accepted, time, cached (acierto de caché), unknown_token
+                    ((posición, token) si se rechazó por un token fuera del vocabulario)
+"""
+
+PARSE_STARTED = 'parse_started'
+SPLIT_TRIED = 'split_tried'
+RULE_APPLIED = 'rule_applied'
+CELL_FILLED = 'cell_filled'
+PARSE_FINISHED = 'parse_finished'
+
+# Niveles de detalle de ConsoleTracer
+SILENT = 0
+SUMMARY = 1  # Inicio y resultado de cada análisis
+CELLS = 2    # Además, cada celda no vacía de la tabla
+RULES = 3    # Además, cada partición probada y cada regla aplicada
+
+
+class ConsoleTracer:
+    """Imprime el progreso del llenado de la tabla CYK según el nivel de detalle"""
+
+    def __init__(self, verbosity: int = CELLS):
+        self.verbosity = verbosity
+
+    def __call__(self, event: str, **fields):
+        verbosity = self.verbosity
+
+        if event == PARSE_STARTED and verbosity >= SUMMARY:
+            tokens = fields['tokens']
+            print(f"\nAnalizando: '{fields['sentence']}'")
+            print(f"   Tokens: {tokens}")
+            print(f"   Longitud: {len(tokens)} palabras\n")
+            if verbosity >= CELLS:
+                print("Llenando tabla CYK...")
+
+        elif event == CELL_FILLED and verbosity >= CELLS:
+            i, length, variables = fields['i'], fields['length'], fields['variables']
+            if length == 1:
+                print(f"  Posición {i} ('{fields['word']}'): {variables}")
+            elif variables:
+                print(f"  Posición {i}, longitud {length}: {variables}")
+
+        elif event == SPLIT_TRIED and verbosity >= RULES:
+            print(f"    Partición k={fields['k']} de posición {fields['i']}, "
+                  f"longitud {fields['length']}")
+
+        elif event == RULE_APPLIED and verbosity >= RULES:
+            heads = ', '.join(sorted(fields['heads']))
+            print(f"      {heads} → {fields['left']} {fields['right']}")
+
+        elif event == PARSE_FINISHED and verbosity >= SUMMARY and verbosity < CELLS:
+            result = "aceptada" if fields['accepted'] else "rechazada"
+            print(f"   Sentencia {result} en {fields['time']:.6f} segundos")
+            unknown = fields.get('unknown_token')
+            if unknown is not None:
+                print(f"   Token fuera del vocabulario: '{unknown[1]}' (posición {unknown[0]})")
@@ -0,0 +1,106 @@
+"""
+Formatos de salida de los parse trees.
+
+Todos los formatos recorren el árbol con una pila explícita (sin recursión,
+así que no dependen del límite de recursión de Python) y acumulan el texto en
+una sola lista que se une al final. El costo es lineal en el tamaño de la
+salida: en render_compact y render_improved cada línea incluye la sangría de
+su profundidad; to_bracketed y to_json son lineales en el número de nodos.
+
+Los árboles tienen el formato de build_parse_tree(): {"node", "terminal"},
+{"node", "left", "right"} o {"node", "children": None} (sin derivación).
+"""
+
+import json
+
+
+def render_compact(tree: dict, prefix: str = "", is_tail: bool = True) -> str:
+    """Árbol con conectores ├── / └── (formato de print_parse_tree_compact)"""
+    lines = []
+    stack = [(tree, prefix, is_tail)]
+    while stack:
+        node, prefix, is_tail = stack.pop()
+        connector = "└── " if is_tail else "├── "
+        if "terminal" in node:
+            lines.append(f"{prefix}{connector}{node['node']} → '{node['terminal']}'")
+            continue
+        lines.append(f"{prefix}{connector}{node['node']}")
+        if "left" in node and "right" in node:
+            new_prefix = prefix + ("    " if is_tail else "│   ")
+            # El hijo izquierdo se saca primero de la pila
+            stack.append((node["right"], new_prefix, True))
+            stack.append((node["left"], new_prefix, False))
+    return "\n".join(lines)
+
+
+def render_improved(tree: dict, indent: int = 0) -> str:
+    """Árbol con etiquetas Left/Right (formato de print_parse_tree_improved)"""
+    lines = []
+    # Elementos de la pila: (árbol, sangría) o una línea ya formateada (str)
+    stack = [(tree, indent)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            lines.append(item)
+            continue
+        node, indent = item
+        prefix = "  " * indent
+        lines.append(f"{prefix}└─ {node['node']}")
+        if "terminal" in node:
+            lines.append(f"{prefix}   └─ '{node['terminal']}'")
+            continue
+        if "left" in node and "right" in node:
+            stack.append((node["right"], indent + 2))
+            stack.append(f"{prefix}   └─ Right:")
+            stack.append((node["left"], indent + 2))
+            stack.append(f"{prefix}   ├─ Left:")
+    return "\n".join(lines)
+
+
+def to_bracketed(tree: dict) -> str:
+    """Notación con corchetes al estilo Penn Treebank: (S (NP (Pronoun she)) ...)"""
+    parts = []
+    # Elementos de la pila: subárboles (dict) o fragmentos de texto (str)
+    stack = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+        elif "terminal" in item:
+            parts.append(f"({item['node']} {item['terminal']})")
+        elif "left" in item and "right" in item:
+            parts.append(f"({item['node']} ")
+            stack.append(")")
+            stack.append(item["right"])
+            stack.append(" ")
+            stack.append(item["left"])
+        else:
+            parts.append(f"({item['node']})")
+    return "".join(parts)
+
+
+def to_json(tree: dict, ensure_ascii: bool = True) -> str:
+    """
+    Mismo texto que json.dumps(tree), sin recursión (json.dumps falla con
+    árboles de miles de niveles).
+    """
+    parts = []
+    # Elementos de la pila: subárboles (dict) o fragmentos de JSON (str)
+    stack = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        pending = ["}"]
+        # reversed() sobre dict.items() necesita Python 3.8
+        for position, (key, value) in enumerate(reversed(list(item.items()))):
+            if not isinstance(value, dict):
+                value = json.dumps(value, ensure_ascii=ensure_ascii)
+            pending.append(value)
+            pending.append(json.dumps(key, ensure_ascii=ensure_ascii) + ": ")
+            if position < len(item) - 1:
+                pending.append(", ")
+        pending.append("{")
+        stack.extend(pending)
+    return "".join(parts)